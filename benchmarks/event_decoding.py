@@ -0,0 +1,88 @@
+"""
+Decoding time of synthetic OperationQueued logs: full `eth_abi` decoding of the `Operation` tuple
+(as `queue_operations_with_threshold` used to do) against the offset-based decoding of the three
+fields the check uses.
+
+Usage: python benchmarks/event_decoding.py [nr_of_logs]
+"""
+import eth_abi
+import eth_utils
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts import event_decoding
+
+
+FIELDS = ['originTransactionHash', 'assetAmount', 'destinationNetworkId']
+
+def get_logs(nr_of_logs):
+    """
+    Get synthetic OperationQueued logs
+
+    Args:
+        nr_of_logs (int): number of logs
+
+    Returns:
+        logs (list): list of logs (only the `data` key)
+    """
+    layout = event_decoding.EVENT_LAYOUTS['operation_queued']
+    rnd = random.Random(0)
+    logs = []
+    for i in range(nr_of_logs):
+        operation = (rnd.randbytes(32), rnd.randbytes(32), rnd.randbytes(32), i, 18,
+                     rnd.getrandbits(96), 0, rnd.getrandbits(64), 0, f'0x{rnd.randbytes(20).hex()}',
+                     rnd.randbytes(4), rnd.randbytes(4), rnd.randbytes(4), rnd.randbytes(4),
+                     f'0x{rnd.randbytes(20).hex()}', f'0x{rnd.randbytes(20).hex()}', 'Token', 'TKN',
+                     rnd.randbytes(rnd.randint(0, 256)), False)
+        data = eth_abi.encode([f'({",".join(layout["types"])})'], [operation])
+        logs.append({'data': eth_utils.encode_hex(data)})
+    return logs
+
+def decode_full(logs):
+    """
+    Decode the logs the way `queue_operations_with_threshold` used to
+    """
+    results = []
+    for logs_item in logs:
+        operation = eth_abi.abi.decode(['(bytes32,bytes32,bytes32,uint256,uint256,'
+                                        'uint256,uint256,uint256,uint256,address,'
+                                        'bytes4,bytes4,bytes4,bytes4,string,string,'
+                                        'string,string,bytes,bool)'],
+                                       eth_utils.decode_hex(logs_item['data'][2:]))[0]
+        results.append({
+            'originTransactionHash': eth_utils.encode_hex(operation[1]),
+            'assetAmount': operation[5],
+            'destinationNetworkId': eth_utils.encode_hex(operation[11])
+        })
+    return results
+
+def decode_selective(logs):
+    """
+    Decode the logs with `event_decoding.decode_fields`
+    """
+    return [event_decoding.decode_fields('operation_queued', logs_item['data'], FIELDS) for logs_item in logs]
+
+def run(func, logs):
+    """
+    Time a decoding function
+
+    Returns:
+        results (list): decoded logs
+        elapsed (float): seconds
+    """
+    start = time.perf_counter()
+    results = func(logs)
+    return results, time.perf_counter() - start
+
+if __name__ == '__main__':
+    logs = get_logs(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
+    full_results, full_elapsed = run(decode_full, logs)
+    selective_results, selective_elapsed = run(decode_selective, logs)
+    assert full_results == selective_results, 'decoded values differ'
+    print(f'     eth_abi: {len(logs) / full_elapsed:12,.0f} logs/s')
+    print(f'offset-based: {len(logs) / selective_elapsed:12,.0f} logs/s')
+    print(f'     speedup: {full_elapsed / selective_elapsed:.1f}x')
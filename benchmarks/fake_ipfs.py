@@ -0,0 +1,132 @@
+"""
+Fake IPFS node serving `/api/v0/pubsub/sub`: every subscribed topic gets a stream of synthetic
+sync-state heartbeats from a set of guardians and sentinels, at a configurable rate. The streams
+can be cut periodically to exercise the listener's reconnection.
+
+Usage: python benchmarks/fake_ipfs.py [--port 5001] [--actors 300] [--rate 1000] [--restart-every 0]
+"""
+import argparse
+import asyncio
+import base64
+import json
+import os
+import random
+import sys
+import time
+
+from aiohttp import web
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from constants import CHAIN_ID
+
+
+def encode_multibase(data):
+    """
+    Encode bytes as multibase base64url
+
+    Args:
+        data (bytes): data to encode
+
+    Returns:
+        (str): multibase encoded data
+    """
+    return 'u' + base64.urlsafe_b64encode(data).decode('ascii').rstrip('=')
+
+def get_actors(nr_of_actors):
+    """
+    Get synthetic actors: peer id, actor type and software version
+
+    Args:
+        nr_of_actors (int): number of actors
+
+    Returns:
+        (list): list of (peer id, actor type, version) tuples
+    """
+    return [(f'12D3KooW{i:044d}', ('guardian', 'sentinel')[i % 2], '1.0.0') for i in range(nr_of_actors)]
+
+def get_message(actor, heads, started_at):
+    """
+    Get a pubsub message (as sent by the ipfs node) carrying an actor's heartbeat
+
+    Args:
+        actor (tuple): (peer id, actor type, version) tuple
+        heads (dict): network id:latest block dict
+        started_at (float): server start time, block timestamps are computed from it
+
+    Returns:
+        (bytes): JSON line
+    """
+    peer_id, actor_type, version = actor
+    heartbeat = {
+        'timestamp': int(time.time()),
+        'actorType': actor_type,
+        'softwareVersions': {'listener': version, 'processor': version},
+        'syncState': {network_id: {
+            'latestBlockNumber': block - random.randint(0, 3),
+            'latestBlockTimestamp': int(started_at) + block
+        } for network_id, block in heads.items()}
+    }
+    return json.dumps({
+        'from': peer_id,
+        'data': encode_multibase(json.dumps(heartbeat).encode('utf8')),
+        'seqno': encode_multibase(os.urandom(8)),
+        'topicIDs': []
+    }).encode('utf8') + b'\n'
+
+async def pubsub_sub(request):
+    """
+    Stream heartbeats at `rate` messages per second until the client goes away (or the stream
+    is cut after `restart_every` seconds)
+    """
+    args = request.app['args']
+    res = web.StreamResponse()
+    await res.prepare(request)
+    actors = request.app['actors']
+    started_at = time.time()
+    interval = 0.01
+    sent = 0
+    try:
+        while not args.restart_every or time.time() - started_at < args.restart_every:
+            heads = {network_id: int(time.time() - request.app['started_at']) for network_id in CHAIN_ID}
+            nr_of_messages = int((time.time() - started_at) * args.rate) - sent
+            if nr_of_messages:
+                await res.write(b''.join(get_message(random.choice(actors), heads, request.app['started_at'])
+                                         for _ in range(nr_of_messages)))
+                sent += nr_of_messages
+            await asyncio.sleep(interval)
+    except ConnectionResetError:
+        pass
+    return res
+
+def get_app(args):
+    """
+    Build the fake pubsub app
+
+    Args:
+        args (Namespace): fake node args (`actors`, `rate` and `restart_every`)
+
+    Returns:
+        (Application): aiohttp app
+    """
+    app = web.Application()
+    app['args'] = args
+    app['actors'] = get_actors(args.actors)
+    app['started_at'] = time.time()
+    app.router.add_post('/api/v0/pubsub/sub', pubsub_sub)
+    return app
+
+def main():
+    """
+    Parse args and serve the fake pubsub API
+    """
+    parser = argparse.ArgumentParser(description='Fake IPFS pubsub node')
+    parser.add_argument('--port', type=int, default=5001)
+    parser.add_argument('--actors', type=int, default=300, help='number of guardians and sentinels')
+    parser.add_argument('--rate', type=float, default=1000, help='messages per second per subscription')
+    parser.add_argument('--restart-every', type=float, default=0, help='cut the streams every N seconds')
+    args = parser.parse_args()
+    web.run_app(get_app(args), port=args.port, print=None)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,523 @@
+"""
+Mock EVM JSON-RPC node serving every chain of `RPC_ENDPOINTS` on `/rpc/<chain>` from synthetic
+fixtures built on the ABIs in `abi/`: the factory -> hub -> slasher -> registration manager ->
+governance message emitter graph (proxies included), the hub's OperationQueued, OperationCancelled
+and ActorSlashed logs and the ActorsPropagated logs of the DAO chain. `eth_call` (Multicall3
+`aggregate3` included), `eth_getLogs`, `eth_getBalance`, `eth_getBlockByNumber`, `eth_getStorageAt`
+and `eth_blockNumber` are supported, single or batched. CoinGecko prices are served on
+`/coingecko/api/v3/simple/price` and the fake pubsub stream of `fake_ipfs.py` on `/api/v0/pubsub/sub`.
+
+Usage: python benchmarks/mock_node.py [--port 8545] [--latency 0] [--jitter 0] [--rate-limit 0]
+                                      [--actors 300] [--operations 1000] [--blocks 200000]
+"""
+import argparse
+import asyncio
+import bisect
+import eth_abi
+import eth_utils
+import json
+import os
+import random
+import sys
+import threading
+import time
+
+from aiohttp import web
+from eth_utils.abi import collapse_if_tuple, function_abi_to_4byte_selector
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import RPC_ENDPOINTS
+from constants import CHAIN_ID, CONST, FACTORY_ADDRS_DICT, MULTICALL_ADDRS_DICT, TOPICS
+from fake_ipfs import get_actors, pubsub_sub
+from scripts.event_decoding import EVENT_LAYOUTS
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# seconds per block of each chain, the head moves forward in real time
+BLOCK_TIMES = {
+    'bsc': 3,
+    'goerli': 12,
+    'polygon': 2
+}
+# hub events served by the mock (snake case name as in `TOPICS`: abi event name)
+HUB_EVENTS = {
+    'actor_slashed': 'ActorSlashed',
+    'operation_cancelled': 'OperationCancelled',
+    'operation_queued': 'OperationQueued'
+}
+COINGECKO_PRICES = {
+    'binancecoin': {'usd': 215.3},
+    'ethereum': {'usd': 1650.12},
+    'matic-network': {'usd': 0.51}
+}
+
+def get_address(seed):
+    """
+    Get a deterministic synthetic address
+
+    Args:
+        seed (str): address seed
+
+    Returns:
+        (str): checksum address
+    """
+    return eth_utils.to_checksum_address(eth_utils.keccak(text=seed)[-20:])
+
+def load_abis(chain):
+    """
+    Load the abis of a given chain from `abi/`
+
+    Args:
+        chain (str): chain name
+
+    Returns:
+        (dict): lowercase address:abi dict
+    """
+    abis = dict()
+    abi_dir = os.path.join(ROOT, os.path.dirname(CONST['abi_path']))
+    for file_name in os.listdir(abi_dir):
+        name, ext = os.path.splitext(file_name)
+        if ext == '.json' and name.rsplit('_', 1)[0] == chain:
+            with open(os.path.join(abi_dir, file_name), 'r') as f_abi:
+                abis[name.rsplit('_', 1)[1].lower()] = json.load(f_abi)
+    return abis
+
+def find_abi(abis, method):
+    """
+    Find the contract exposing a given method
+
+    Args:
+        abis (dict): lowercase address:abi dict
+        method (str): method name
+
+    Returns:
+        (str): lowercase address, None if no abi has the method
+    """
+    for addr, abi in abis.items():
+        if any(item.get('type') == 'function' and item['name'] == method for item in abi):
+            return addr
+    return None
+
+def get_value(param, rng, actors):
+    """
+    Get a synthetic value for an abi parameter, realistic for the fields the checks read
+
+    Args:
+        param (dict): abi parameter (`name`, `type`, `components`)
+        rng (Random): random generator
+        actors (list): actor addresses
+
+    Returns:
+        value, as accepted by `eth_abi.encode`
+    """
+    name, abi_type = param.get('name'), param['type']
+    if name == 'actor':
+        return rng.choice(actors)
+    if name == 'actors':
+        return actors
+    if name == 'actorsTypes':
+        return [f'0x{1 + i % 2:040x}' for i in range(len(actors))]
+    if name == 'epoch':
+        return rng.randint(1, 10)
+    if abi_type.endswith(']'):
+        return []
+    if abi_type == 'tuple':
+        return tuple(get_value(component, rng, actors) for component in param['components'])
+    if abi_type == 'bytes4':
+        return bytes.fromhex(rng.choice(list(CHAIN_ID))[2:])
+    if abi_type.startswith('uint'):
+        return rng.randrange(1, min(2 ** int(abi_type[4:] or 256), 10 ** 21))
+    if abi_type.startswith('int'):
+        return rng.randrange(1, 10 ** 6)
+    if abi_type == 'address':
+        return eth_utils.to_checksum_address(rng.randbytes(20))
+    if abi_type == 'bool':
+        return False
+    if abi_type == 'string':
+        return f'0x{rng.randbytes(20).hex()}'
+    if abi_type == 'bytes':
+        return b''
+    return rng.randbytes(int(abi_type[5:]))
+
+def get_functions(abi, outputs):
+    """
+    Index the view functions of an abi by selector
+
+    Args:
+        abi (list): contract abi
+        outputs (dict): method:value dict of the methods with a fixed return value
+
+    Returns:
+        (dict): 0x prefixed selector:(method, output types, fixed value or None) dict
+    """
+    return {eth_utils.encode_hex(function_abi_to_4byte_selector(item)): (
+        item['name'], [collapse_if_tuple(output) for output in item['outputs']], outputs.get(item['name'])
+    ) for item in abi if item.get('type') == 'function'}
+
+def get_logs(chain, hub_addr, gme_addr, abis, args, rng, actors):
+    """
+    Generate the chain's logs: `operations` OperationQueued, one OperationCancelled every 10 and one
+    ActorSlashed every 100 on the hub, spread over the chain's `blocks`, and (DAO chain only)
+    `propagations` ActorsPropagated on the governance message emitter
+
+    Returns:
+        (list): logs sorted by block
+    """
+    events = [(name, args.operations // {'operation_queued': 1, 'operation_cancelled': 10,
+                                        'actor_slashed': 100}[name]) for name in HUB_EVENTS]
+    if chain == CONST['dao_chain']:
+        events.append(('actors_propagated', args.propagations))
+    hub_abi = abis.get(hub_addr, [])
+    logs = []
+    for name, nr_of_logs in events:
+        if name == 'actors_propagated':
+            addr = gme_addr
+            inputs = [{'name': field, 'type': abi_type, 'indexed': False}
+                      for field, abi_type in zip(EVENT_LAYOUTS[name]['names'], EVENT_LAYOUTS[name]['types'])]
+        else:
+            addr = hub_addr
+            inputs = next((item['inputs'] for item in hub_abi
+                           if item.get('type') == 'event' and item['name'] == HUB_EVENTS[name]), None)
+            if inputs is None:
+                continue
+        for _ in range(nr_of_logs):
+            values = [(param, get_value(param, rng, actors)) for param in inputs]
+            topics = [TOPICS[name]] + [eth_utils.encode_hex(eth_abi.encode([collapse_if_tuple(param)], [value]))
+                                       for param, value in values if param.get('indexed')]
+            data = [(collapse_if_tuple(param), value) for param, value in values if not param.get('indexed')]
+            block = rng.randint(1, args.blocks)
+            logs.append({
+                'address': eth_utils.to_checksum_address(addr),
+                'topics': topics,
+                'data': eth_utils.encode_hex(eth_abi.encode([abi_type for abi_type, _ in data],
+                                                            [value for _, value in data])),
+                'blockNumber': hex(block),
+                'blockHash': f'0x{block:064x}',
+                'transactionHash': eth_utils.encode_hex(rng.randbytes(32)),
+                'transactionIndex': '0x0',
+                'logIndex': '0x0',
+                'removed': False
+            })
+    logs.sort(key=lambda tx: int(tx['blockNumber'], 16))
+    return logs
+
+def get_fixtures(args):
+    """
+    Build the fixtures of every chain: contracts (by address, proxies resolved to their
+    implementation's abi), storage slots, logs and block clock
+
+    Args:
+        args (Namespace): mock node args
+
+    Returns:
+        (dict): chain:fixtures dict
+    """
+    rng = random.Random(args.seed)
+    actors = [eth_utils.to_checksum_address(rng.randbytes(20)) for _ in range(args.actors)]
+    fixtures = dict()
+    for chain in RPC_ENDPOINTS:
+        abis = load_abis(chain)
+        factory_addr = FACTORY_ADDRS_DICT[chain].lower()
+        hub_addr = find_abi(abis, 'maxOperationsInQueue') or get_address(f'{chain}:hub').lower()
+        slasher_addr = find_abi(abis, 'registrationManager') or get_address(f'{chain}:slasher').lower()
+        proxies = {
+            get_address(f'{chain}:registrationManager').lower(): find_abi(abis, 'governanceMessageEmitter'),
+            get_address(f'{chain}:epochsManager').lower(): find_abi(abis, 'currentEpoch')
+        }
+        gme_addr = get_address(f'{chain}:governanceMessageEmitter').lower()
+        outputs = {
+            'hub': hub_addr,
+            'slasher': slasher_addr,
+            'registrationManager': list(proxies)[0],
+            'epochsManager': list(proxies)[1],
+            'governanceMessageEmitter': gme_addr,
+            'currentEpoch': 7,
+            'getCurrentChallengePeriodDuration': 3600,
+            'getTotalNumberOfActorsByEpochAndType': args.actors,
+            'getTotalNumberOfInactiveActorsByEpochAndType': args.actors // 10,
+            'maxOperationsInQueue': 50,
+            'numberOfOperationsInQueue': args.operations % 50
+        }
+        contracts = {addr: get_functions(abi, outputs) for addr, abi in abis.items()}
+        contracts.update({proxy: contracts[impl] for proxy, impl in proxies.items() if impl})
+        logs = get_logs(chain, hub_addr, gme_addr, abis, args, rng, actors)
+        fixtures[chain] = {
+            'contracts': contracts,
+            'factory': factory_addr,
+            'storage': {proxy: f'0x{impl[2:]:0>64}' for proxy, impl in proxies.items() if impl},
+            'logs': logs,
+            'log_blocks': [int(tx['blockNumber'], 16) for tx in logs],
+            'block_time': BLOCK_TIMES.get(chain, 2),
+            'started_at': time.time(),
+            'rate_limiter': {'tokens': args.rate_limit, 'updated_at': time.monotonic()}
+        }
+    return fixtures
+
+def get_head(chain_fixtures, args):
+    """
+    Get the chain head: `blocks` at startup, then moving forward one block every block time
+
+    Returns:
+        (int): latest block number
+    """
+    return args.blocks + int((time.time() - chain_fixtures['started_at']) / chain_fixtures['block_time'])
+
+def get_block_ts(chain_fixtures, args, block):
+    """
+    Get a block's timestamp, the head at startup being mined at startup
+
+    Returns:
+        (int): block timestamp
+    """
+    return int(chain_fixtures['started_at']) - (args.blocks - block) * chain_fixtures['block_time']
+
+def get_block_number(chain_fixtures, args, tag):
+    """
+    Get a block number from a block tag (hex number or `latest`/`finalized`/`safe`/`pending`)
+
+    Returns:
+        (int): block number
+    """
+    if tag in ('latest', 'finalized', 'safe', 'pending'):
+        return get_head(chain_fixtures, args)
+    if tag == 'earliest':
+        return 0
+    return int(tag, 16)
+
+def call_contract(chain_fixtures, to, data, rng):
+    """
+    Execute a view call against the fixtures
+
+    Args:
+        chain_fixtures (dict): chain fixtures
+        to (str): contract address
+        data (str): hex call data
+        rng (Random): random generator of the values not fixed by the fixtures
+
+    Returns:
+        (bytes): return data, None if the call reverts
+    """
+    function = chain_fixtures['contracts'].get(to.lower(), {}).get(data[:10].lower())
+    if function is None:
+        return None
+    method, output_types, value = function
+    if value is not None:
+        values = [value]
+    elif any(abi_type.startswith('(') for abi_type in output_types):
+        return None
+    else:
+        values = [get_value({'name': '', 'type': abi_type}, rng, []) for abi_type in output_types]
+    return eth_abi.encode(output_types, values)
+
+def handle_call(chain, chain_fixtures, args, request, stats):
+    """
+    Handle a single JSON-RPC request
+
+    Args:
+        chain (str): chain name
+        chain_fixtures (dict): chain fixtures
+        args (Namespace): mock node args
+        request (dict): JSON-RPC request
+        stats (dict): served calls counters
+
+    Returns:
+        (dict): JSON-RPC response
+    """
+    method, params = request.get('method'), request.get('params', [])
+    stats['calls'][method] = stats['calls'].get(method, 0) + 1
+    res = {'jsonrpc': '2.0', 'id': request.get('id')}
+    rng = random.Random(f'{method}{params}')
+    if method == 'eth_blockNumber':
+        res['result'] = hex(get_head(chain_fixtures, args))
+    elif method == 'eth_getBlockByNumber':
+        block = get_block_number(chain_fixtures, args, params[0])
+        if block > get_head(chain_fixtures, args):
+            res['result'] = None
+        else:
+            res['result'] = {
+                'number': hex(block),
+                'hash': f'0x{block:064x}',
+                'parentHash': f'0x{max(block - 1, 0):064x}',
+                'timestamp': hex(get_block_ts(chain_fixtures, args, block)),
+                'transactions': []
+            }
+    elif method == 'eth_getBalance':
+        res['result'] = hex(int.from_bytes(eth_utils.keccak(text=params[0].lower())[:8], 'big'))
+    elif method == 'eth_getStorageAt':
+        res['result'] = chain_fixtures['storage'].get(params[0].lower(), f'0x{0:064x}')
+    elif method == 'eth_getLogs':
+        log_filter = params[0]
+        _from = get_block_number(chain_fixtures, args, log_filter.get('fromBlock', 'latest'))
+        to = get_block_number(chain_fixtures, args, log_filter.get('toBlock', 'latest'))
+        if args.max_block_range and to - _from + 1 > args.max_block_range:
+            res['error'] = {'code': -32005, 'message': f'block range is too large, max {args.max_block_range}'}
+            return res
+        addrs = log_filter.get('address')
+        addrs = {addr.lower() for addr in ([addrs] if isinstance(addrs, str) else addrs or [])}
+        topics0 = (log_filter.get('topics') or [None])[0]
+        topics0 = {topics0} if isinstance(topics0, str) else set(topics0 or [])
+        logs = chain_fixtures['logs'][bisect.bisect_left(chain_fixtures['log_blocks'], _from):
+                                      bisect.bisect_right(chain_fixtures['log_blocks'], to)]
+        logs = [tx for tx in logs if (not addrs or tx['address'].lower() in addrs) and
+                (not topics0 or tx['topics'][0] in topics0)]
+        if args.max_logs and len(logs) > args.max_logs:
+            res['error'] = {'code': -32005, 'message': f'query returned more than {args.max_logs} results'}
+            return res
+        res['result'] = logs
+    elif method == 'eth_call':
+        to, data = params[0]['to'], params[0].get('data') or params[0].get('input')
+        if to.lower() == (MULTICALL_ADDRS_DICT.get(chain) or '').lower() and data.startswith('0x82ad56cb'):
+            calls = eth_abi.decode(['(address,bool,bytes)[]'], eth_utils.decode_hex(data[10:]))[0]
+            stats['multicall_calls'] += len(calls)
+            results = []
+            for target, _, calldata in calls:
+                return_data = call_contract(chain_fixtures, target, eth_utils.encode_hex(calldata), rng)
+                results.append((return_data is not None, return_data or b''))
+            res['result'] = eth_utils.encode_hex(eth_abi.encode(['(bool,bytes)[]'], [results]))
+        else:
+            return_data = call_contract(chain_fixtures, to, data, rng)
+            if return_data is None:
+                res['error'] = {'code': 3, 'message': 'execution reverted'}
+            else:
+                res['result'] = eth_utils.encode_hex(return_data)
+    else:
+        res['error'] = {'code': -32601, 'message': f'the method {method} does not exist'}
+    return res
+
+def is_rate_limited(chain_fixtures, args):
+    """
+    Take a token from the chain's bucket (`rate_limit` requests per second, as much burst)
+
+    Returns:
+        (bool): True if the request must be rejected
+    """
+    if not args.rate_limit:
+        return False
+    rate_limiter = chain_fixtures['rate_limiter']
+    now = time.monotonic()
+    rate_limiter['tokens'] = min(args.rate_limit, rate_limiter['tokens'] + (now - rate_limiter['updated_at']) * args.rate_limit)
+    rate_limiter['updated_at'] = now
+    if rate_limiter['tokens'] < 1:
+        return True
+    rate_limiter['tokens'] -= 1
+    return False
+
+async def rpc(request):
+    """
+    Serve the JSON-RPC requests (single or batch) of a chain after `latency` (+ `jitter`) ms
+    """
+    args = request.app['args']
+    chain = request.match_info['chain']
+    chain_fixtures = request.app['fixtures'][chain]
+    stats = request.app['stats']
+    stats['http_requests'] += 1
+    payload = await request.json()
+    await asyncio.sleep((args.latency + random.uniform(0, args.jitter)) / 1000)
+    if is_rate_limited(chain_fixtures, args):
+        stats['rate_limited'] += 1
+        return web.json_response({'jsonrpc': '2.0', 'id': None, 'error': {'code': 429, 'message': 'Too Many Requests'}},
+                                 status=429)
+    if isinstance(payload, list):
+        res = [handle_call(chain, chain_fixtures, args, item, stats) for item in payload]
+    else:
+        res = handle_call(chain, chain_fixtures, args, payload, stats)
+    body = json.dumps(res).encode('utf8')
+    stats['response_bytes'] += len(body)
+    return web.Response(body=body, content_type='application/json')
+
+async def coingecko_prices(request):
+    """
+    Serve the CoinGecko simple prices
+    """
+    request.app['stats']['calls']['coingecko'] = request.app['stats']['calls'].get('coingecko', 0) + 1
+    ids = request.query.get('ids', '').split(',')
+    return web.json_response({token: price for token, price in COINGECKO_PRICES.items() if token in ids})
+
+def reset_stats(app):
+    """
+    Reset the served calls counters
+
+    Args:
+        app (Application): mock node app
+    """
+    app['stats'].clear()
+    app['stats'].update({'http_requests': 0, 'rate_limited': 0, 'response_bytes': 0, 'multicall_calls': 0,
+                         'calls': dict()})
+
+def get_app(args):
+    """
+    Build the mock node app and its fixtures
+
+    Args:
+        args (Namespace): mock node args (see `add_arguments`)
+
+    Returns:
+        (Application): aiohttp app
+    """
+    app = web.Application(client_max_size=64 * 1024 ** 2)
+    app['args'] = args
+    app['fixtures'] = get_fixtures(args)
+    app['actors'] = get_actors(args.actors)
+    app['started_at'] = time.time()
+    app['stats'] = dict()
+    reset_stats(app)
+    app.router.add_post('/rpc/{chain}', rpc)
+    app.router.add_get('/coingecko/api/v3/simple/price', coingecko_prices)
+    app.router.add_post('/api/v0/pubsub/sub', pubsub_sub)
+    return app
+
+def start_in_thread(args):
+    """
+    Serve the mock node on its own event loop, in a daemon thread
+
+    Args:
+        args (Namespace): mock node args (see `add_arguments`)
+
+    Returns:
+        app (Application): aiohttp app (`stats` are live)
+        port (int): listening port
+    """
+    app = get_app(args)
+    loop = asyncio.new_event_loop()
+    runner = web.AppRunner(app, access_log=None)
+    loop.run_until_complete(runner.setup())
+    site = web.TCPSite(runner, '127.0.0.1', args.port)
+    loop.run_until_complete(site.start())
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    return app, runner.addresses[0][1]
+
+def add_arguments(parser):
+    """
+    Add the mock node args to a parser
+
+    Args:
+        parser (ArgumentParser): parser
+    """
+    parser.add_argument('--port', type=int, default=8545, help='listening port, 0 for a free one')
+    parser.add_argument('--latency', type=float, default=0, help='ms added to every request')
+    parser.add_argument('--jitter', type=float, default=0, help='random ms (0 to N) added to every request')
+    parser.add_argument('--rate-limit', type=float, default=0, help='requests per second per chain, 0 to disable')
+    parser.add_argument('--actors', type=int, default=300, help='number of guardians and sentinels')
+    parser.add_argument('--operations', type=int, default=1000, help='OperationQueued logs per chain')
+    parser.add_argument('--propagations', type=int, default=10, help='ActorsPropagated logs on the dao chain')
+    parser.add_argument('--blocks', type=int, default=200000, help='blocks per chain at startup')
+    parser.add_argument('--max-logs', type=int, default=10000, help='max logs per getLogs response, 0 for no limit')
+    parser.add_argument('--max-block-range', type=int, default=0, help='max getLogs block range, 0 for no limit')
+    parser.add_argument('--pubsub-rate', dest='rate', type=float, default=100, help='pubsub messages per second')
+    parser.add_argument('--restart-every', type=float, default=0, help='cut the pubsub streams every N seconds')
+    parser.add_argument('--seed', type=int, default=0, help='fixtures random seed')
+
+def main():
+    """
+    Parse args and serve the mock node
+    """
+    parser = argparse.ArgumentParser(description='Mock EVM JSON-RPC node, CoinGecko and IPFS pubsub')
+    add_arguments(parser)
+    args = parser.parse_args()
+    app = get_app(args)
+    print(f'[+] Serving {", ".join(RPC_ENDPOINTS)} on http://127.0.0.1:{args.port}/rpc/<chain>', file=sys.stderr)
+    web.run_app(app, port=args.port, print=None, access_log=None)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""
+Records per second written by the `json` output (indented records through the logger, as printed
+by `main.py`) and by the `ndjson` output (compact records through the buffered writer).
+
+Usage: python benchmarks/output_formats.py [nr_of_records]
+"""
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts import output
+
+
+def get_records(nr_of_records):
+    """
+    Get synthetic `components_balances` records
+
+    Args:
+        nr_of_records (int): number of records
+
+    Returns:
+        records (list): list of records
+    """
+    return [{
+        'title': 'components_balance',
+        'timestamp': int(time.time()),
+        'chain': ('bsc', 'goerli', 'polygon')[i % 3],
+        'actor_addr': f'0x{i:040x}',
+        'actor_type': ('guardian', 'sentinel')[i % 2],
+        'balance': i / 7
+    } for i in range(nr_of_records)]
+
+def set_logger(stream):
+    """
+    Set the root logger up the same way `main.py` does, writing on the given stream
+
+    Args:
+        stream: stdout replacement
+    """
+    log = logging.getLogger()
+    log.handlers.clear()
+    log.setLevel(logging.INFO)
+    stdout_handler = logging.StreamHandler(stream)
+    stdout_handler.setLevel(logging.INFO)
+    stdout_handler.setFormatter(logging.Formatter(''))
+    stdout_handler.addFilter(output.StdOutFilter())
+    log.addHandler(stdout_handler)
+    stderr_handler = logging.StreamHandler(sys.stderr)
+    stderr_handler.setLevel(logging.ERROR)
+    stderr_handler.addFilter(output.StdErrFilter())
+    log.addHandler(stderr_handler)
+
+def run(output_format, records):
+    """
+    Write the records in the given format on /dev/null
+
+    Args:
+        output_format (str): one of `output.FORMATS`
+        records (list): list of records
+
+    Returns:
+        (float): records per second
+    """
+    stdout = sys.stdout
+    with open(os.devnull, 'w') as devnull:
+        sys.stdout = devnull
+        set_logger(devnull)
+        output.set_format(output_format)
+        try:
+            start = time.perf_counter()
+            for record in records:
+                output.write_record(record)
+            output.flush()
+            elapsed = time.perf_counter() - start
+        finally:
+            sys.stdout = stdout
+    return len(records) / elapsed
+
+if __name__ == '__main__':
+    records = get_records(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
+    results = {output_format: run(output_format, records) for output_format in output.FORMATS}
+    for output_format, records_per_sec in results.items():
+        print(f'{output_format:>7}: {records_per_sec:12,.0f} records/s')
+    print(f'speedup: {results["ndjson"] / results["json"]:.1f}x')
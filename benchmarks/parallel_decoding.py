@@ -0,0 +1,58 @@
+"""
+Throughput of `event_decoding.decode_logs` on synthetic OperationQueued logs, decoded inline (as with
+`decode_workers` 1) and on process pools of 2, 4, ... workers (up to the number of cpus). All the
+fields are decoded, dynamic ones included, which is the CPU heavy case of wide backfills.
+
+Usage: python benchmarks/parallel_decoding.py [nr_of_logs]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from constants import CONST
+from event_decoding import get_logs
+from scripts import event_decoding
+
+
+FIELDS = event_decoding.EVENT_LAYOUTS['operation_queued']['names']
+
+def run(logs, nr_of_workers):
+    """
+    Decode the logs with the given number of workers (inline if 0)
+
+    Args:
+        logs (list): raw logs
+        nr_of_workers (int): number of decoding processes
+
+    Returns:
+        results (list): decoded logs
+        elapsed (float): seconds (pool start up excluded)
+    """
+    CONST['decode_workers'] = nr_of_workers or 1
+    CONST['decode_parallel_min_logs'] = 1 if nr_of_workers else len(logs) + 1
+    if event_decoding._pool is not None:
+        event_decoding._pool.shutdown()
+        event_decoding._pool = None
+    if nr_of_workers:
+        # spawn the workers before timing
+        list(event_decoding.get_pool().map(abs, range(nr_of_workers)))
+    start = time.perf_counter()
+    results = event_decoding.decode_logs('operation_queued', logs, FIELDS)
+    return results, time.perf_counter() - start
+
+if __name__ == '__main__':
+    logs = [dict(tx, topics=[]) for tx in get_logs(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)]
+    expected, inline_elapsed = run(logs, 0)
+    print(f'      inline: {len(logs) / inline_elapsed:10,.0f} logs/s')
+    nr_of_workers = 2
+    while nr_of_workers <= (os.cpu_count() or 1):
+        results, elapsed = run(logs, nr_of_workers)
+        assert results == expected, 'decoded logs differ'
+        print(f'{nr_of_workers:2} worker(s): {len(logs) / elapsed:10,.0f} logs/s '
+              f'({inline_elapsed / elapsed:.2f}x inline)')
+        nr_of_workers *= 2
+    if nr_of_workers == 2:
+        print('single cpu, no process pool to compare with')
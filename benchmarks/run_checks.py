@@ -0,0 +1,173 @@
+"""
+Offline benchmark of the checks: every check of `CHECKS_MAPPING` is run against the mock node
+(`mock_node.py`: EVM JSON-RPC, CoinGecko and IPFS pubsub), each run in a fresh process sharing
+a temporary cache directory (so the first run is cold and the following ones warm), and its wall
+time, RPC count (HTTP requests, JSON-RPC calls by method, calls aggregated in multicalls) and peak
+memory (peak RSS) are reported. Compare the reports of two versions to spot regressions.
+
+Usage: python benchmarks/run_checks.py [--checks 1 3 ...] [--runs 2] [--format table|json]
+                                       [mock node args, see mock_node.py]
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+def get_peak_memory():
+    """
+    Get the peak resident memory of the current process. `VmHWM` is used on Linux since
+    `ru_maxrss` also accounts for the parent's memory inherited through fork
+
+    Returns:
+        (int): peak memory in KB
+    """
+    try:
+        with open('/proc/self/status', 'r') as f_status:
+            for line in f_status:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return max_rss // 1024 if sys.platform == 'darwin' else max_rss
+
+def run_check(check_name, port, cache_dir, pubsub_seconds):
+    """
+    Point the config to the mock node, run a check once and print its measures (child process)
+
+    Args:
+        check_name (str): check name
+        port (int): mock node port
+        cache_dir (str): cache directory shared by the runs
+        pubsub_seconds (int): how long the pubsub listener runs for
+    """
+    started_at = time.perf_counter()
+    import asyncio
+    import config
+    from concurrent.futures import ThreadPoolExecutor
+    from constants import CONST
+    from scripts import output, registry
+
+    os.chdir(ROOT)
+    for chain in config.RPC_ENDPOINTS:
+        config.RPC_ENDPOINTS[chain] = f'http://127.0.0.1:{port}/rpc/{chain}'
+    config.SUBPUB_CONFIG.update({'ipfs_url': '127.0.0.1', 'ipfs_port': port, 'pubsub_timeout': pubsub_seconds})
+    CONST['coingecko_prices_url'] = f'http://127.0.0.1:{port}/coingecko/api/v3/simple/price'
+    for key in ('addr_cache_path', 'cache_db_path', 'getlogs_ranges_path'):
+        CONST[key] = os.path.join(cache_dir, os.path.basename(CONST[key]))
+
+    async def run():
+        asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=CONST['max_worker_threads']))
+        return await registry.get_check(check_name)()
+
+    records = asyncio.run(run())
+    output.flush()
+    print(json.dumps({
+        'wall_time': time.perf_counter() - started_at,
+        'max_rss_kb': get_peak_memory(),
+        'records': len(records or []),
+        'errors': sum(1 for record in records or [] if 'error' in record)
+    }))
+
+def run_in_child(check_name, args, cache_dir):
+    """
+    Run a check in a fresh process
+
+    Args:
+        check_name (str): check name
+        args (Namespace): harness args
+        cache_dir (str): cache directory shared by the runs
+
+    Returns:
+        (dict): child's measures, with `error` set if it crashed
+    """
+    proc = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', check_name,
+                           '--port', str(args.port), '--cache-dir', cache_dir,
+                           '--pubsub-seconds', str(args.pubsub_seconds)],
+                          capture_output=True, text=True)
+    if args.verbose and proc.stderr:
+        print(proc.stderr, file=sys.stderr, end='')
+    try:
+        return json.loads(proc.stdout.strip().splitlines()[-1])
+    except Exception:
+        return {'error': (proc.stderr.strip().splitlines() or [f'exit code {proc.returncode}'])[-1]}
+
+def print_table(results):
+    """
+    Print the results as a table
+
+    Args:
+        results (list): results, one per check run
+    """
+    columns = ['check', 'run', 'wall_s', 'http_requests', 'rpc_calls', 'multicall_calls', 'rate_limited',
+               'response_kb', 'peak_mb', 'records', 'errors']
+    rows = [[
+        result['check'],
+        result['run'],
+        f'{result["wall_time"]:.2f}' if 'wall_time' in result else result.get('error', ''),
+        result['http_requests'],
+        sum(result['calls'].values()),
+        result['multicall_calls'],
+        result['rate_limited'],
+        f'{result["response_bytes"] / 1024:.1f}',
+        f'{result["max_rss_kb"] / 1024:.1f}' if 'max_rss_kb' in result else '',
+        result.get('records', ''),
+        result.get('errors', '')
+    ] for result in results]
+    widths = [max(len(str(row[i])) for row in rows + [columns]) for i in range(len(columns))]
+    for row in [columns] + rows:
+        print('  '.join(str(value).rjust(width) if i > 0 else str(value).ljust(width)
+                        for i, (value, width) in enumerate(zip(row, widths))))
+
+def main():
+    """
+    Parse args, start the mock node and benchmark the requested checks. The children only
+    import what the check needs, so the mock node does not count in their memory
+    """
+    if sys.argv[1:2] == ['--child']:
+        parser = argparse.ArgumentParser()
+        for arg in ('--child', '--cache-dir'):
+            parser.add_argument(arg)
+        parser.add_argument('--port', type=int)
+        parser.add_argument('--pubsub-seconds', type=int)
+        args = parser.parse_args()
+        run_check(args.child, args.port, args.cache_dir, args.pubsub_seconds)
+        return
+    import mock_node
+    from checks_mapping import CHECKS_MAPPING
+
+    parser = argparse.ArgumentParser(description='Offline checks benchmark')
+    parser.add_argument('-c', '--checks', nargs='+', help='checks to run (key values or names), all by default')
+    parser.add_argument('--runs', type=int, default=2, help='runs per check, the first one with empty caches')
+    parser.add_argument('--pubsub-seconds', type=int, default=5, help='how long the pubsub listener runs for')
+    parser.add_argument('--format', choices=['table', 'json'], default='table')
+    parser.add_argument('-v', '--verbose', action='store_true', help='print the checks\' stderr')
+    mock_node.add_arguments(parser)
+    parser.set_defaults(port=0)
+    args = parser.parse_args()
+    checks = [CHECKS_MAPPING[int(check)] if check.isdigit() else check for check in args.checks or []]
+    checks = checks or list(CHECKS_MAPPING.values())
+    app, args.port = mock_node.start_in_thread(args)
+    results = []
+    with tempfile.TemporaryDirectory() as cache_dir:
+        for check_name in checks:
+            for run in range(1, args.runs + 1):
+                mock_node.reset_stats(app)
+                result = {'check': check_name, 'run': run, **run_in_child(check_name, args, cache_dir)}
+                results.append({**result, **app['stats']})
+                if args.format == 'table':
+                    print(f'[+] {check_name} run {run}: {result.get("wall_time", 0):.2f} s', file=sys.stderr)
+    if args.format == 'json':
+        print(json.dumps(results, indent=4))
+    else:
+        print_table(results)
+
+if __name__ == '__main__':
+    main()
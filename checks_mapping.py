@@ -12,3 +12,20 @@ CHECKS_MAPPING = {
     11: 'user_ops',
     12: 'ipfs_subpub_pnetwork_topics'
 }
+
+# `--daemon` schedule of each check: run every `interval` seconds, delayed by a random `jitter`
+# (0 to `jitter` seconds), `overlap` allows a new run to start while the previous one is still going
+CHECKS_SCHEDULE = {
+    'challenge_period_duration': {'interval': 3600, 'jitter': 30, 'overlap': False},
+    'challenge_status': {'interval': 60, 'jitter': 5, 'overlap': False},
+    'components_balances': {'interval': 300, 'jitter': 15, 'overlap': False},
+    'inactive_actors_by_epoch': {'interval': 300, 'jitter': 15, 'overlap': False},
+    'max_ops_in_queue': {'interval': 3600, 'jitter': 30, 'overlap': False},
+    'nr_of_ops_in_queue': {'interval': 60, 'jitter': 5, 'overlap': False},
+    'operation_cancelled': {'interval': 60, 'jitter': 5, 'overlap': False},
+    'queue_op_after_user_op': {'interval': 60, 'jitter': 5, 'overlap': False},
+    'queue_operations_with_threshold': {'interval': 60, 'jitter': 5, 'overlap': False},
+    'slashed_actors': {'interval': 60, 'jitter': 5, 'overlap': False},
+    'user_ops': {'interval': 60, 'jitter': 5, 'overlap': False},
+    'ipfs_subpub_pnetwork_topics': {'interval': 10, 'jitter': 0, 'overlap': False}
+}
@@ -1,3 +1,4 @@
+# a url or a list of urls per chain, requests are routed to the fastest healthy one
 RPC_ENDPOINTS = {
     'bsc': 'https://bsc-dataseed1.binance.org/',
     'goerli': 'https://rpc.ankr.com/eth_goerli',
@@ -7,6 +8,6 @@ RPC_ENDPOINTS = {
 SUBPUB_CONFIG = {
     'ipfs_port': 5001,
     'ipfs_url': '',
-    'pubsub_topic': 'pnetwork-v3',
+    'pubsub_topic': 'pnetwork-v3',  # a topic or a list of topics
     'pubsub_timeout': 0  # can be 0 (no limit) or int > 0
 }
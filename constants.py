@@ -1,9 +1,24 @@
+import os
+
+
+# Local caches directory, `MONITORING_CACHE_DIR` or the user's cache directory by default
+CACHE_DIR = os.environ.get('MONITORING_CACHE_DIR') or os.path.join(
+    os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache'), 'pnetwork-monitoring')
+
 CHAIN_DECIMALS = {
     'bsc': 18,
     'goerli': 18,
     'polygon': 18,
 }
 
+# Blocks after which a block is considered final, the event store refetches the blocks within
+# this depth of the previous head (not final yet) on every run to handle reorgs
+CHAIN_CONFIRMATIONS = {
+    'bsc': 15,
+    'goerli': 12,
+    'polygon': 128,
+}
+
 CHAIN_ID = {
     '0x5aca268b': 'bsc',
     '0xb9286154': 'goerli',
@@ -24,18 +39,81 @@ COMPONENTS_MAPS = {
 
 CONST = {
     'abi_path': 'abi/{}_{}.json',
+    'addr_cache_path': os.path.join(CACHE_DIR, 'addresses.json'),
+    'addr_cache_ttl': 86400,
+    'block_cache_head_ttl': 15,  # seconds a head-adjacent (not yet final) block timestamp is cached
+    'block_cache_size': 100000,  # confirmed block timestamps kept in memory, all of them are kept on disk
+    'block_resolver_sample': 100,  # blocks to step back from the head when no block before a timestamp is cached
+    'cache_db_path': os.path.join(CACHE_DIR, 'monitoring.sqlite'),
+    'cache_db_timeout': 30,
     'coingecko_prices_url': 'https://api.coingecko.com/api/v3/simple/price',
     'dao_chain': 'polygon',
+    'decode_batch_size': 5000,  # logs per batch sent to a decoding process
+    'decode_parallel_min_logs': 20000,  # smaller lists of logs are decoded inline
+    'decode_workers': 0,  # decoding processes, 0 to use all the cpus
+    'event_store_enabled': True,
+    'event_store_refresh_interval': 30,
     'get_logs_past_days_components_balances': 2,
     'get_logs_past_days_operation_cancelled': 2,
     'get_logs_past_days_queue_op_after_user_op': 2,
     'get_logs_past_days_queue_operations_with_threshold': 2,
     'get_logs_past_days_slashed_actors': 3,
     'get_logs_past_days_user_op': 2,
+    'head_lag_max_seconds': 300,  # seconds an actor's latest block can be older than the chain head
+    'head_refresh_interval': 10,  # seconds between two polls of each chain head (lag detection)
+    'heartbeat_summary_interval': 60,  # seconds between two pubsub actors summaries
+    'heartbeat_ttl': 600,  # seconds of silence after which an actor is evicted
     'implementation_slot': '0x360894a13ba1a3210667c828492db98dca3e2076cc3735a920a3ca505d382bbc',
     'ipfs_pubsub_url': 'http://{}:{}/api/v0/pubsub/sub?arg={}',
-    'jsonrpc_max_block_range_getlogs': 9999,
+    'getlogs_grow_factor': 1.25,
+    'getlogs_grow_max_results': 1000,
+    'getlogs_max_block_range': 100000,
+    'getlogs_min_block_range': 10,
+    'getlogs_parallelism': 4,
+    'getlogs_range_errors': ['too many', 'more than', 'block range', 'range too large', 'range is too large',
+                             'exceed', 'response size', 'timeout', 'timed out'],
+    'getlogs_ranges_path': os.path.join(CACHE_DIR, 'getlogs_ranges.json'),
+    'jsonrpc_max_block_range_getlogs': 9999,  # initial getLogs block range, then adapted per endpoint
+    'max_concurrent_checks': 4,
+    'max_worker_threads': 32,
+    'metrics_host': '0.0.0.0',  # `--metrics-port` listening address
+    'multicall_max_calls': 100,
+    'multicall_window': 0.02,
+    'output_buffer_size': 65536,  # bytes of ndjson records buffered before writing them
+    'output_flush_interval': 1,  # max seconds a buffered ndjson record waits to be written
+    'pubsub_backoff_base': 0.5,  # first reconnection delay (seconds), doubled on each failed attempt
+    'pubsub_backoff_max': 30,
+    'pubsub_consumers': 4,  # concurrent consumers of the pubsub messages queue
+    'pubsub_print_messages': False,  # also print every pubsub message, not only the actors' changes
+    'pubsub_queue_policy': 'drop',  # full queue policy: `drop` new messages or `block` the readers
+    'pubsub_queue_size': 10000,
+    'pubsub_read_bufsize': 1048576,  # pubsub stream read buffer, messages can be up to twice as long
+    'pubsub_stats_interval': 15,  # seconds between two refreshes of the pubsub metrics
     'queued_operation_amount_threshold': 1,
+    'rpc_backoff_base': 0.5,
+    'rpc_batch_size': 100,
+    'rpc_eject_error_rate': 0.5,  # error rate (EWMA) over which an endpoint is ejected and re-probed
+    'rpc_eject_failures': 3,  # consecutive failures after which an endpoint is ejected and re-probed
+    'rpc_ewma_alpha': 0.2,  # weight of the latest request in the endpoints latency and error rate EWMAs
+    'rpc_hedge_min_delay': 0.05,  # min seconds before a hedged request is sent
+    'rpc_hedge_min_samples': 20,  # latencies known before an endpoint's p95 is used for hedging
+    'rpc_hedge_workers': 16,
+    'rpc_hedging': False,  # resend to the next endpoint if the first has not answered by its p95 latency
+    'rpc_latency_window': 200,  # recent latencies kept per endpoint for the p95
+    'rpc_max_retries': 5,
+    'rpc_pool_block': True,
+    'rpc_pool_connections': 1,
+    'rpc_pool_maxsize': 16,
+    'rpc_probe_interval': 30,  # seconds between two probes of an ejected endpoint
+    'rpc_rate_limit': 25,  # requests per second per endpoint, 0 to disable
+    'rpc_rate_limit_burst': 25,
+    'rpc_rate_limit_errors': ['rate limit', 'too many requests', 'request limit', 'capacity exceeded'],
+    'rpc_rate_limit_min': 1,
+    'rpc_stats_buckets': [0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10],  # latency histogram bounds (seconds)
+    'rpc_stats_interval': 300,  # seconds between two `--rpc-stats` records dumps in daemon mode
+    'rpc_timeout': 30,
+    'snapshot_cache_size': 10000,  # request results kept in memory, the ones at final blocks are all kept on disk
+    'snapshot_ttl': 60,  # seconds a snapshot (pinned heads) is shared by the check runs starting after it (daemon mode)
 }
 
 FACTORY_ADDRS_DICT = {
@@ -44,8 +122,30 @@ FACTORY_ADDRS_DICT = {
     'polygon': '0x4650787da4A497496e514EcCFd6F888B7804ebBe'
 }
 
+# Hub events scanned together (single getLogs pass), with the config key of their time range
+HUB_LOG_TOPICS = {
+    'actor_slashed': 'get_logs_past_days_slashed_actors',
+    'operation_cancelled': 'get_logs_past_days_operation_cancelled',
+    'operation_queued': 'get_logs_past_days_queue_operations_with_threshold'
+}
+
+# Blocks an actor can be behind the chain head before being reported as lagging (about 5 minutes)
+HEAD_LAG_MAX_BLOCKS = {
+    'bsc': 100,
+    'goerli': 25,
+    'polygon': 150
+}
+
+# Multicall3 aggregators, a chain can be removed (or set to None) to send view calls one by one
+MULTICALL_ADDRS_DICT = {
+    'bsc': '0xcA11bde05977b3631167028862bE2a173976CA11',
+    'goerli': '0xcA11bde05977b3631167028862bE2a173976CA11',
+    'polygon': '0xcA11bde05977b3631167028862bE2a173976CA11'
+}
+
 RELAYERS = []  # A list of relayers can be added here
 
+# Hub event topics (keccak of the event signatures), precomputed since the getLogs filters don't need any abi
 TOPICS = {
     'actors_propagated': '0x7d394dea630b3e42246f284e4e4b75cff4f959869b3d753639ba8ae6120c67c3',
     'actor_slashed': '0x3d78448e3086a8762725bddb010d91cb9ab2ae6f79981de8abc8dc36aff2fd09',
@@ -1,12 +1,16 @@
+import time
+_started_at = time.perf_counter()
+
 import argparse
 import asyncio
-import importlib
 import logging.config
-import os
+import random
 import sys
 
-from checks_mapping import CHECKS_MAPPING
-from scripts import *
+from checks_mapping import CHECKS_MAPPING, CHECKS_SCHEDULE
+from concurrent.futures import ThreadPoolExecutor
+from constants import CONST
+from scripts import metrics, output, registry, rpc_stats
 
 
 # Logger instance
@@ -18,7 +22,7 @@ stdout_handler = logging.StreamHandler(sys.stdout)
 stdout_handler.setLevel(logging.INFO)
 stdout_handler.setFormatter(formatter_stdout)
 # Apply stdout filter
-stdout_handler.addFilter(utils.StdOutFilter())
+stdout_handler.addFilter(output.StdOutFilter())
 log.addHandler(stdout_handler)
 # Define and add stderr handler
 formatter_stderr = logging.Formatter('%(asctime)s - %(levelname)s: %(message)s')
@@ -26,39 +30,130 @@ stderr_handler = logging.StreamHandler(sys.stderr)
 stderr_handler.setLevel(logging.ERROR)
 stderr_handler.setFormatter(formatter_stderr)
 # Apply stderr filter
-stderr_handler.addFilter(utils.StdErrFilter())
+stderr_handler.addFilter(output.StdErrFilter())
 log.addHandler(stderr_handler)
 
 __version__ = '0.3.0'
 
-def load_modules(path):
+def print_import_times(list_of_checks):
     """
-    Dynamically load modules from a given path
+    Import the requested checks and print (on stderr) the time spent importing each of them,
+    along with the startup time since `main.py` started
 
     Args:
-        path (str): absolute module's path
+        list_of_checks (list): requested checks (key values or names)
     """
-    try:
-        files = os.listdir(path)
-        modules = []
-        for i in range(len(files)):
-            module = files[i].split('.')
-            if len(module) > 1:
-                if module[0] != '__init__' and module[1] == 'py':
-                    module = module[0]
-                    modules.append(module)
-        with open(f'{path}__init__.py', 'w') as f_mod:
-            f_mod.write(f'__all__ = {str(modules)}')
-    except Exception as e:
-        log.error(f'[!] Error while loading modules: {e}')
+    for check in list_of_checks:
+        try:
+            registry.get_check(registry.get_check_name(check))
+        except Exception as e:
+            log.error(f'[!] Error while importing check {check}: {e}')
+    for check_name, import_time in registry.get_import_times().items():
+        print(f'[+] Import time of `{check_name}`: {import_time * 1000:.1f} ms', file=sys.stderr)
+    print(f'[+] Startup time: {(time.perf_counter() - _started_at) * 1000:.1f} ms', file=sys.stderr)
+
+async def run_check(check_name, semaphore):
+    """
+    Run a single check coroutine, waiting for a free slot on the given semaphore
+
+    Args:
+        check_name (str): check name
+        semaphore (Semaphore): limits the number of checks running at the same time
+
+    Returns:
+        records (list): check's records, None if the check does not return any
+    """
+    rpc_stats.set_check(check_name)
+    async with semaphore:
+        try:
+            func = registry.get_check(check_name)
+            records = await func()
+            metrics.update(check_name, records)
+            return records
+        except Exception as e:
+            log.error(f'[!] Error while running check {check_name}: {e}')
+
+def print_records(check, check_name, records, verbose):
+    """
+    Print the records of a check, grouped under the check's header
+
+    Args:
+        check (str): check as requested by the user (key value or name)
+        check_name (str): check name
+        records (list): check's records, None if the check does not return any
+        verbose (bool): if True, print check's labels (`json` output only)
+    """
+    if output.is_ndjson():
+        for record in records or []:
+            output.write_record(record)
+        return
+    if check.isdigit():
+        if verbose:
+            print(f'\n[+] Check `{check_name}` ({check}):\n')
+    else:
+        print(f'\n[+] Check `{check_name}`:')
+    for record in records or []:
+        output.write_record(record)
+    if verbose:
+        print('\n ##########################################\n')
+
+async def run_check_forever(check, check_name, semaphore, verbose):
+    """
+    Run a check on its `CHECKS_SCHEDULE` interval (daemon mode), printing its records after every run.
+    Each check has its own loop, so a slow check never delays the others
+
+    Args:
+        check (str): check as requested by the user (key value or name)
+        check_name (str): check name
+        semaphore (Semaphore): limits the number of checks running at the same time
+        verbose (bool): if True, print check's labels
+    """
+    from scripts import snapshot
+    schedule = CHECKS_SCHEDULE[check_name]
+    running = set()
+
+    async def run_and_print():
+        records = await run_check(check_name, semaphore)
+        print_records(check, check_name, records, verbose)
+
+    await asyncio.sleep(random.uniform(0, schedule['jitter']))
+    while True:
+        started_at = time.monotonic()
+        # runs of different checks starting within `snapshot_ttl` seconds read the same heads
+        snapshot.start_run(CONST['snapshot_ttl'])
+        if schedule['overlap']:
+            task = asyncio.create_task(run_and_print())
+            running.add(task)
+            task.add_done_callback(running.discard)
+        else:
+            await run_and_print()
+        delay = started_at + schedule['interval'] - time.monotonic()
+        await asyncio.sleep(max(delay, 0) + random.uniform(0, schedule['jitter']))
+
+def write_rpc_stats():
+    """
+    Write the RPC stats records (cumulated since the start) and print their summary on stderr
+    """
+    for record in rpc_stats.get_records():
+        output.write_record(record)
+    output.flush()
+    rpc_stats.print_summary()
+
+async def write_rpc_stats_forever():
+    """
+    Write the RPC stats every `rpc_stats_interval` seconds (daemon mode)
+    """
+    while True:
+        await asyncio.sleep(CONST['rpc_stats_interval'])
+        write_rpc_stats()
 
 async def main():
     """
-    Load all the needed modules, parse user args and check if the requested monitoring checks are
-    enabled, if so they will be called one by one
+    Parse user args and check if the requested monitoring checks are enabled, if so their modules
+    are imported (only the requested ones) and they will run concurrently and their results printed grouped by check (once, or
+    on each check's schedule in daemon mode)
     """
     try:
-        load_modules('scripts/')
         help_epilog = ',\n'.join([f'  {k}: {v}' for k, v in CHECKS_MAPPING.items()])
         parser = argparse.ArgumentParser(description='Pnetwork Monitoring v3',
                                          epilog=f'Possible checks are:\n{help_epilog}',
@@ -67,34 +162,64 @@ async def main():
         group.add_argument('-c', '--checks', nargs='+', help='choose the check/s to run')
         group.add_argument('-a', '--all', action='store_true', help='run all checks')
         parser.add_argument('-v', '--verbose', action='store_true', help='print check\'s labels')
+        parser.add_argument('-j', '--concurrency', type=int,
+                            help='max number of checks running at the same time')
+        parser.add_argument('-d', '--daemon', action='store_true',
+                            help='keep running the checks on their schedule (`CHECKS_SCHEDULE`)')
+        parser.add_argument('-m', '--metrics-port', type=int,
+                            help='serve the latest check results on http://<host>:<port>/metrics')
+        parser.add_argument('-o', '--output', choices=output.FORMATS, default='json',
+                            help='records format: indented json or ndjson (one compact record per line)')
+        parser.add_argument('--rpc-stats', action='store_true',
+                            help='write the RPC calls stats by endpoint, method and check and print their\n'
+                                 'summary on stderr (every `rpc_stats_interval` seconds in daemon mode)')
+        parser.add_argument('--import-times', action='store_true',
+                            help='print the startup and per check import times on stderr')
         parser.add_argument('--version', action='version', version=__version__, help='print version and exit')
         args = parser.parse_args()
         if args.all:
             list_of_checks = [str(k) for k, _ in CHECKS_MAPPING.items()]
         elif not args.all:
             list_of_checks = args.checks
-        missing_values_in_config = utils.is_value_missing_in_config()
+        missing_values_in_config = registry.is_value_missing_in_config()
         if missing_values_in_config:
             log.error(f'[!] Missing values in config: {", ".join(missing_values_in_config)}')
             sys.exit(1)
-        if utils.is_blocks_per_day_file_older_than_a_day():
-            await utils.dump_blocks_per_day_on_file()
         for check in list_of_checks:
-            if not utils.is_check_in_mapping(check):
+            if not registry.is_check_in_mapping(check):
                 log.error(f'[!] Error: check {check} does not exist')
                 sys.exit(1)
-            if check.isdigit():
-                check_name = CHECKS_MAPPING[int(check)]
-                if args.verbose:
-                    print(f'\n[+] Check `{check_name}` ({check}):\n')
+        if args.import_times:
+            print_import_times(list_of_checks)
+        asyncio.get_running_loop().set_default_executor(
+            ThreadPoolExecutor(max_workers=CONST['max_worker_threads']))
+        output.set_format(args.output)
+        if args.metrics_port:
+            metrics.start_server(args.metrics_port)
+        if args.concurrency is None:
+            # in daemon mode every check gets its own slot by default, so none waits for a slow one
+            args.concurrency = len(list_of_checks) if args.daemon else CONST['max_concurrent_checks']
+        semaphore = asyncio.Semaphore(max(args.concurrency, 1))
+        if not args.daemon:
+            from scripts import snapshot
+            # one snapshot for the whole run, inherited by the checks' tasks however long they wait for a slot
+            snapshot.start_run()
+        tasks = []
+        for check in list_of_checks:
+            check_name = registry.get_check_name(check)
+            if args.daemon:
+                tasks.append(asyncio.create_task(run_check_forever(check, check_name, semaphore, args.verbose)))
             else:
-                check_name = check
-                print(f'\n[+] Check `{check_name}`:')
-            mod = importlib.import_module(f'scripts.{check_name}')
-            func = getattr(mod, check_name)
-            func()
-            if args.verbose:
-                print('\n ##########################################\n')
+                tasks.append((check, check_name, asyncio.create_task(run_check(check_name, semaphore))))
+        if args.daemon:
+            if args.rpc_stats:
+                tasks.append(asyncio.create_task(write_rpc_stats_forever()))
+            await asyncio.gather(*tasks)
+        for check, check_name, task in tasks:
+            print_records(check, check_name, await task, args.verbose)
+        output.flush()
+        if args.rpc_stats:
+            write_rpc_stats()
     except Exception as e:
         log.error(f'[!] Error in main: {e}')
 
@@ -1 +0,0 @@
-__all__ = ['operation_cancelled', 'challenge_period_duration', 'queue_operations_with_threshold', 'challenge_status', 'nr_of_ops_in_queue', 'max_ops_in_queue', 'user_ops', 'ipfs_subpub_pnetwork_topics', 'components_balances', 'utils', 'slashed_actors', 'queue_op_after_user_op', 'inactive_actors_by_epoch']
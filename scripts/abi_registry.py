@@ -0,0 +1,171 @@
+import eth_abi
+import eth_abi.abi
+import eth_abi.grammar
+import eth_abi.registry
+import eth_utils
+import json
+import logging
+import os
+import threading
+
+from constants import CONST
+
+
+log = logging.getLogger()
+
+# (chain, lowercase address):abi file path, built once from the `abi/` directory listing
+_paths = None
+# (chain, lowercase address):parsed abi
+_abis = dict()
+# (chain, lowercase abi address, method, number of args):function spec
+_functions = dict()
+# (chain, lowercase address, lowercase abi address):contract handle
+_contracts = dict()
+_lock = threading.RLock()
+
+def index_abis():
+    """
+    List the `abi/` directory (only once per process) and index its files by chain and address
+
+    Returns:
+        (dict): (chain, lowercase address):abi file path dict
+    """
+    global _paths
+    with _lock:
+        if _paths is None:
+            abi_dir = os.path.dirname(CONST['abi_path']) or '.'
+            _paths = dict()
+            try:
+                for file_name in os.listdir(abi_dir):
+                    name, ext = os.path.splitext(file_name)
+                    if ext == '.json' and '_' in name:
+                        chain, addr = name.rsplit('_', 1)
+                        _paths[(chain, addr.lower())] = os.path.join(abi_dir, file_name)
+            except Exception as e:
+                log.error(f'[!] Error while indexing the abi directory: {e}')
+        return _paths
+
+def get_abi(chain, addr):
+    """
+    Get the parsed abi of a given contract (`abi/<chain>_<addr>.json`), read and parsed once
+
+    Args:
+        chain (str): chain name
+        addr (str): contract address
+
+    Returns:
+        abi (list): contract abi, [] if abi json missing
+    """
+    key = (chain, addr.lower())
+    with _lock:
+        if key not in _abis:
+            path = index_abis().get(key)
+            if path is None:
+                log.error(f'[!] Missing abi for {addr} on {chain}')
+                return []
+            with open(path, 'r') as f_abi_r:
+                _abis[key] = json.load(f_abi_r)
+        return _abis[key]
+
+def get_function(chain, abi_addr, method, nr_of_args):
+    """
+    Get the spec of a contract function: selector, input/output types and their
+    encoder/decoder, built once per (chain, abi address, method, number of args)
+
+    Args:
+        chain (str): chain name
+        abi_addr (str): abi address
+        method (str): method name
+        nr_of_args (int): number of args passed to the method
+
+    Returns:
+        (dict): `selector` (bytes), `input_types`, `output_types`, `parsed_output_types`,
+            `encoder` and `decoder` keys
+    """
+    key = (chain, abi_addr.lower(), method, nr_of_args)
+    with _lock:
+        if key not in _functions:
+            fn_abis = [entry for entry in get_abi(chain, abi_addr)
+                       if entry.get('type') == 'function' and entry['name'] == method
+                       and len(entry['inputs']) == nr_of_args]
+            if not fn_abis:
+                raise ValueError(f'{method} with {nr_of_args} args not found in {abi_addr} abi')
+            input_types = [eth_utils.collapse_if_tuple(arg) for arg in fn_abis[0]['inputs']]
+            output_types = [eth_utils.collapse_if_tuple(arg) for arg in fn_abis[0]['outputs']]
+            _functions[key] = {
+                'selector': eth_utils.function_abi_to_4byte_selector(fn_abis[0]),
+                'input_types': input_types,
+                'output_types': output_types,
+                'parsed_output_types': [eth_abi.grammar.parse(output_type) for output_type in output_types],
+                'encoder': eth_abi.registry.registry.get_tuple_encoder(*input_types),
+                'decoder': eth_abi.registry.registry.get_tuple_decoder(*output_types)
+            }
+        return _functions[key]
+
+def decode(function, data):
+    """
+    Decode the return data of a contract call with the function's cached decoder
+
+    Args:
+        function (dict): function spec (see `get_function`)
+        data (bytes): return data
+
+    Returns:
+        (tuple): decoded values
+    """
+    return function['decoder'](eth_abi.abi.default_codec.stream_class(data))
+
+class Contract:
+    def __init__(self, chain, addr, abi_addr):
+        """
+        Contract handle, encoding calls and decoding results with the registry's cached specs
+
+        Args:
+            chain (str): chain name
+            addr (str): checksum contract address
+            abi_addr (str): checksum abi address
+        """
+        self.chain = chain
+        self.addr = addr
+        self.abi_addr = abi_addr
+
+    def get_function(self, method, nr_of_args):
+        """
+        Get the spec of one of the contract's functions (see `get_function`)
+        """
+        return get_function(self.chain, self.abi_addr, method, nr_of_args)
+
+    def encode_call(self, method, method_args):
+        """
+        Encode the call data of a given method
+
+        Args:
+            method (str): method to call
+            method_args (list): list of args to pass
+
+        Returns:
+            calldata (str): hex encoded call data
+            function (dict): function spec, to decode the result with
+        """
+        function = self.get_function(method, len(method_args))
+        return eth_utils.encode_hex(function['selector'] + function['encoder'](method_args)), function
+
+def get_contract(chain, addr_unf, abi_addr_unf=None):
+    """
+    Get the (cached) handle of a contract, per (chain, address, abi address)
+
+    Args:
+        chain (str): chain name
+        addr_unf (str): unformatted contract address
+        abi_addr_unf (opt) (str): unformatted abi address, the contract address if not given
+
+    Returns:
+        (Contract): contract handle
+    """
+    key = (chain, addr_unf.lower(), (abi_addr_unf or addr_unf).lower())
+    contract = _contracts.get(key)
+    if contract is None:
+        addr = eth_utils.to_checksum_address(addr_unf)
+        abi_addr = eth_utils.to_checksum_address(abi_addr_unf) if abi_addr_unf else addr
+        contract = _contracts.setdefault(key, Contract(chain, addr, abi_addr))
+    return contract
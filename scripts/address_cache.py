@@ -0,0 +1,207 @@
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+
+from . import utils
+from config import RPC_ENDPOINTS
+from constants import CONST, FACTORY_ADDRS_DICT
+
+
+log = logging.getLogger()
+
+# node: (parent node, parent's method returning the node address)
+ADDRESS_GRAPH = {
+    'hub': ('factory', 'hub'),
+    'slasher': ('hub', 'slasher'),
+    'registrationManager': ('slasher', 'registrationManager'),
+    'governanceMessageEmitter': ('registrationManager', 'governanceMessageEmitter'),
+    'epochsManager': ('hub', 'epochsManager'),
+}
+
+# EIP-1967 proxies, their methods are called using the `<node>_impl` abi
+PROXY_NODES = ['registrationManager', 'epochsManager']
+
+_cache = None
+_cache_lock = threading.Lock()
+_chain_locks = dict()
+_revalidating = set()
+
+def get_cache_key(chain):
+    """
+    Get the cache key of a given chain, the factory address is part of it so a factory change
+    automatically invalidates the whole graph
+
+    Args:
+        chain (str): chain name
+
+    Returns:
+        (str): cache key
+    """
+    return f'{chain}:{FACTORY_ADDRS_DICT[chain]}'
+
+def load_cache():
+    """
+    Load the address graph cache from disk (only once per process)
+
+    Returns:
+        (dict): cache_key:entry dict, each entry has the `resolved_at` timestamp and the `addrs` dict
+    """
+    global _cache
+    if _cache is None:
+        try:
+            with open(CONST['addr_cache_path'], 'r') as f_cache:
+                _cache = json.load(f_cache)
+        except FileNotFoundError:
+            _cache = dict()
+        except Exception as e:
+            log.error(f'[!] Error while loading the address cache, starting from scratch: {e}')
+            _cache = dict()
+    return _cache
+
+def dump_cache():
+    """
+    Atomically dump the address graph cache on file
+    """
+    try:
+        with _cache_lock:
+            cache_dump = json.dumps(_cache, indent=4)
+        os.makedirs(os.path.dirname(CONST['addr_cache_path']), exist_ok=True)
+        tmp_path = f'{CONST["addr_cache_path"]}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'w') as f_cache:
+            f_cache.write(cache_dump)
+        os.replace(tmp_path, CONST['addr_cache_path'])
+    except Exception as e:
+        log.error(f'[!] Error while dumping the address cache: {e}')
+
+def get_chain_entry(chain):
+    """
+    Get (or create) the cache entry of a given chain
+
+    Args:
+        chain (str): chain name
+
+    Returns:
+        (dict): chain entry
+    """
+    with _cache_lock:
+        cache = load_cache()
+        key = get_cache_key(chain)
+        if key not in cache:
+            cache[key] = {'resolved_at': int(time.time()), 'addrs': {'factory': FACTORY_ADDRS_DICT[chain]}}
+        return cache[key]
+
+def get_chain_lock(chain):
+    """
+    Get the lock serializing the address discovery of a given chain
+
+    Args:
+        chain (str): chain name
+
+    Returns:
+        (Lock): chain lock
+    """
+    with _cache_lock:
+        if chain not in _chain_locks:
+            _chain_locks[chain] = threading.Lock()
+        return _chain_locks[chain]
+
+def resolve_addr(chain, name, addrs):
+    """
+    Walk the address graph up to a known node and resolve the requested one via RPC,
+    storing every discovered address in `addrs`
+
+    Args:
+        chain (str): chain name
+        name (str): graph node (`<node>_impl` for a proxy implementation)
+        addrs (dict): known node:address dict of the chain
+
+    Returns:
+        addr (str): node address, None if it can't be resolved
+    """
+    if name in addrs:
+        return addrs[name]
+    endpoint = RPC_ENDPOINTS[chain]
+    if name.endswith('_impl'):
+        proxy_addr = resolve_addr(chain, name[:-len('_impl')], addrs)
+        addr = utils.get_proxy_contract_impl_addr(proxy_addr, chain, endpoint) if proxy_addr else None
+    else:
+        parent, method = ADDRESS_GRAPH[name]
+        parent_addr = resolve_addr(chain, parent, addrs)
+        abi_addr = resolve_addr(chain, f'{parent}_impl', addrs) if parent in PROXY_NODES else None
+        addr = utils.call_contract_method(parent_addr, chain, endpoint, method,
+                                          abi_addr_unf=abi_addr) if parent_addr else None
+    if addr:
+        with _cache_lock:
+            addrs[name] = addr
+    return addr
+
+def revalidate_chain(chain):
+    """
+    Re-read the EIP-1967 `implementation_slot` of the cached proxies (and the factory's hub):
+    if anything changed, drop the chain's graph so it will be discovered again, otherwise
+    extend its validity
+
+    Args:
+        chain (str): chain name
+    """
+    try:
+        endpoint = RPC_ENDPOINTS[chain]
+        entry = get_chain_entry(chain)
+        with get_chain_lock(chain):
+            addrs = dict(entry['addrs'])
+            is_changed = False
+            if 'hub' in addrs:
+                hub_addr = utils.call_contract_method(addrs['factory'], chain, endpoint, 'hub')
+                if hub_addr is None:
+                    return
+                is_changed |= hub_addr.lower() != addrs['hub'].lower()
+            for proxy in PROXY_NODES:
+                if not is_changed and proxy in addrs and f'{proxy}_impl' in addrs:
+                    impl_addr = utils.get_proxy_contract_impl_addr(addrs[proxy], chain, endpoint)
+                    if impl_addr is None:
+                        return
+                    is_changed |= impl_addr.lower() != addrs[f'{proxy}_impl'].lower()
+            with _cache_lock:
+                if is_changed:
+                    log.error(f'[!] Contract addresses changed on {chain}, address cache invalidated')
+                    entry['addrs'] = {'factory': FACTORY_ADDRS_DICT[chain]}
+                entry['resolved_at'] = int(time.time())
+        dump_cache()
+    except Exception as e:
+        log.error(f'[!] Error while revalidating the address cache for {chain}: {e}')
+    finally:
+        with _cache_lock:
+            _revalidating.discard(chain)
+
+def get_addr(chain, name):
+    """
+    Get a contract address from the address graph cache, resolving it (and its parents)
+    on a miss. Expired entries are still served while being revalidated in background
+
+    Args:
+        chain (str): chain name
+        name (str): graph node (see ADDRESS_GRAPH), `<node>_impl` for a proxy implementation
+
+    Returns:
+        addr (str): contract address, None if it can't be resolved
+    """
+    try:
+        entry = get_chain_entry(chain)
+        if name in entry['addrs']:
+            with _cache_lock:
+                is_expired = time.time() - entry['resolved_at'] > CONST['addr_cache_ttl']
+                if is_expired and chain not in _revalidating:
+                    _revalidating.add(chain)
+                    threading.Thread(target=contextvars.copy_context().run, args=(revalidate_chain, chain),
+                                     daemon=True).start()
+            return entry['addrs'][name]
+        with get_chain_lock(chain):
+            addr = resolve_addr(chain, name, entry['addrs'])
+        if addr:
+            dump_cache()
+        return addr
+    except Exception as e:
+        log.error(f'[!] Error while getting {name} address for {chain}: {e}')
@@ -0,0 +1,246 @@
+import logging
+import threading
+import time
+
+from . import db, transport
+from collections import OrderedDict
+from constants import CHAIN_CONFIRMATIONS, CONST
+
+
+log = logging.getLogger()
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS block_timestamps (
+    chain TEXT NOT NULL,
+    block_number INTEGER NOT NULL,
+    timestamp INTEGER NOT NULL,
+    PRIMARY KEY (chain, block_number)
+);
+CREATE INDEX IF NOT EXISTS block_timestamps_by_ts ON block_timestamps (chain, timestamp, block_number);
+'''
+
+# confirmed blocks, (chain, block number):timestamp in LRU order, backed by disk
+_confirmed = OrderedDict()
+# head-adjacent blocks, (chain, block number):(timestamp, cached at), memory only and short lived
+_unconfirmed = dict()
+_heads = dict()
+_lock = threading.Lock()
+
+def set_head(chain, block_number):
+    """
+    Record the latest known head of a given chain, used to tell confirmed blocks apart
+
+    Args:
+        chain (str): chain name
+        block_number (int): head block number
+    """
+    with _lock:
+        _heads[chain] = max(_heads.get(chain, 0), block_number)
+
+def is_confirmed(chain, block_number):
+    """
+    Check if a block is deep enough (`CHAIN_CONFIRMATIONS`) to never be reorged
+
+    Args:
+        chain (str): chain name
+        block_number (int): block number
+
+    Returns:
+        (bool): True if confirmed, False if head-adjacent (or the head is unknown)
+    """
+    return chain in _heads and block_number <= _heads[chain] - CHAIN_CONFIRMATIONS[chain]
+
+def get_cached_timestamps(chain, block_numbers):
+    """
+    Get the timestamps of the given blocks from memory (confirmed LRU or unexpired
+    head-adjacent entries)
+
+    Args:
+        chain (str): chain name
+        block_numbers (list): block numbers
+
+    Returns:
+        blocks_ts (dict): block number:timestamp dict of the cached blocks
+    """
+    blocks_ts = dict()
+    now = time.time()
+    with _lock:
+        for block_number in block_numbers:
+            key = (chain, block_number)
+            if key in _confirmed:
+                _confirmed.move_to_end(key)
+                blocks_ts[block_number] = _confirmed[key]
+            elif key in _unconfirmed and now - _unconfirmed[key][1] < CONST['block_cache_head_ttl']:
+                blocks_ts[block_number] = _unconfirmed[key][0]
+    return blocks_ts
+
+def cache_timestamps(chain, blocks_ts, is_from_disk=False):
+    """
+    Cache block timestamps: confirmed blocks go in the LRU (and on disk), head-adjacent
+    blocks in the short lived memory cache
+
+    Args:
+        chain (str): chain name
+        blocks_ts (dict): block number:timestamp dict
+        is_from_disk (opt) (bool): True if the timestamps were just read from disk
+    """
+    now = time.time()
+    confirmed_rows = []
+    with _lock:
+        for block_number, ts in blocks_ts.items():
+            key = (chain, block_number)
+            if is_confirmed(chain, block_number):
+                _confirmed[key] = ts
+                _confirmed.move_to_end(key)
+                _unconfirmed.pop(key, None)
+                confirmed_rows.append((chain, block_number, ts))
+            else:
+                _unconfirmed[key] = (ts, now)
+        while len(_confirmed) > CONST['block_cache_size']:
+            _confirmed.popitem(last=False)
+        for key in [key for key, (_, cached_at) in _unconfirmed.items()
+                    if now - cached_at >= CONST['block_cache_head_ttl']]:
+            del _unconfirmed[key]
+    if confirmed_rows and not is_from_disk:
+        conn = db.get_connection(SCHEMA)
+        with conn:
+            conn.executemany('INSERT OR REPLACE INTO block_timestamps VALUES (?, ?, ?)', confirmed_rows)
+
+def get_block_timestamps(chain, endpoint, block_numbers):
+    """
+    Get the timestamps of the given blocks from the cache (memory, then disk for confirmed
+    blocks), fetching the missing ones with a single batch request
+
+    Args:
+        chain (str): chain name
+        endpoint (str): endpoint of the given chain
+        block_numbers (list): block numbers
+
+    Returns:
+        blocks_ts (dict): block number:timestamp dict, failed blocks are missing
+    """
+    block_numbers = list(dict.fromkeys(block_numbers))
+    blocks_ts = get_cached_timestamps(chain, block_numbers)
+    missing = [block_number for block_number in block_numbers
+               if block_number not in blocks_ts and is_confirmed(chain, block_number)]
+    if missing:
+        conn = db.get_connection(SCHEMA)
+        disk_blocks_ts = dict()
+        for i in range(0, len(missing), 500):
+            chunk = missing[i:i + 500]
+            disk_blocks_ts.update(conn.execute(
+                f'SELECT block_number, timestamp FROM block_timestamps WHERE chain = ? '
+                f'AND block_number IN ({",".join("?" * len(chunk))})', [chain] + chunk).fetchall())
+        cache_timestamps(chain, disk_blocks_ts, is_from_disk=True)
+        blocks_ts.update(disk_blocks_ts)
+    missing = [block_number for block_number in block_numbers if block_number not in blocks_ts]
+    if missing:
+        fetched_blocks_ts = dict()
+        responses = transport.rpc_batch(endpoint, [('eth_getBlockByNumber', [hex(block_number), False])
+                                                   for block_number in missing])
+        for block_number, res in zip(missing, responses):
+            if 'result' in res and res['result']:
+                fetched_blocks_ts[block_number] = int(res['result']['timestamp'], 16)
+            else:
+                log.error(f'[!] Error while getting block timestamp for {block_number} on {chain}: '
+                          f'{res.get("error")}')
+        cache_timestamps(chain, fetched_blocks_ts)
+        blocks_ts.update(fetched_blocks_ts)
+    return blocks_ts
+
+def fetch_head(chain, endpoint):
+    """
+    Fetch the current head of a chain and cache it, along with its timestamp
+
+    Args:
+        chain (str): chain name
+        endpoint (str): endpoint of the given chain
+
+    Returns:
+        (tuple): (block number, timestamp) of the head
+    """
+    res = transport.rpc_request(endpoint, 'eth_getBlockByNumber', ['latest', False])
+    block_number, ts = int(res['result']['number'], 16), int(res['result']['timestamp'], 16)
+    set_head(chain, block_number)
+    cache_timestamps(chain, {block_number: ts})
+    return block_number, ts
+
+def get_anchors(chain, ts):
+    """
+    Get the closest known blocks around a timestamp, from disk and from the head-adjacent cache
+
+    Args:
+        chain (str): chain name
+        ts (int): timestamp
+
+    Returns:
+        lo (tuple): (block number, timestamp) of the last known block before `ts`, None if unknown
+        hi (tuple): (block number, timestamp) of the first known block at or after `ts`, None if unknown
+    """
+    conn = db.get_connection(SCHEMA)
+    lo = conn.execute('SELECT block_number, timestamp FROM block_timestamps WHERE chain = ? AND timestamp < ? '
+                      'ORDER BY timestamp DESC, block_number DESC LIMIT 1', (chain, ts)).fetchone()
+    hi = conn.execute('SELECT block_number, timestamp FROM block_timestamps WHERE chain = ? AND timestamp >= ? '
+                      'ORDER BY timestamp, block_number LIMIT 1', (chain, ts)).fetchone()
+    with _lock:
+        head_blocks = [(block_number, block_ts) for (block_chain, block_number), (block_ts, _)
+                       in _unconfirmed.items() if block_chain == chain]
+    for block_number, block_ts in head_blocks:
+        if block_ts < ts and (lo is None or block_number > lo[0]):
+            lo = (block_number, block_ts)
+        elif block_ts >= ts and (hi is None or block_number < hi[0]):
+            hi = (block_number, block_ts)
+    return lo, hi
+
+def get_block_by_timestamp(chain, endpoint, ts, head=None):
+    """
+    Get the first block with a timestamp at or after `ts`, with an interpolation-guided binary
+    search between the closest cached (block, timestamp) anchors. Every probed block is cached,
+    so it becomes an anchor for the next lookups (no RPC at all once the answer's neighbours are known)
+
+    Args:
+        chain (str): chain name
+        endpoint (str): endpoint of the given chain
+        ts (int): timestamp
+        head (opt) (tuple): (block number, timestamp) of a known head, used as the upper anchor
+
+    Returns:
+        block_number (int): first block at or after `ts`, raises if no block reached `ts` yet
+    """
+    lo, hi = get_anchors(chain, ts)
+    if head and head[1] >= ts and (hi is None or head[0] < hi[0]):
+        hi = head
+    if hi is None:
+        # `ts` is after every cached block, the current head is the only upper bound left
+        hi = fetch_head(chain, endpoint)
+        if hi[1] < ts:
+            raise ValueError(f'no block at or after {ts} on {chain} yet, head {hi[0]} is at {hi[1]}')
+    step = CONST['block_resolver_sample']
+    while lo is None:
+        # no anchor before `ts`, step back from `hi` extrapolating the block time seen so far
+        sample = max(hi[0] - step, 0)
+        sample_ts = get_block_timestamps(chain, endpoint, [sample])[sample]
+        if sample_ts < ts:
+            lo = (sample, sample_ts)
+        elif sample == 0:
+            return sample
+        else:
+            block_time = (hi[1] - sample_ts) / (hi[0] - sample)
+            hi = (sample, sample_ts)
+            step = max(int((hi[1] - ts) / block_time * 1.5) if block_time else 0, step * 2)
+    is_bisecting = False
+    while hi[0] - lo[0] > 1:
+        if is_bisecting or hi[1] == lo[1]:
+            probe = (lo[0] + hi[0]) // 2
+        else:
+            probe = lo[0] + int((ts - lo[1]) * (hi[0] - lo[0]) / (hi[1] - lo[1]))
+        probe = min(max(probe, lo[0] + 1), hi[0] - 1)
+        probe_ts = get_block_timestamps(chain, endpoint, [probe])[probe]
+        nr_of_blocks = hi[0] - lo[0]
+        if probe_ts < ts:
+            lo = (probe, probe_ts)
+        else:
+            hi = (probe, probe_ts)
+        # fall back to a bisection step whenever the interpolation did not halve the interval
+        is_bisecting = not is_bisecting and hi[0] - lo[0] > nr_of_blocks // 2
+    return hi[0]
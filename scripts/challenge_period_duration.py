@@ -1,38 +1,48 @@
-import json
+import eth_utils
 import logging
 import time
 
-from . import utils
-from config import RPC_ENDPOINTS
-from web3 import Web3
+from . import address_cache, utils
 
 
 log = logging.getLogger()
 
-def challenge_period_duration():
+def get_challenge_period_duration_by_chain(chain, endpoint):
     """
-    Loop endpoints list, call each factory contract
+    Get the hub address of the given chain and the results from its `getCurrentChallengePeriodDuration` method
+
+    Args:
+        chain (str): chain name
+        endpoint (str): endpoint of the given chain
+
+    Returns:
+        (list): check's records for the given chain
+    """
+    try:
+        hub_addr_unf = address_cache.get_addr(chain, 'hub')
+        hub_addr = eth_utils.to_checksum_address(hub_addr_unf)
+        challenge_period_duration = utils.call_contract_method(hub_addr, chain, endpoint, 'getCurrentChallengePeriodDuration')
+        return [{
+            'title': 'challenge_period_duration',
+            'timestamp': int(time.time()),
+            'chain': chain,
+            'challenge_period_duration': challenge_period_duration,
+        }]
+    except Exception as e:
+        log.error(f'[!] Error while checking challenge period duration: {e}')
+        return [{
+            'title': 'challenge_period_duration',
+            'timestamp': int(time.time()),
+            'chain': chain,
+            'error': str(e)
+        }]
+
+async def challenge_period_duration():
+    """
+    Loop endpoints list, call each factory contract concurrently
     and get results from `getCurrentChallengePeriodDuration` method
+
+    Returns:
+        (list): check's records, one per chain
     """
-    hub_addr_list = utils.get_hub_addr_from_factory_list()
-    for chain, endpoint in RPC_ENDPOINTS.items():
-        try:
-            hub_addr_unf = [addr for addr in hub_addr_list if addr['chain'] == chain][0]['addr']
-            hub_addr = Web3.to_checksum_address(hub_addr_unf)
-            challenge_period_duration = utils.call_contract_method(hub_addr, chain, endpoint,
-                                                                   'getCurrentChallengePeriodDuration')
-            log.info(json.dumps({
-                'title': 'challenge_period_duration',
-                'timestamp': int(time.time()),
-                'chain': chain,
-                'challenge_period_duration': challenge_period_duration,
-            }, indent=4))
-        except Exception as e:
-            log.error(f'[!] Error while checking challenge period duration: {e}')
-            log.info(json.dumps({
-                'title': 'challenge_period_duration',
-                'timestamp': int(time.time()),
-                'chain': chain,
-                'error': str(e)
-            }, indent=4))
-            continue
+    return await utils.gather_by_chain(get_challenge_period_duration_by_chain)
@@ -1,4 +1,9 @@
-def challenge_status():
+import logging
+
+
+log = logging.getLogger()
+
+async def challenge_status():
     """
         struct Challenge {
             uint256 nonce;
@@ -9,4 +14,5 @@ def challenge_status():
             bytes4 networkId;
         }
     """
-    print('tbi')
+    log.debug('[+] Check `challenge_status` is not implemented yet')
+    return []
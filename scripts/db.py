@@ -0,0 +1,61 @@
+import logging
+import os
+import sqlite3
+import threading
+
+from constants import CONST
+
+
+log = logging.getLogger()
+
+_local = threading.local()
+# set once `cache_db_path` failed to open, every thread then caches in its own in-memory database
+_is_in_memory = False
+_lock = threading.Lock()
+
+def connect():
+    """
+    Open a connection to the local cache database (SQLite, WAL mode). If `cache_db_path` can't be
+    opened for writing (read-only filesystem, missing permissions), the error is logged once and
+    the caches are kept in memory instead, per thread and for the lifetime of the process
+
+    Returns:
+        conn (Connection): sqlite3 connection
+    """
+    global _is_in_memory
+    with _lock:
+        if not _is_in_memory:
+            try:
+                os.makedirs(os.path.dirname(CONST['cache_db_path']), exist_ok=True)
+                conn = sqlite3.connect(CONST['cache_db_path'], timeout=CONST['cache_db_timeout'])
+                conn.execute('PRAGMA journal_mode=WAL')
+                conn.execute('PRAGMA synchronous=NORMAL')
+                # a read-only database only fails on the first write, take the write lock once to find out
+                conn.execute('BEGIN IMMEDIATE')
+                conn.rollback()
+                return conn
+            except (OSError, sqlite3.Error) as e:
+                log.error(f'[!] Error while opening the cache database {CONST["cache_db_path"]}, '
+                          f'caching in memory instead: {e}')
+                _is_in_memory = True
+    return sqlite3.connect(':memory:')
+
+def get_connection(schema=None):
+    """
+    Get the calling thread's connection to the local cache database (see `connect`),
+    creating it on first use
+
+    Args:
+        schema (opt) (str): SQL script creating the caller's tables, run once per connection
+
+    Returns:
+        conn (Connection): sqlite3 connection
+    """
+    conn = getattr(_local, 'conn', None)
+    if conn is None:
+        conn = _local.conn = connect()
+        _local.schemas = set()
+    if schema and schema not in _local.schemas:
+        conn.executescript(schema)
+        _local.schemas.add(schema)
+    return conn
@@ -0,0 +1,233 @@
+import eth_abi
+import eth_abi.grammar
+import eth_utils
+import logging
+import multiprocessing
+import os
+import threading
+
+from concurrent.futures import ProcessPoolExecutor
+from constants import CONST
+from itertools import repeat
+
+
+log = logging.getLogger()
+
+# known event layouts: `topics` (name, type) of the indexed fields, `types`/`names` of the data fields
+# (the non indexed ones), `is_tuple` if the data is a single (dynamic) struct, so its fields start
+# after the tuple's offset word
+EVENT_LAYOUTS = {
+    'actor_slashed': {
+        'topics': [('epoch', 'uint16'), ('actor', 'address')],
+        'types': [],
+        'names': [],
+        'is_tuple': False
+    },
+    'actors_propagated': {
+        'topics': [],
+        'types': ['address[]', 'address[]'],
+        'names': ['actors', 'actorsTypes'],
+        'is_tuple': False
+    },
+    'operation_queued': {
+        'topics': [],
+        'types': ['bytes32', 'bytes32', 'bytes32', 'uint256', 'uint256',
+                  'uint256', 'uint256', 'uint256', 'uint256', 'address',
+                  'bytes4', 'bytes4', 'bytes4', 'bytes4', 'string', 'string',
+                  'string', 'string', 'bytes', 'bool'],
+        'names': ['originBlockHash', 'originTransactionHash', 'optionsMask', 'nonce', 'underlyingAssetDecimals',
+                  'assetAmount', 'userDataProtocolFeeAssetAmount', 'networkFeeAssetAmount',
+                  'forwardNetworkFeeAssetAmount', 'underlyingAssetTokenAddress',
+                  'originNetworkId', 'destinationNetworkId', 'forwardDestinationNetworkId', 'underlyingAssetNetworkId',
+                  'originAccount', 'destinationAccount', 'underlyingAssetName', 'underlyingAssetSymbol',
+                  'userData', 'isForProtocol'],
+        'is_tuple': True
+    }
+}
+
+# event:field name:(word index, abi type, is dynamic) dict
+_fields = {
+    event: {name: (i, abi_type, eth_abi.grammar.parse(abi_type).is_dynamic)
+            for i, (name, abi_type) in enumerate(zip(layout['names'], layout['types']))}
+    for event, layout in EVENT_LAYOUTS.items()
+}
+# event:indexed field name:(topic index, abi type) dict
+_topic_fields = {
+    event: {name: (i + 1, abi_type) for i, (name, abi_type) in enumerate(layout['topics'])}
+    for event, layout in EVENT_LAYOUTS.items()
+}
+_pool = None
+_pool_lock = threading.Lock()
+
+def decode_word(abi_type, word):
+    """
+    Decode a static value from its 32 bytes word (as 64 hex chars)
+
+    Args:
+        abi_type (str): static abi type
+        word (str): hex word, not prefixed
+
+    Returns:
+        decoded value, bytesN as 0x prefixed hex strings
+    """
+    if abi_type.startswith('uint'):
+        return int(word, 16)
+    if abi_type.startswith('int'):
+        value = int(word, 16)
+        return value - (1 << 256) if value >= 1 << 255 else value
+    if abi_type == 'address':
+        return eth_utils.to_checksum_address(f'0x{word[24:]}')
+    if abi_type == 'bool':
+        return int(word, 16) != 0
+    if abi_type.startswith('bytes'):
+        return f'0x{word[:2 * int(abi_type[5:])].lower()}'
+    raise ValueError(f'{abi_type} is not a static type')
+
+def normalize_value(abi_type, value):
+    """
+    Normalize a value decoded by `eth_abi` the same way `decode_word` does (bytes as hex strings,
+    checksum addresses)
+
+    Args:
+        abi_type (str): abi type
+        value: decoded value
+
+    Returns:
+        normalized value
+    """
+    if isinstance(value, bytes):
+        return eth_utils.encode_hex(value)
+    if abi_type == 'address':
+        return eth_utils.to_checksum_address(value)
+    return value
+
+def decode_all_fields(event, data):
+    """
+    Fully decode the data of a known event with `eth_abi`
+
+    Args:
+        event (str): event name (see `EVENT_LAYOUTS`)
+        data (str): hex log data
+
+    Returns:
+        (dict): field name:value dict
+    """
+    layout = EVENT_LAYOUTS[event]
+    if layout['is_tuple']:
+        values = eth_abi.decode([f'({",".join(layout["types"])})'], eth_utils.decode_hex(data))[0]
+    else:
+        values = eth_abi.decode(layout['types'], eth_utils.decode_hex(data))
+    return {name: normalize_value(abi_type, value)
+            for name, abi_type, value in zip(layout['names'], layout['types'], values)}
+
+def decode_fields(event, data, fields):
+    """
+    Decode only the given fields of a known event, reading the static ones straight from their
+    word offsets in the hex log data (nothing else is decoded). If a dynamic field (string, bytes,
+    arrays) is requested, the whole data is decoded with `eth_abi`
+
+    Args:
+        event (str): event name (see `EVENT_LAYOUTS`)
+        data (str): hex log data
+        fields (list): field names
+
+    Returns:
+        (dict): field name:value dict, bytes values as 0x prefixed hex strings
+    """
+    layout_fields = _fields[event]
+    if any(layout_fields[field][2] for field in fields):
+        all_fields = decode_all_fields(event, data)
+        return {field: all_fields[field] for field in fields}
+    start = 2 if data.startswith('0x') else 0
+    if EVENT_LAYOUTS[event]['is_tuple']:
+        start += 2 * int(data[start:start + 64], 16)
+    decoded_fields = dict()
+    for field in fields:
+        i, abi_type, _ = layout_fields[field]
+        offset = start + 64 * i
+        decoded_fields[field] = decode_word(abi_type, data[offset:offset + 64])
+    return decoded_fields
+
+def decode_log(event, topics, data, fields):
+    """
+    Decode the given fields (indexed or not) of a known event's log
+
+    Args:
+        event (str): event name (see `EVENT_LAYOUTS`)
+        topics (list): log topics
+        data (str): hex log data
+        fields (list): field names
+
+    Returns:
+        (dict): field name:value dict, in the same order as `fields`
+    """
+    topic_fields = _topic_fields[event]
+    data_fields = [field for field in fields if field not in topic_fields]
+    decoded_data_fields = decode_fields(event, data, data_fields) if data_fields else dict()
+    decoded_fields = dict()
+    for field in fields:
+        if field in topic_fields:
+            i, abi_type = topic_fields[field]
+            decoded_fields[field] = decode_word(abi_type, topics[i][2:])
+        else:
+            decoded_fields[field] = decoded_data_fields[field]
+    return decoded_fields
+
+def decode_batch(event, items, fields):
+    """
+    Decode a batch of logs (run inline or on a worker process)
+
+    Args:
+        event (str): event name (see `EVENT_LAYOUTS`)
+        items (list): list of (topics, data) tuples
+        fields (list): field names
+
+    Returns:
+        (list): decoded logs, in the same order
+    """
+    return [decode_log(event, topics, data, fields) for topics, data in items]
+
+def get_nr_of_workers():
+    """
+    Get the number of decoding processes (`decode_workers`, all the cpus if 0)
+
+    Returns:
+        (int): number of processes
+    """
+    return CONST['decode_workers'] or os.cpu_count() or 1
+
+def get_pool():
+    """
+    Get the decoding process pool, created on first use and kept for the following decodes.
+    Workers are spawned (not forked) since the main process runs several threads
+
+    Returns:
+        (ProcessPoolExecutor): process pool
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=get_nr_of_workers(),
+                                        mp_context=multiprocessing.get_context('spawn'))
+        return _pool
+
+def decode_logs(event, logs, fields):
+    """
+    Decode the given fields of a list of logs of a known event. Large lists (at least
+    `decode_parallel_min_logs` logs) are split in batches of `decode_batch_size` logs decoded
+    on a process pool, smaller ones are decoded inline
+
+    Args:
+        event (str): event name (see `EVENT_LAYOUTS`)
+        logs (list): raw logs
+        fields (list): field names
+
+    Returns:
+        (list): decoded logs (field name:value dicts), in the same order as `logs`
+    """
+    items = [(tx['topics'], tx['data']) for tx in logs]
+    if len(items) < CONST['decode_parallel_min_logs'] or get_nr_of_workers() < 2:
+        return decode_batch(event, items, fields)
+    batches = [items[i:i + CONST['decode_batch_size']] for i in range(0, len(items), CONST['decode_batch_size'])]
+    results = get_pool().map(decode_batch, repeat(event), batches, repeat(fields))
+    return [decoded_log for batch in results for decoded_log in batch]
@@ -0,0 +1,190 @@
+import json
+import logging
+import threading
+import time
+
+from . import db, log_scanner
+from constants import CHAIN_CONFIRMATIONS, CONST
+
+
+log = logging.getLogger()
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS logs (
+    chain TEXT NOT NULL,
+    address TEXT NOT NULL,
+    topic0 TEXT NOT NULL,
+    block_number INTEGER NOT NULL,
+    log_index INTEGER NOT NULL,
+    tx_hash TEXT NOT NULL,
+    log TEXT NOT NULL,
+    PRIMARY KEY (chain, tx_hash, log_index)
+);
+CREATE INDEX IF NOT EXISTS logs_by_topic ON logs (chain, address, topic0, block_number);
+CREATE TABLE IF NOT EXISTS log_cursors (
+    chain TEXT NOT NULL,
+    address TEXT NOT NULL,
+    topic0 TEXT NOT NULL,
+    from_block INTEGER NOT NULL,
+    to_block INTEGER NOT NULL,
+    PRIMARY KEY (chain, address, topic0)
+);
+'''
+
+_locks = dict()
+_locks_lock = threading.Lock()
+_refreshed_at = dict()
+
+def get_lock(chain, addr):
+    """
+    Get the lock serializing the updates of a given contract's cursors
+
+    Args:
+        chain (str): chain name
+        addr (str): contract address
+
+    Returns:
+        (Lock): contract lock
+    """
+    with _locks_lock:
+        key = (chain, addr)
+        if key not in _locks:
+            _locks[key] = threading.Lock()
+        return _locks[key]
+
+def get_cursor(conn, chain, addr, topic0):
+    """
+    Get the indexed block range of a given (chain, address, topic0)
+
+    Args:
+        conn (Connection): sqlite3 connection
+        chain (str): chain name
+        addr (str): lowercase contract address
+        topic0 (str): event's topic
+
+    Returns:
+        (tuple): (from_block, to_block), None if nothing is indexed yet
+    """
+    return conn.execute('SELECT from_block, to_block FROM log_cursors WHERE chain = ? AND address = ? AND topic0 = ?',
+                        (chain, addr, topic0)).fetchone()
+
+def store_logs(conn, chain, addr, topic0, fetched_ranges, cursor):
+    """
+    Replace the stored logs of each fetched block range with the fetched ones, move the cursor
+    and prune the logs older than the cursor's start, in a single transaction
+
+    Args:
+        conn (Connection): sqlite3 connection
+        chain (str): chain name
+        addr (str): lowercase contract address
+        topic0 (str): event's topic
+        fetched_ranges (list): list of (from block, to block, fetched logs) tuples
+        cursor (tuple): new (from_block, to_block) indexed range
+    """
+    with conn:
+        conn.execute('DELETE FROM logs WHERE chain = ? AND address = ? AND topic0 = ? AND block_number < ?',
+                     (chain, addr, topic0, cursor[0]))
+        for _from, to, logs in fetched_ranges:
+            conn.execute('DELETE FROM logs WHERE chain = ? AND address = ? AND topic0 = ? '
+                         'AND block_number BETWEEN ? AND ?', (chain, addr, topic0, _from, to))
+            conn.executemany('INSERT OR REPLACE INTO logs VALUES (?, ?, ?, ?, ?, ?, ?)', [
+                (chain, addr, topic0, int(tx['blockNumber'], 16), int(tx['logIndex'], 16),
+                 tx['transactionHash'], json.dumps(tx)) for tx in logs
+            ])
+        conn.execute('INSERT OR REPLACE INTO log_cursors VALUES (?, ?, ?, ?, ?)',
+                     (chain, addr, topic0, cursor[0], cursor[1]))
+
+def get_missing_ranges(chain, addr, topic0, cursor, _from, to):
+    """
+    Get the block ranges of a given topic0 that must be fetched to cover `_from`-`to`, along
+    with the resulting cursor. The last `CHAIN_CONFIRMATIONS` blocks before the previous head are
+    fetched again (to replace reorged logs), unless refreshed less than `event_store_refresh_interval`
+    seconds ago and already at `to`. The cursor's start (below which logs are pruned) never moves
+    forward by more than its end did, so a bogus range can't wipe the indexed history
+
+    Args:
+        chain (str): chain name
+        addr (str): lowercase contract address
+        topic0 (str): event's topic
+        cursor (tuple): current (from_block, to_block) indexed range, None if nothing is indexed
+        _from (int): start block
+        to (int): end block (included)
+
+    Returns:
+        fetch_ranges (list): list of (from block, to block) tuples
+        new_cursor (tuple): (from_block, to_block) indexed range once fetched
+    """
+    if cursor is not None:
+        _from = min(_from, cursor[0] + max(to - cursor[1], 0))
+    if cursor is None or cursor[1] < _from - 1 or cursor[0] > to:
+        return [(_from, to)], (_from, to)
+    fetch_ranges = []
+    if _from < cursor[0]:
+        fetch_ranges.append((_from, cursor[0] - 1))
+    is_fresh = (cursor[1] >= to and
+                time.time() - _refreshed_at.get((chain, addr, topic0), 0) < CONST['event_store_refresh_interval'])
+    refetch_from = max(cursor[1] - CHAIN_CONFIRMATIONS[chain] + 1, cursor[0], _from)
+    if refetch_from <= to and not is_fresh:
+        fetch_ranges.append((refetch_from, to))
+    return fetch_ranges, (_from, max(to, cursor[1]))
+
+def merge_ranges(ranges):
+    """
+    Merge overlapping (or adjacent) block ranges
+
+    Args:
+        ranges (list): list of (from block, to block) tuples
+
+    Returns:
+        merged_ranges (list): sorted list of disjoint (from block, to block) tuples
+    """
+    merged_ranges = []
+    for _from, to in sorted(ranges):
+        if merged_ranges and _from <= merged_ranges[-1][1] + 1:
+            merged_ranges[-1] = (merged_ranges[-1][0], max(merged_ranges[-1][1], to))
+        else:
+            merged_ranges.append((_from, to))
+    return merged_ranges
+
+def get_logs_by_topics(addr, chain, url, topics0, _from, to):
+    """
+    Get the logs of a set of topic0 emitted by the same contract within a block range from the
+    local event store. The blocks missing for any of the topics are fetched once for all of them
+    (a single topic0 OR-set scan) and the results are demultiplexed by topic
+
+    Args:
+        addr (str): contract address
+        chain (str): chain name
+        url (str): endpoint url
+        topics0 (list): events' topics
+        _from (int): start block
+        to (int): end block (included)
+
+    Returns:
+        logs_by_topic (dict): topic0:logs dict, logs in block order
+    """
+    addr = addr.lower()
+    conn = db.get_connection(SCHEMA)
+    logs_by_topic = dict()
+    with get_lock(chain, addr):
+        new_cursors = dict()
+        missing_ranges = []
+        for topic0 in topics0:
+            fetch_ranges, new_cursors[topic0] = get_missing_ranges(chain, addr, topic0,
+                                                                   get_cursor(conn, chain, addr, topic0), _from, to)
+            missing_ranges += fetch_ranges
+        topic_filter = [topics0[0]] if len(topics0) == 1 else [list(topics0)]
+        fetched_ranges = [(fetch_from, fetch_to, log_scanner.scan_logs(addr, url, topic_filter, fetch_from, fetch_to))
+                          for fetch_from, fetch_to in merge_ranges(missing_ranges)]
+        is_head_fetched = any(fetch_to == to for fetch_from, fetch_to, _ in fetched_ranges)
+        for topic0 in topics0:
+            topic_fetched_ranges = [(fetch_from, fetch_to, [tx for tx in logs if tx['topics'][0] == topic0])
+                                    for fetch_from, fetch_to, logs in fetched_ranges]
+            store_logs(conn, chain, addr, topic0, topic_fetched_ranges, new_cursors[topic0])
+            if is_head_fetched:
+                _refreshed_at[(chain, addr, topic0)] = time.time()
+            rows = conn.execute('SELECT log FROM logs WHERE chain = ? AND address = ? AND topic0 = ? '
+                                'AND block_number BETWEEN ? AND ? ORDER BY block_number, log_index',
+                                (chain, addr, topic0, _from, to)).fetchall()
+            logs_by_topic[topic0] = [json.loads(row[0]) for row in rows]
+    return logs_by_topic
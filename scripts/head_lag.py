@@ -0,0 +1,81 @@
+import asyncio
+import logging
+import time
+
+from . import block_cache, heartbeats
+from config import RPC_ENDPOINTS
+from constants import CONST, HEAD_LAG_MAX_BLOCKS
+
+
+log = logging.getLogger()
+
+# chain:{block, timestamp, fetched_at} dict, refreshed every `head_refresh_interval` seconds
+_heads = dict()
+
+def refresh_heads():
+    """
+    Poll the latest block of every chain (once per chain) and update the head cache
+    """
+    for chain, endpoint in RPC_ENDPOINTS.items():
+        try:
+            block, ts = block_cache.fetch_head(chain, endpoint)
+            _heads[chain] = {
+                'block': block,
+                'timestamp': ts,
+                'fetched_at': time.time()
+            }
+        except Exception as e:
+            log.error(f'[!] Error while refreshing the head of {chain}: {e}')
+
+async def refresh_heads_forever():
+    """
+    Refresh the head cache every `head_refresh_interval` seconds, whatever the heartbeats rate
+    """
+    while True:
+        await asyncio.to_thread(refresh_heads)
+        await asyncio.sleep(CONST['head_refresh_interval'])
+
+def get_head(chain):
+    """
+    Get the cached head of a given chain
+
+    Args:
+        chain (str): chain name
+
+    Returns:
+        (dict): `block`, `timestamp` and `fetched_at` keys, None if not fetched yet
+    """
+    return _heads.get(chain)
+
+def get_lag_events(cid, actor_type):
+    """
+    Compute the block and time lag of each chain synced by an actor against the cached heads
+    (no RPC), store them in the actor's state and get the events of the thresholds crossed:
+    `lagging` when more than `HEAD_LAG_MAX_BLOCKS` blocks or `head_lag_max_seconds` seconds
+    behind, `lag_recovered` when back within both
+
+    Args:
+        cid (str): sender
+        actor_type (str): actor type
+
+    Returns:
+        events (list): lag event records
+    """
+    actor = heartbeats.get_actor(cid, actor_type)
+    events = []
+    for chain, chain_state in (actor or {}).get('chains', {}).items():
+        head = _heads.get(chain)
+        if head is None:
+            continue
+        chain_state['block_lag'] = max(head['block'] - chain_state['latest_block'], 0)
+        chain_state['time_lag'] = max(head['timestamp'] - chain_state['latest_block_ts'], 0)
+        is_lagging = (chain_state['block_lag'] > HEAD_LAG_MAX_BLOCKS[chain] or
+                      chain_state['time_lag'] > CONST['head_lag_max_seconds'])
+        if is_lagging != chain_state.get('is_lagging', False):
+            events.append(heartbeats.get_event_record('lagging' if is_lagging else 'lag_recovered', cid, actor_type,
+                                                      chain=chain, head_block=head['block'],
+                                                      latest_block=chain_state['latest_block'],
+                                                      block_lag=chain_state['block_lag'],
+                                                      time_lag=chain_state['time_lag']))
+        chain_state['is_lagging'] = is_lagging
+    return events
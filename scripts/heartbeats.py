@@ -0,0 +1,168 @@
+import logging
+import time
+
+from constants import CHAIN_ID, CONST
+
+
+log = logging.getLogger()
+
+# (sender, actor type):actor state, with the latest sync state of each chain in `chains`
+_actors = dict()
+# messages received since the last summary, by actor type
+_messages = dict()
+_last_summary_at = time.time()
+
+def get_event_record(event, cid, actor_type, **kwargs):
+    """
+    Get a change event record
+
+    Args:
+        event (str): event name (`new_actor`, `new_chain`, `version_changed`, `actor_evicted`,
+            `lagging`, `lag_recovered`)
+        cid (str): sender
+        actor_type (str): actor type
+        kwargs: event's extra fields
+
+    Returns:
+        (dict): event record
+    """
+    return {
+        'title': 'ipfs_actor_event',
+        'timestamp': int(time.time()),
+        'event': event,
+        'cid': cid,
+        'actor': actor_type,
+        **kwargs
+    }
+
+def update(cid, heartbeat):
+    """
+    Update the state of an actor with one of its heartbeats
+
+    Args:
+        cid (str): sender
+        heartbeat (dict): decoded pubsub message (`actorType`, `softwareVersions`, `syncState`)
+
+    Returns:
+        events (list): change event records (new actor, new chain, version change)
+    """
+    now = time.time()
+    actor_type = heartbeat['actorType']
+    versions = {
+        'listener': heartbeat['softwareVersions']['listener'],
+        'processor': heartbeat['softwareVersions']['processor']
+    }
+    _messages[actor_type] = _messages.get(actor_type, 0) + 1
+    events = []
+    actor = _actors.get((cid, actor_type))
+    is_new = actor is None
+    if is_new:
+        actor = _actors[(cid, actor_type)] = {'first_seen': now, 'versions': versions, 'chains': dict()}
+        events.append(get_event_record('new_actor', cid, actor_type, versions=versions))
+    elif actor['versions'] != versions:
+        events.append(get_event_record('version_changed', cid, actor_type, versions=versions,
+                                       previous_versions=actor['versions']))
+        actor['versions'] = versions
+    actor['last_seen'] = now
+    for network_id, sync_state in heartbeat['syncState'].items():
+        chain = CHAIN_ID[network_id]
+        if chain not in actor['chains'] and not is_new:
+            events.append(get_event_record('new_chain', cid, actor_type, chain=chain))
+        actor['chains'].setdefault(chain, dict()).update({
+            'latest_block': sync_state['latestBlockNumber'],
+            'latest_block_ts': sync_state['latestBlockTimestamp'],
+            'last_seen': now
+        })
+    return events
+
+def evict():
+    """
+    Remove the actors silent for more than `heartbeat_ttl` seconds
+
+    Returns:
+        events (list): `actor_evicted` event records
+    """
+    now = time.time()
+    events = []
+    for (cid, actor_type), actor in list(_actors.items()):
+        if now - actor['last_seen'] > CONST['heartbeat_ttl']:
+            del _actors[(cid, actor_type)]
+            events.append(get_event_record('actor_evicted', cid, actor_type, last_seen=int(actor['last_seen'])))
+    return events
+
+def get_actor(cid, actor_type):
+    """
+    Get the state of an actor
+
+    Args:
+        cid (str): sender
+        actor_type (str): actor type
+
+    Returns:
+        (dict): actor state (`first_seen`, `last_seen`, `versions`, `chains`), None if unknown
+    """
+    return _actors.get((cid, actor_type))
+
+def get_actors():
+    """
+    Get the current state table, one row per (sender, actor type, chain)
+
+    Returns:
+        (list): list of dicts with `cid`, `actor_type`, `chain`, `versions`, `latest_block`,
+            `latest_block_ts`, `last_seen` and (once computed) `block_lag` and `time_lag` keys
+    """
+    return [{
+        'cid': cid,
+        'actor_type': actor_type,
+        'chain': chain,
+        'versions': actor['versions'],
+        'latest_block': chain_state['latest_block'],
+        'latest_block_ts': chain_state['latest_block_ts'],
+        'last_seen': int(chain_state['last_seen']),
+        **{key: chain_state[key] for key in ('block_lag', 'time_lag') if key in chain_state}
+    } for (cid, actor_type), actor in _actors.items() for chain, chain_state in actor['chains'].items()]
+
+def get_summary():
+    """
+    Get a compact summary of the state table: actors and message rates by actor type, software
+    versions in use and sync range of each chain, then reset the message counters
+
+    Returns:
+        (dict): summary record
+    """
+    global _last_summary_at
+    now = time.time()
+    elapsed = max(now - _last_summary_at, 1e-6)
+    actors = dict()
+    versions = dict()
+    latest_blocks = dict()
+    lagging_actors = dict()
+    for (_, actor_type), actor in _actors.items():
+        actors[actor_type] = actors.get(actor_type, 0) + 1
+        version = f'{actor["versions"]["listener"]}/{actor["versions"]["processor"]}'
+        versions.setdefault(actor_type, dict())
+        versions[actor_type][version] = versions[actor_type].get(version, 0) + 1
+        for chain, chain_state in actor['chains'].items():
+            latest_blocks.setdefault(chain, []).append(chain_state['latest_block'])
+            lagging_actors[chain] = lagging_actors.get(chain, 0) + chain_state.get('is_lagging', False)
+    chains = {chain: {
+        'actors': len(blocks),
+        'min_latest_block': min(blocks),
+        'max_latest_block': max(blocks),
+        'lagging_actors': lagging_actors[chain]
+    } for chain, blocks in latest_blocks.items()}
+    summary = {
+        'title': 'ipfs_actors_summary',
+        'timestamp': int(now),
+        'interval': round(elapsed, 1),
+        'messages': sum(_messages.values()),
+        'messages_per_sec': round(sum(_messages.values()) / elapsed, 2),
+        'actors': actors,
+        'messages_per_sec_by_actor': {actor_type: round(nr_of_messages / elapsed, 2)
+                                      for actor_type, nr_of_messages in _messages.items()},
+        'versions': versions,
+        'chains': chains
+    }
+    _messages.clear()
+    _last_summary_at = now
+    return summary
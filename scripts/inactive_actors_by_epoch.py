@@ -1,34 +1,42 @@
-import json
+import asyncio
 import logging
 import time
 
-from . import utils
+from . import address_cache, utils
 from config import RPC_ENDPOINTS
 from constants import COMPONENTS_MAPS, CONST
 
 
 log = logging.getLogger()
 
-def inactive_actors_by_epoch():
+def get_inactive_actors_by_epoch():
     """
-    Get active and inactive actors (by type) for the current epoch
+    Get active and inactive actors (by type) for the current epoch on the DAO chain
+
+    Returns:
+        records (list): check's records, one per actor type
     """
-    hub_addr_list = utils.get_hub_addr_from_factory_list()
+    records = []
     try:
         endpoint = RPC_ENDPOINTS[CONST['dao_chain']]
-        hub_addr = [entry['addr'] for entry in hub_addr_list if entry['chain'] == CONST['dao_chain']][0]
-        epoch_manager_addr = utils.call_contract_method(hub_addr, CONST['dao_chain'], endpoint, 'epochsManager')
-        impl_addr = utils.get_proxy_contract_impl_addr(epoch_manager_addr, endpoint)
+        hub_addr = address_cache.get_addr(CONST['dao_chain'], 'hub')
+        epoch_manager_addr = address_cache.get_addr(CONST['dao_chain'], 'epochsManager')
+        impl_addr = address_cache.get_addr(CONST['dao_chain'], 'epochsManager_impl')
         current_epoch = utils.call_contract_method(epoch_manager_addr, CONST['dao_chain'], endpoint, 'currentEpoch',
                                                    abi_addr_unf=impl_addr)
-        for actor_type in range(list(COMPONENTS_MAPS.keys())[-1] + 1):
-            tot_active_actors = utils.call_contract_method(hub_addr, CONST['dao_chain'], endpoint,
-                                                           'getTotalNumberOfActorsByEpochAndType',
-                                                           method_args=[int(current_epoch), int(actor_type)])
-            tot_inactive_actors = utils.call_contract_method(hub_addr, CONST['dao_chain'], endpoint,
-                                                             'getTotalNumberOfInactiveActorsByEpochAndType',
-                                                             method_args=[int(current_epoch), int(actor_type)])
-            log.info(json.dumps({
+        actor_types = list(range(list(COMPONENTS_MAPS.keys())[-1] + 1))
+        calls = []
+        for actor_type in actor_types:
+            for method in ['getTotalNumberOfActorsByEpochAndType', 'getTotalNumberOfInactiveActorsByEpochAndType']:
+                calls.append({
+                    'addr': hub_addr,
+                    'method': method,
+                    'method_args': [int(current_epoch), int(actor_type)]
+                })
+        results = utils.call_contract_methods(CONST['dao_chain'], endpoint, calls)
+        for actor_type in actor_types:
+            tot_active_actors, tot_inactive_actors = results[2 * actor_type:2 * actor_type + 2]
+            records.append({
                 'title': 'inactive_actors_by_epoch',
                 'timestamp': int(time.time()),
                 'chain': CONST['dao_chain'],
@@ -39,12 +47,22 @@ def inactive_actors_by_epoch():
                         'active_actors': tot_active_actors,
                         'inactive_actors': tot_inactive_actors
                     }
-            }, indent=4))
+            })
     except Exception as e:
         log.error(f'[!] Error while getting inactive actors: {e}')
-        log.info(json.dumps({
+        records.append({
             'title': 'inactive_actors_by_epoch',
             'timestamp': int(time.time()),
             'chain': CONST['dao_chain'],
             'error': str(e)
-        }, indent=4))
+        })
+    return records
+
+async def inactive_actors_by_epoch():
+    """
+    Get active and inactive actors (by type) for the current epoch
+
+    Returns:
+        (list): check's records
+    """
+    return await asyncio.to_thread(get_inactive_actors_by_epoch)
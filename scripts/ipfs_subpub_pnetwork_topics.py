@@ -1,89 +1,226 @@
-import requests
-import multibase
+import aiohttp
+import asyncio
+import base64
 import json
 import logging
-import sys
-import threading
+import random
 import time
 
+from . import head_lag, heartbeats, metrics, output
 from config import SUBPUB_CONFIG
 from constants import CHAIN_ID, CONST
 
 
 log = logging.getLogger()
 
-def subscribe(topic, callback, subs, timeout):
+# multibase prefix:(decoder, is padded) of the encodings an ipfs node may use for pubsub messages
+MULTIBASE_DECODERS = {
+    'f': (bytes.fromhex, False),
+    'm': (base64.b64decode, False),
+    'M': (base64.b64decode, True),
+    'u': (base64.urlsafe_b64decode, False),
+    'U': (base64.urlsafe_b64decode, True)
+}
+
+def encode_topic(topic):
     """
-    Subscription function. Once called, it creates a thread for the listener using the given topic
+    Encode a topic name as multibase base64url (the format of the `pubsub/sub` `arg`)
 
     Args:
         topic (str): topic name
-        callback (function): callback function
-        subs (dict): subscriptions dictionary
-        timeout: could be `infinite` (stay in listen) or an integer value
+
+    Returns:
+        (str): multibase encoded topic
     """
-    try:
-        if topic not in subs.keys():
-            subs[topic] = [[], True]
-        subs[topic][1] = True
-        thread = threading.Thread(target=subscribe_thread,
-                                  args=(topic, callback, subs,))
-        if timeout == 0:
-            log.info(f'\n[!] Listening for messages ...\n')
-            thread.start()
-        elif timeout > 0:
-            log.info(f'\n[!] Listening for messages for the next {CONST["pubsub_timeout"]} seconds ...\n')
-            thread.daemon = True
-            thread.start()
-            time.sleep(timeout)
-            sys.exit()
-        else:
-            log.error(f'[!] Timeout error while subscribing to {topic}')
-    except Exception as e:
-        log.error(f'[!] Error while subscribing to {topic}: {e}')
+    return 'u' + base64.urlsafe_b64encode(topic.encode('utf8')).decode('ascii').rstrip('=')
+
+def decode_multibase(value):
+    """
+    Decode a multibase encoded value
+
+    Args:
+        value (str): multibase encoded value
+
+    Returns:
+        (bytes): decoded value
+    """
+    decoder, is_padded = MULTIBASE_DECODERS[value[0]]
+    if decoder is bytes.fromhex:
+        return decoder(value[1:])
+    return decoder(value[1:] if is_padded else value[1:] + '=' * (-len(value[1:]) % 4))
+
+def get_topics():
+    """
+    Get the topics to subscribe to, `pubsub_topic` can be a single topic or a list
 
-def subscribe_thread(topic, callback, subs):
+    Returns:
+        (list): topic names
     """
-    Subscription thread
-    Get ipfs node's ip and port from config and open the listener
-    Once a message is found, call the callback passing the needed field
+    topics = SUBPUB_CONFIG['pubsub_topic']
+    return [topics] if isinstance(topics, str) else list(topics)
+
+def get_stats_records(stats, queue):
+    """
+    Get the listener's records: messages received/dropped, reconnections and queue usage per topic
+
+    Args:
+        stats (dict): topic:counters dict
+        queue (Queue): messages queue
+
+    Returns:
+        (list): stats records
+    """
+    return [{
+        'title': 'ipfs_pubsub_stats',
+        'timestamp': int(time.time()),
+        'topic': topic,
+        'messages_received': topic_stats['received'],
+        'messages_dropped': topic_stats['dropped'],
+        'reconnects': topic_stats['reconnects'],
+        'queue_size': queue.qsize(),
+        'queue_high_water_mark': stats['queue_high_water_mark']
+    } for topic, topic_stats in stats['topics'].items()]
+
+async def enqueue(queue, stats, topic, message):
+    """
+    Put a decoded message in the queue. When the queue is full the message is dropped
+    (`pubsub_queue_policy` `drop`) or the reader waits for a free slot (`block`)
 
     Args:
+        queue (Queue): messages queue
+        stats (dict): listener's counters
         topic (str): topic name
-        callback (function): callback function
-        subs (dict): subscriptions dictionary
+        message (tuple): (data, cid) tuple
     """
-    try:
-        ip = SUBPUB_CONFIG['ipfs_url']
-        port = SUBPUB_CONFIG['ipfs_port']
-        with requests.post(CONST['ipfs_pubsub_url'].format(ip, port,
-                                                           multibase.encode('base64url',
-                                                                            topic).decode('utf8')),
-                           stream=True) as req:
-            subs[topic][0].append(req)
-            while True:
-                for res in req.iter_lines():
-                    res_json = json.loads(res.decode('utf8'))
-                    res_json['data'] = multibase.decode(res_json['data'])
-                    callback(res_json['data'],
-                             res_json['from'])
-                if topic not in subs.keys() or subs[topic][0] is False:
-                    return
-    except Exception as e:
-        log.error(f'[!] Error while listening for the ipfs topic {topic}: {e}')
+    if CONST['pubsub_queue_policy'] == 'drop':
+        try:
+            queue.put_nowait(message)
+        except asyncio.QueueFull:
+            stats['topics'][topic]['dropped'] += 1
+            return
+    else:
+        await queue.put(message)
+    stats['topics'][topic]['received'] += 1
+    stats['queue_high_water_mark'] = max(stats['queue_high_water_mark'], queue.qsize())
+
+async def listen(session, topic, queue, stats):
+    """
+    Subscribe to a topic and push every message in the queue, reconnecting with an exponential
+    backoff (up to `pubsub_backoff_max` seconds) whenever the stream fails or the ipfs node restarts
+
+    Args:
+        session (ClientSession): aiohttp session
+        topic (str): topic name
+        queue (Queue): messages queue
+        stats (dict): listener's counters
+    """
+    url = CONST['ipfs_pubsub_url'].format(SUBPUB_CONFIG['ipfs_url'], SUBPUB_CONFIG['ipfs_port'], encode_topic(topic))
+    attempt = 0
+    while True:
+        try:
+            async with session.post(url, timeout=aiohttp.ClientTimeout(total=None, sock_connect=CONST['rpc_timeout'])) as res:
+                res.raise_for_status()
+                async for line in res.content:
+                    if not line.strip():
+                        continue
+                    attempt = 0
+                    try:
+                        res_json = json.loads(line)
+                        await enqueue(queue, stats, topic, (decode_multibase(res_json['data']), res_json['from']))
+                    except Exception as e:
+                        log.error(f'[!] Error while decoding a message of the ipfs topic {topic}: {e}')
+            log.error(f'[!] The ipfs node closed the stream of the topic {topic}')
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            log.error(f'[!] Error while listening for the ipfs topic {topic}: {e}')
+        delay = min(CONST['pubsub_backoff_base'] * 2 ** attempt, CONST['pubsub_backoff_max'])
+        attempt += 1
+        stats['topics'][topic]['reconnects'] += 1
+        await asyncio.sleep(delay * random.uniform(0.5, 1))
+
+async def consume(queue, callback):
+    """
+    Call the callback for every message of the queue, the callback can be a function or a coroutine
+
+    Args:
+        queue (Queue): messages queue
+        callback (function): called with the message's data (bytes) and sender (str)
+    """
+    while True:
+        data, cid = await queue.get()
+        try:
+            res = callback(data, cid)
+            if asyncio.iscoroutine(res):
+                await res
+        except Exception as e:
+            log.error(f'[!] Error while handling pubsub message {cid}: {e}')
+        finally:
+            queue.task_done()
+
+async def publish_stats(stats, queue):
+    """
+    Refresh the listener's metrics every `pubsub_stats_interval` seconds
+
+    Args:
+        stats (dict): listener's counters
+        queue (Queue): messages queue
+    """
+    while True:
+        await asyncio.sleep(CONST['pubsub_stats_interval'])
+        metrics.update('ipfs_pubsub', get_stats_records(stats, queue))
+
+async def subscribe(topics, callback, timeout):
+    """
+    Listen to the given topics on the event loop: one reader per topic pushes the decoded messages
+    in a bounded queue (`pubsub_queue_size`) drained by `pubsub_consumers` concurrent consumers
+
+    Args:
+        topics (list): topic names
+        callback (function): called with the message's data (bytes) and sender (str)
+        timeout (int): seconds to listen for, 0 to listen forever
+
+    Returns:
+        (list): stats records
+    """
+    queue = asyncio.Queue(maxsize=CONST['pubsub_queue_size'])
+    stats = {
+        'queue_high_water_mark': 0,
+        'topics': {topic: {'received': 0, 'dropped': 0, 'reconnects': 0} for topic in topics}
+    }
+    async with aiohttp.ClientSession(read_bufsize=CONST['pubsub_read_bufsize']) as session:
+        tasks = [asyncio.create_task(listen(session, topic, queue, stats)) for topic in topics]
+        tasks += [asyncio.create_task(consume(queue, callback)) for _ in range(CONST['pubsub_consumers'])]
+        tasks.append(asyncio.create_task(publish_stats(stats, queue)))
+        try:
+            await asyncio.wait(tasks, timeout=timeout or None)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+    records = get_stats_records(stats, queue)
+    metrics.update('ipfs_pubsub', records)
+    return records
 
 def on_event(data, cid):
     """
     Called on event, when a message is found
-    Get the details of the message and format the output
+    Update the sender's state, compute its lag behind the chain heads and output the resulting
+    change events (and the message itself if `pubsub_print_messages` is set)
 
     Args:
         data (bytes): message from the ipfs pubsub
         cid (str): ipfs content identifier
     """
     try:
-        sync_state = list()
         event_dict = json.loads(data.decode('utf8'))
+        events = heartbeats.update(cid, event_dict)
+        events += head_lag.get_lag_events(cid, event_dict['actorType'])
+        for record in events:
+            output.write_record(record)
+        if not CONST['pubsub_print_messages']:
+            return
+        sync_state = list()
         sync_state_tmp = event_dict['syncState']
         for key, value in sync_state_tmp.items():
             chain_id = CHAIN_ID[key]
@@ -94,7 +231,7 @@ def on_event(data, cid):
                 'latest_block': latest_block,
                 'latest_block_ts': latest_block_ts
             })
-        log.info(json.dumps({
+        output.write_record({
             'title': 'ipfs_subpub_pnetwork_topics',
             'timestamp': int(time.time()),
             'message_timestamp': event_dict['timestamp'],
@@ -105,14 +242,51 @@ def on_event(data, cid):
                 'processor': event_dict['softwareVersions']['processor']
             },
             'sync_state': sync_state
-        }, indent=4))
+        })
     except Exception as e:
         log.error(f'[!] Error while formatting pubsub message {cid}: {e}')
 
-def ipfs_subpub_pnetwork_topics():
+def write_summary():
     """
-    Subscribe to the given topic and open the listener
+    Evict the silent actors, output the actors summary (along with the eviction events) and
+    refresh the actors metrics
+    """
+    for record in heartbeats.evict():
+        output.write_record(record)
+    output.write_record(heartbeats.get_summary())
+    metrics.update('ipfs_actors', heartbeats.get_actors())
+
+async def publish_summaries():
+    """
+    Write the actors summary every `heartbeat_summary_interval` seconds
+    """
+    while True:
+        await asyncio.sleep(CONST['heartbeat_summary_interval'])
+        write_summary()
+
+async def ipfs_subpub_pnetwork_topics():
+    """
+    Subscribe to the configured topics and listen for `pubsub_timeout` seconds (or forever if 0),
+    actors' changes are logged as soon as they are received and a summary of all the actors
+    every `heartbeat_summary_interval` seconds (and when the listener stops)
+
+    Returns:
+        (list): listener's stats records, one per topic
     """
-    subs = {}
     timeout = SUBPUB_CONFIG['pubsub_timeout']
-    subscribe(SUBPUB_CONFIG['pubsub_topic'], on_event, subs, timeout)
+    if timeout < 0:
+        log.error(f'[!] Timeout error while subscribing to {SUBPUB_CONFIG["pubsub_topic"]}')
+        return []
+    if not output.is_ndjson():
+        if timeout == 0:
+            log.info(f'\n[!] Listening for messages ...\n')
+        else:
+            log.info(f'\n[!] Listening for messages for the next {timeout} seconds ...\n')
+    background_tasks = [asyncio.create_task(publish_summaries()),
+                        asyncio.create_task(head_lag.refresh_heads_forever())]
+    try:
+        return await subscribe(get_topics(), on_event, timeout)
+    finally:
+        for task in background_tasks:
+            task.cancel()
+        write_summary()
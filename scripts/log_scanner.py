@@ -0,0 +1,182 @@
+import contextvars
+import json
+import logging
+import os
+import threading
+
+from . import transport
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from constants import CONST
+
+
+log = logging.getLogger()
+
+_block_ranges = None
+_block_range_ceilings = dict()
+_block_range_floors = dict()
+_is_changed = False
+_lock = threading.Lock()
+
+def load_block_ranges():
+    """
+    Load the learned `eth_getLogs` block ranges from disk (only once per process)
+
+    Returns:
+        (dict): endpoint key:block range dict (see `transport.get_endpoint_key`)
+    """
+    global _block_ranges
+    if _block_ranges is None:
+        try:
+            with open(CONST['getlogs_ranges_path'], 'r') as f_ranges:
+                _block_ranges = json.load(f_ranges)
+        except FileNotFoundError:
+            _block_ranges = dict()
+        except Exception as e:
+            log.error(f'[!] Error while loading the getLogs block ranges: {e}')
+            _block_ranges = dict()
+    return _block_ranges
+
+def dump_block_ranges():
+    """
+    Atomically dump the learned `eth_getLogs` block ranges on file, if they changed
+    """
+    global _is_changed
+    try:
+        with _lock:
+            if not _is_changed:
+                return
+            ranges_dump = json.dumps(_block_ranges, indent=4)
+            _is_changed = False
+        os.makedirs(os.path.dirname(CONST['getlogs_ranges_path']), exist_ok=True)
+        tmp_path = f'{CONST["getlogs_ranges_path"]}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'w') as f_ranges:
+            f_ranges.write(ranges_dump)
+        os.replace(tmp_path, CONST['getlogs_ranges_path'])
+    except Exception as e:
+        log.error(f'[!] Error while dumping the getLogs block ranges: {e}')
+
+def get_block_range(endpoint):
+    """
+    Get the current `eth_getLogs` block range (number of blocks per call) of a given endpoint
+
+    Args:
+        endpoint (str|list): endpoint url or list of urls
+
+    Returns:
+        (int): block range
+    """
+    with _lock:
+        return load_block_ranges().get(transport.get_endpoint_key(endpoint), CONST['jsonrpc_max_block_range_getlogs'])
+
+def set_block_range(endpoint, block_range):
+    """
+    Set the `eth_getLogs` block range of a given endpoint, within the configured bounds
+
+    Args:
+        endpoint (str|list): endpoint url or list of urls
+        block_range (int): new block range
+    """
+    global _is_changed
+    block_range = min(max(int(block_range), CONST['getlogs_min_block_range']), CONST['getlogs_max_block_range'])
+    key = transport.get_endpoint_key(endpoint)
+    with _lock:
+        ranges = load_block_ranges()
+        if ranges.get(key) != block_range:
+            ranges[key] = block_range
+            _is_changed = True
+
+def is_range_error(res):
+    """
+    Check if a response is a "too many results" / block range error
+
+    Args:
+        res (dict): decoded JSON-RPC response
+
+    Returns:
+        (bool): True if the range should be split, False if not
+    """
+    if not isinstance(res.get('error'), dict) or transport.is_rate_limited(200, res):
+        return False
+    message = str(res['error'].get('message', '')).lower()
+    return any(pattern in message for pattern in CONST['getlogs_range_errors'])
+
+def get_logs_by_block_range(addr, url, topic, _from, to):
+    """
+    Call `eth_getLogs` within a given block range, splitting it in half (and shrinking
+    the endpoint's block range) every time the provider rejects it as too large.
+    After a small successful response the endpoint's block range is grown one step
+
+    Args:
+        addr (str): contract address
+        url (str|list): endpoint url or list of urls
+        topic (list): topics filter
+        _from (int): start block
+        to (int): end block (included)
+
+    Returns:
+        logs (list): list of dict containing the results of the call, [] if none found
+    """
+    res = transport.rpc_request(url, 'eth_getLogs', [{
+        'address': addr,
+        'topics': topic,
+        'fromBlock': hex(_from),
+        'toBlock': hex(to)
+    }])
+    nr_of_blocks = to - _from + 1
+    key = transport.get_endpoint_key(url)
+    if 'result' in res:
+        if len(res['result']) <= CONST['getlogs_grow_max_results'] and nr_of_blocks >= get_block_range(url):
+            block_range = nr_of_blocks * CONST['getlogs_grow_factor']
+            with _lock:
+                if nr_of_blocks < _block_range_ceilings.get(key, nr_of_blocks + 1):
+                    _block_range_floors[key] = max(_block_range_floors.get(key, 0), nr_of_blocks)
+            if key in _block_range_ceilings:
+                # never grow past the middle point between the last good range and the last rejected one
+                block_range = min(block_range, (nr_of_blocks + _block_range_ceilings[key]) // 2)
+            set_block_range(url, block_range)
+        return res['result']
+    if is_range_error(res) and nr_of_blocks > 1:
+        with _lock:
+            _block_range_ceilings[key] = min(_block_range_ceilings.get(key, nr_of_blocks), nr_of_blocks)
+            if _block_range_floors.get(key, 0) >= _block_range_ceilings[key]:
+                _block_range_floors.pop(key)
+            block_range = max(nr_of_blocks // 2, _block_range_floors.get(key, 0))
+        set_block_range(url, min(get_block_range(url), block_range))
+        middle = _from + nr_of_blocks // 2 - 1
+        return (get_logs_by_block_range(addr, url, topic, _from, middle) +
+                get_logs_by_block_range(addr, url, topic, middle + 1, to))
+    raise ValueError(f'getLogs failed for blocks {_from}-{to}: {res.get("error", res)}')
+
+def scan_logs(addr, url, topic, _from, to):
+    """
+    Fetch all the logs within a block range, in chunks of the endpoint's learned block range
+    fetched concurrently (up to `getlogs_parallelism` at the same time). Chunks are planned
+    as the scan goes, so they follow the range adjustments, and merged back in block order
+
+    Args:
+        addr (str): contract address
+        url (str|list): endpoint url or list of urls
+        topic (list): topics filter
+        _from (int): start block
+        to (int): end block (included)
+
+    Returns:
+        logs (list): list of dict containing the results of the call, [] if none found
+    """
+    logs_by_start = dict()
+    futures = dict()
+    start = _from
+    try:
+        with ThreadPoolExecutor(max_workers=CONST['getlogs_parallelism']) as executor:
+            while start <= to or futures:
+                while start <= to and len(futures) < CONST['getlogs_parallelism']:
+                    end = min(start + get_block_range(url) - 1, to)
+                    futures[executor.submit(contextvars.copy_context().run, get_logs_by_block_range,
+                                            addr, url, topic, start, end)] = start
+                    start = end + 1
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    logs_by_start[futures.pop(future)] = future.result()
+    finally:
+        dump_block_ranges()
+    return [tx for chunk_start in sorted(logs_by_start) for tx in logs_by_start[chunk_start]]
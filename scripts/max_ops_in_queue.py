@@ -1,37 +1,48 @@
-import json
+import eth_utils
 import logging
 import time
 
-from . import utils
-from config import RPC_ENDPOINTS
-from web3 import Web3
+from . import address_cache, utils
 
 
 log = logging.getLogger()
 
-def max_ops_in_queue():
+def get_max_ops_in_queue_by_chain(chain, endpoint):
     """
-    Loop endpoints list, call each factory contract
+    Get the hub address of the given chain and the results from its `maxOperationsInQueue` method
+
+    Args:
+        chain (str): chain name
+        endpoint (str): endpoint of the given chain
+
+    Returns:
+        (list): check's records for the given chain
+    """
+    try:
+        hub_addr_unf = address_cache.get_addr(chain, 'hub')
+        hub_addr = eth_utils.to_checksum_address(hub_addr_unf)
+        max_ops_in_queue = utils.call_contract_method(hub_addr, chain, endpoint, 'maxOperationsInQueue')
+        return [{
+            'title': 'max_ops_in_queue',
+            'timestamp': int(time.time()),
+            'chain': chain,
+            'max_ops_in_queue': max_ops_in_queue,
+        }]
+    except Exception as e:
+        log.error(f'[!] Error while checking max operations in queue: {e}')
+        return [{
+            'title': 'max_ops_in_queue',
+            'timestamp': int(time.time()),
+            'chain': chain,
+            'error': str(e)
+        }]
+
+async def max_ops_in_queue():
+    """
+    Loop endpoints list, call each factory contract concurrently
     and get results from `maxOperationsInQueue` method
+
+    Returns:
+        (list): check's records, one per chain
     """
-    hub_addr_list = utils.get_hub_addr_from_factory_list()
-    for chain, endpoint in RPC_ENDPOINTS.items():
-        try:
-            hub_addr_unf = [addr for addr in hub_addr_list if addr['chain'] == chain][0]['addr']
-            hub_addr = Web3.to_checksum_address(hub_addr_unf)
-            max_ops_in_queue = utils.call_contract_method(hub_addr, chain, endpoint, 'maxOperationsInQueue')
-            log.info(json.dumps({
-                'title': 'max_ops_in_queue',
-                'timestamp': int(time.time()),
-                'chain': chain,
-                'max_ops_in_queue': max_ops_in_queue,
-            }, indent=4))
-        except Exception as e:
-            log.error(f'[!] Error while checking max operations in queue: {e}')
-            log.info(json.dumps({
-                'title': 'max_ops_in_queue',
-                'timestamp': int(time.time()),
-                'chain': chain,
-                'error': str(e)
-            }, indent=4))
-            continue
+    return await utils.gather_by_chain(get_max_ops_in_queue_by_chain)
@@ -0,0 +1,168 @@
+import logging
+import threading
+import time
+
+from constants import CONST
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+log = logging.getLogger()
+
+# record fields exported as gauges, labelled by chain, actor, actor type and topic when the record has them
+GAUGE_FIELDS = {
+    'active_actors': 'number of active actors in the current epoch',
+    'balance': 'actor balance on the chain',
+    'block_lag': 'blocks an actor is behind the chain head',
+    'challenge_period_duration': 'challenge period duration in seconds',
+    'epoch': 'current epoch, or the epoch an actor record refers to',
+    'inactive_actors': 'number of inactive actors in the current epoch',
+    'last_seen': 'last time an actor sent a heartbeat',
+    'latest_block': 'latest block synced by an actor',
+    'max_ops_in_queue': 'max number of operations in queue',
+    'messages_dropped': 'pubsub messages dropped because the queue was full',
+    'messages_received': 'pubsub messages received',
+    'nr_of_ops_in_queue': 'number of operations in queue',
+    'queue_high_water_mark': 'max number of pubsub messages waiting in the queue',
+    'queue_size': 'number of pubsub messages waiting in the queue',
+    'reconnects': 'pubsub reconnections',
+    'time_lag': 'seconds an actor is behind the chain head'
+}
+ACTOR_FIELDS = ('actor_addr', 'actor_address', 'cid')
+# run-level fields, also added as a label to the actor records since an actor can have one per epoch
+RUN_FIELDS = ('epoch',)
+PREFIX = 'pnetwork_'
+
+# check name:samples of its latest run, sample is a (metric, labels, value) tuple
+_samples = dict()
+_lock = threading.Lock()
+_server = None
+
+def escape_label_value(value):
+    """
+    Escape a label value for the text exposition format
+
+    Args:
+        value: label value
+
+    Returns:
+        (str): escaped value
+    """
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def get_record_samples(check_name, record, labels=None):
+    """
+    Get the gauge samples of a check record (nested `actors` record or list of records included)
+
+    Args:
+        check_name (str): check name
+        record (dict): check record
+        labels (opt) (dict): labels inherited from the parent record
+
+    Returns:
+        samples (list): list of (metric, labels, value) tuples
+    """
+    labels = dict(labels or {'check': check_name})
+    if 'chain' in record:
+        labels['chain'] = record['chain']
+    for field in ACTOR_FIELDS:
+        if field in record:
+            labels['actor'] = record[field]
+    if 'actor_type' in record:
+        labels['actor_type'] = record['actor_type']
+    if 'topic' in record:
+        labels['topic'] = record['topic']
+    if 'actor' in labels:
+        for field in RUN_FIELDS:
+            if field in record:
+                labels[field] = record[field]
+    samples = []
+    for field, value in record.items():
+        if field in GAUGE_FIELDS and isinstance(value, (int, float)) and not isinstance(value, bool):
+            samples.append((field, labels, value))
+    actor_records = record.get('actors', [])
+    for actor_record in [actor_records] if isinstance(actor_records, dict) else actor_records:
+        samples += get_record_samples(check_name, actor_record, labels)
+    return samples
+
+def update(check_name, records):
+    """
+    Replace the samples of a check with the ones of its latest run. Samples are deduped by series
+    (metric and labels, the last one wins), the run-level fields repeated in every record included
+
+    Args:
+        check_name (str): check name
+        records (list): check's records
+    """
+    samples = [('check_last_run_timestamp_seconds', {'check': check_name}, int(time.time()))]
+    counts = dict()
+    for record in records or []:
+        key = ('check_errors' if 'error' in record else 'check_records', record.get('chain', ''))
+        counts[key] = counts.get(key, 0) + 1
+        if 'error' not in record:
+            samples += get_record_samples(check_name, record)
+    for (metric, chain), count in counts.items():
+        samples.append((metric, {'check': check_name, 'chain': chain}, count))
+    series = dict()
+    for metric, labels, value in samples:
+        series[(metric, tuple(labels.items()))] = (metric, labels, value)
+    with _lock:
+        _samples[check_name] = list(series.values())
+
+def render():
+    """
+    Render the latest samples of all the checks in the Prometheus text exposition format
+
+    Returns:
+        (str): metrics page
+    """
+    with _lock:
+        samples = [sample for check_samples in _samples.values() for sample in check_samples]
+    samples_by_metric = dict()
+    for metric, labels, value in samples:
+        samples_by_metric.setdefault(metric, []).append((labels, value))
+    lines = []
+    for metric in sorted(samples_by_metric):
+        lines.append(f'# HELP {PREFIX}{metric} {GAUGE_FIELDS.get(metric, metric.replace("_", " "))}')
+        lines.append(f'# TYPE {PREFIX}{metric} gauge')
+        for labels, value in samples_by_metric[metric]:
+            labels_str = ','.join(f'{k}="{escape_label_value(v)}"' for k, v in labels.items())
+            lines.append(f'{PREFIX}{metric}{{{labels_str}}} {value}')
+    return '\n'.join(lines) + '\n'
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        """
+        Serve `/metrics` from memory, 404 on any other path
+        """
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = render().encode('utf8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        """
+        Do not log the scrapes
+        """
+        return
+
+def start_server(port):
+    """
+    Start the `/metrics` HTTP server on a daemon thread (only once per process)
+
+    Args:
+        port (int): port to listen on (`metrics_host` address)
+    """
+    global _server
+    if _server is not None:
+        return
+    try:
+        _server = ThreadingHTTPServer((CONST['metrics_host'], port), MetricsHandler)
+        _server.daemon_threads = True
+        threading.Thread(target=_server.serve_forever, daemon=True).start()
+    except Exception as e:
+        log.error(f'[!] Error while starting the metrics server: {e}')
@@ -0,0 +1,93 @@
+import eth_abi
+import eth_utils
+import logging
+import threading
+
+from . import rpc_stats, transport
+from concurrent.futures import Future
+from constants import CONST, MULTICALL_ADDRS_DICT
+
+
+log = logging.getLogger()
+
+# aggregate3((address target, bool allowFailure, bytes callData)[]) returns ((bool success, bytes returnData)[])
+AGGREGATE3_SELECTOR = '0x82ad56cb'
+
+_pending = dict()
+_lock = threading.Lock()
+
+def is_enabled(chain):
+    """
+    Check if a Multicall3-style aggregator is configured for a given chain
+
+    Args:
+        chain (str): chain name
+
+    Returns:
+        (bool): True if enabled, False if not
+    """
+    return bool(MULTICALL_ADDRS_DICT.get(chain))
+
+def submit(chain, endpoint, target, calldata, block='latest'):
+    """
+    Queue a view call for the given chain and block, all the calls queued within `multicall_window`
+    seconds (or up to `multicall_max_calls`) are sent as a single aggregated `eth_call`
+
+    Args:
+        chain (str): chain name
+        endpoint (str): endpoint of the given chain
+        target (str): contract address
+        calldata (str): hex encoded call data
+        block (opt) (str): hex block number (or tag) to call at
+
+    Returns:
+        future (Future): resolved with the call's return data (hex)
+    """
+    future = Future()
+    with _lock:
+        pending_calls = _pending.setdefault((chain, block), [])
+        pending_calls.append((target, calldata, future, rpc_stats.get_check()))
+        nr_of_pending_calls = len(pending_calls)
+    if nr_of_pending_calls >= CONST['multicall_max_calls']:
+        flush(chain, endpoint, block)
+    elif nr_of_pending_calls == 1:
+        threading.Timer(CONST['multicall_window'], flush, args=(chain, endpoint, block)).start()
+    return future
+
+def flush(chain, endpoint, block='latest'):
+    """
+    Encode all the pending calls of a given chain and block into one `aggregate3` call and resolve
+    each call's future with its own return data. The call is attributed to all the checks
+    it aggregates calls of (joined by `+`) in the RPC stats
+
+    Args:
+        chain (str): chain name
+        endpoint (str): endpoint of the given chain
+        block (opt) (str): hex block number (or tag) to call at
+    """
+    with _lock:
+        pending_calls = _pending.pop((chain, block), [])
+    if not pending_calls:
+        return
+    try:
+        calls = [(target, True, eth_utils.decode_hex(calldata)) for target, calldata, _, _ in pending_calls]
+        data = AGGREGATE3_SELECTOR + eth_abi.encode(['(address,bool,bytes)[]'], [calls]).hex()
+        check_names = sorted({check_name for _, _, _, check_name in pending_calls if check_name})
+        with rpc_stats.use_check('+'.join(check_names) or None):
+            res = transport.rpc_request(endpoint, 'eth_call', [{'to': MULTICALL_ADDRS_DICT[chain], 'data': data},
+                                                               block])
+        if 'result' not in res:
+            raise ValueError(res.get('error', res))
+        results = eth_abi.decode(['(bool,bytes)[]'], eth_utils.decode_hex(res['result']))[0]
+        if len(results) != len(pending_calls):
+            raise ValueError(f'expected {len(pending_calls)} results, got {len(results)}')
+        for (_, _, future, _), (success, return_data) in zip(pending_calls, results):
+            if success:
+                future.set_result(eth_utils.encode_hex(return_data))
+            else:
+                future.set_exception(ValueError(f'call reverted: 0x{return_data.hex()}'))
+    except Exception as e:
+        log.error(f'[!] Error while sending multicall on {chain}: {e}')
+        for _, _, future, _ in pending_calls:
+            if not future.done():
+                future.set_exception(e)
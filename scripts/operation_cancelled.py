@@ -1,42 +1,55 @@
-import json
 import logging
 import time
 
-from . import utils
-from config import RPC_ENDPOINTS
-from constants import CONST, TOPICS
+from . import address_cache, utils
 
 
 log = logging.getLogger()
 
-def operation_cancelled():
+def get_operation_cancelled_by_chain(chain, endpoint):
     """
-    Loop endpoints list, get the relative hub address and search for
+    Get the hub address of the given chain and search for the OperationCancelled
+    method, within the time range set in the config
+
+    Args:
+        chain (str): chain name
+        endpoint (str): endpoint of the given chain
+
+    Returns:
+        records (list): check's records for the given chain
+    """
+    records = []
+    try:
+        hub_addr = address_cache.get_addr(chain, 'hub')
+        hub_logs = utils.get_hub_logs(hub_addr, chain, endpoint, 'operation_cancelled')
+        if hub_logs:
+            blocks_ts = utils.get_blocks_ts_by_number_sync([logs['blockNumber'] for logs in hub_logs], chain)
+            for logs in hub_logs:
+                block_ts = blocks_ts.get(logs['blockNumber'])
+                records.append({
+                    'title': 'operation_cancelled',
+                    'timestamp': int(time.time()),
+                    'chain': chain,
+                    'tx_hash': logs['transactionHash'],
+                    'block': int(logs['blockNumber'], 16),
+                    'block_ts': block_ts
+                })
+    except Exception as e:
+        log.error(f'[!] Error while getting operationCancelled events: {e}')
+        records.append({
+            'title': 'operation_cancelled',
+            'timestamp': int(time.time()),
+            'chain': chain,
+            'error': str(e)
+        })
+    return records
+
+async def operation_cancelled():
+    """
+    Loop endpoints list concurrently, get the relative hub address and search for
     the OperationCancelled method, within the time range set in the config
+
+    Returns:
+        (list): check's records
     """
-    hub_addr_list = utils.get_hub_addr_from_factory_list()
-    for chain, endpoint in RPC_ENDPOINTS.items():
-        try:
-            hub_addr = [addr for addr in hub_addr_list if addr['chain'] == chain][0]['addr']
-            hub_logs = utils.call_get_logs(hub_addr, chain, endpoint,
-                                           [TOPICS['operation_cancelled']],
-                                           nr_of_days=CONST['get_logs_past_days_operation_cancelled'])
-            if hub_logs:
-                for logs in hub_logs:
-                    block_ts = utils.get_block_ts_by_number_sync(logs['blockNumber'], chain)
-                    log.info(json.dumps({
-                        'title': 'operation_cancelled',
-                        'timestamp': int(time.time()),
-                        'chain': chain,
-                        'tx_hash': logs['transactionHash'],
-                        'block': int(logs['blockNumber'], 16),
-                        'block_ts': block_ts
-                    }, indent=4))
-        except Exception as e:
-            log.error(f'[!] Error while getting operationCancelled events: {e}')
-            log.info(json.dumps({
-                'title': 'operation_cancelled',
-                'timestamp': int(time.time()),
-                'chain': chain,
-                'error': str(e)
-            }, indent=4))
+    return await utils.gather_by_chain(get_operation_cancelled_by_chain)
@@ -0,0 +1,104 @@
+import atexit
+import json
+import logging
+import sys
+import threading
+
+from constants import CONST
+
+
+log = logging.getLogger()
+
+FORMATS = ('json', 'ndjson')
+
+_format = 'json'
+_buffer = []
+_buffer_size = 0
+_timer = None
+_lock = threading.Lock()
+
+class StdErrFilter(logging.Filter):
+    def filter(self, rec):
+        """
+        Logger stderr filter
+
+        Args:
+            rec: record to log (or filter out)
+        """
+        return rec.levelno == logging.ERROR
+
+class StdOutFilter(logging.Filter):
+    def filter(self, rec):
+        """
+        Logger stdout filter
+
+        Args:
+            rec: record to log (or filter out)
+        """
+        return rec.levelno == logging.INFO
+
+def set_format(output_format):
+    """
+    Set the format of the check records: `json` (indented, through the logger) or `ndjson`
+    (one compact record per line, buffered and written straight to stdout)
+
+    Args:
+        output_format (str): one of `FORMATS`
+    """
+    global _format
+    _format = output_format
+
+def is_ndjson():
+    """
+    Check if the records are written as NDJSON
+
+    Returns:
+        (bool): True if NDJSON, False if not
+    """
+    return _format == 'ndjson'
+
+def write_record(record):
+    """
+    Write a check record in the current format. NDJSON records are buffered and flushed once
+    `output_buffer_size` bytes are buffered or `output_flush_interval` seconds after the first one
+
+    Args:
+        record (dict): check record
+    """
+    global _buffer_size, _timer
+    if not is_ndjson():
+        log.info(json.dumps(record, indent=4))
+        return
+    line = json.dumps(record, separators=(',', ':')) + '\n'
+    with _lock:
+        _buffer.append(line)
+        _buffer_size += len(line)
+        is_full = _buffer_size >= CONST['output_buffer_size']
+        if not is_full and _timer is None:
+            _timer = threading.Timer(CONST['output_flush_interval'], flush)
+            _timer.daemon = True
+            _timer.start()
+    if is_full:
+        flush()
+
+def flush():
+    """
+    Write the buffered NDJSON records on stdout
+    """
+    global _buffer_size, _timer
+    with _lock:
+        if _timer is not None:
+            _timer.cancel()
+            _timer = None
+        if not _buffer:
+            return
+        lines = ''.join(_buffer)
+        _buffer.clear()
+        _buffer_size = 0
+        try:
+            sys.stdout.write(lines)
+            sys.stdout.flush()
+        except Exception as e:
+            log.error(f'[!] Error while writing the records: {e}')
+
+atexit.register(flush)
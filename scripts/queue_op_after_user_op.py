@@ -1,3 +1,8 @@
+import logging
 
-def queue_op_after_user_op():
-    print('tbi')
+
+log = logging.getLogger()
+
+async def queue_op_after_user_op():
+    log.debug('[+] Check `queue_op_after_user_op` is not implemented yet')
+    return []
@@ -0,0 +1,92 @@
+import importlib
+import logging
+import time
+
+from checks_mapping import CHECKS_MAPPING
+from config import RPC_ENDPOINTS, SUBPUB_CONFIG
+
+
+log = logging.getLogger()
+
+# check name:check coroutine function, filled as the checks are first run
+_checks = dict()
+# check name:seconds spent importing its module (and the dependencies not imported yet)
+_import_times = dict()
+
+def is_value_missing_in_config():
+    """
+    Look for missing values in the config file
+
+    Returns:
+        missing_values_list (list) if missing fields, empty list if none
+    """
+    config_merged_dict = {**RPC_ENDPOINTS, **SUBPUB_CONFIG}
+    missing_values_list = []
+    for key, val in config_merged_dict.items():
+        if not val and val != 0:
+            missing_values_list.append(key)
+    if missing_values_list:
+        return missing_values_list
+    else:
+        return []
+
+def is_check_in_mapping(check):
+    """
+    Check if the monitoring checks the user requested are enabled on the CHECKS_MAPPING dict
+
+    Args:
+        check (str): name or number of the requested check
+
+    Returns:
+        (bool): True if check is enabled, False if it is not
+    """
+    try:
+        if check.isdigit():
+            if int(check) not in CHECKS_MAPPING.keys():
+                return False
+        else:
+            if check not in CHECKS_MAPPING.values():
+                return False
+        return True
+    except Exception as e:
+        log.error(f'[!] Error while checking on mapping: {e}')
+
+def get_check_name(check):
+    """
+    Get the name of a requested check
+
+    Args:
+        check (str): name or number of the requested check
+
+    Returns:
+        (str): check name
+    """
+    return CHECKS_MAPPING[int(check)] if check.isdigit() else check
+
+def get_check(check_name):
+    """
+    Get the coroutine function of a check, importing its module (`scripts/<check_name>.py`)
+    on first use only, so only the requested checks and their dependencies are ever imported
+
+    Args:
+        check_name (str): check name
+
+    Returns:
+        (function): check coroutine function
+    """
+    if check_name not in _checks:
+        start = time.perf_counter()
+        mod = importlib.import_module(f'scripts.{check_name}')
+        _import_times[check_name] = time.perf_counter() - start
+        _checks[check_name] = getattr(mod, check_name)
+    return _checks[check_name]
+
+def get_import_times():
+    """
+    Get the time spent importing each check. Dependencies shared by several checks are counted
+    on the first check importing them only
+
+    Returns:
+        (dict): check name:seconds dict, in import order
+    """
+    return dict(_import_times)
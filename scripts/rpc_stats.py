@@ -0,0 +1,178 @@
+import contextlib
+import contextvars
+import logging
+import sys
+import threading
+import time
+
+from config import RPC_ENDPOINTS
+from constants import CONST
+from urllib.parse import urlparse
+
+
+log = logging.getLogger()
+
+# check running in the current task/thread, set by `main.run_check` and copied to the worker threads
+_check = contextvars.ContextVar('check', default=None)
+# (endpoint, method, check):counters dict
+_stats = dict()
+_lock = threading.Lock()
+
+def get_check():
+    """
+    Get the check the current call is made for
+
+    Returns:
+        (str): check name, None if not called by a check
+    """
+    return _check.get()
+
+def set_check(check_name):
+    """
+    Attribute the calls of the current context (task or thread) to a check
+
+    Args:
+        check_name (str): check name
+    """
+    _check.set(check_name)
+
+@contextlib.contextmanager
+def use_check(check_name):
+    """
+    Attribute the calls made within the block to a check, then restore the previous one
+
+    Args:
+        check_name (str): check name
+    """
+    token = _check.set(check_name)
+    try:
+        yield
+    finally:
+        _check.reset(token)
+
+def get_chain(endpoint):
+    """
+    Get the chain of an endpoint
+
+    Args:
+        endpoint (str): endpoint url
+
+    Returns:
+        (str): chain name, None if the endpoint is not in `RPC_ENDPOINTS`
+    """
+    for chain, chain_endpoints in RPC_ENDPOINTS.items():
+        if endpoint == chain_endpoints or (isinstance(chain_endpoints, list) and endpoint in chain_endpoints):
+            return chain
+    return None
+
+def record(endpoint, method, latency, nr_of_calls=1, response_bytes=0, nr_of_errors=0, is_retry=False):
+    """
+    Record an HTTP request sent to a provider, for the check of the current context
+
+    Args:
+        endpoint (str): endpoint url
+        method (str): JSON-RPC method (`batch` for a batch of several methods)
+        latency (float): seconds until the response (or the failure)
+        nr_of_calls (opt) (int): JSON-RPC calls in the request
+        response_bytes (opt) (int): response body size
+        nr_of_errors (opt) (int): failed calls (HTTP failure, rate limit or JSON-RPC error)
+        is_retry (opt) (bool): True if the request is a retry
+    """
+    key = (endpoint, method, _check.get())
+    with _lock:
+        if key not in _stats:
+            _stats[key] = {
+                'requests': 0,
+                'calls': 0,
+                'errors': 0,
+                'retries': 0,
+                'response_bytes': 0,
+                'latency_sum': 0,
+                'latency_max': 0,
+                'latency_buckets': [0] * (len(CONST['rpc_stats_buckets']) + 1)
+            }
+        stats = _stats[key]
+        stats['requests'] += 1
+        stats['calls'] += nr_of_calls
+        stats['errors'] += nr_of_errors
+        stats['retries'] += is_retry
+        stats['response_bytes'] += response_bytes
+        stats['latency_sum'] += latency
+        stats['latency_max'] = max(stats['latency_max'], latency)
+        bucket = next((i for i, bound in enumerate(CONST['rpc_stats_buckets']) if latency <= bound),
+                      len(CONST['rpc_stats_buckets']))
+        stats['latency_buckets'][bucket] += 1
+
+def get_percentile(buckets, percentile):
+    """
+    Estimate a latency percentile from a histogram (upper bound of the percentile's bucket)
+
+    Args:
+        buckets (list): requests per bucket of `rpc_stats_buckets` (last one unbounded)
+        percentile (float): percentile, 0 to 1
+
+    Returns:
+        (float): seconds, None if beyond the last bound
+    """
+    target = percentile * sum(buckets)
+    nr_of_requests = 0
+    for bound, count in zip(CONST['rpc_stats_buckets'], buckets):
+        nr_of_requests += count
+        if nr_of_requests >= target:
+            return bound
+    return None
+
+def get_records():
+    """
+    Get the RPC stats as records, one per (endpoint, method, check), cumulated since the start.
+    Endpoints are reported by host only since their path often carries an api key
+
+    Returns:
+        (list): `rpc_stats` records
+    """
+    with _lock:
+        items = [(key, dict(stats, latency_buckets=list(stats['latency_buckets']))) for key, stats in _stats.items()]
+    bounds = [str(bound) for bound in CONST['rpc_stats_buckets']] + ['+Inf']
+    return [{
+        'title': 'rpc_stats',
+        'timestamp': int(time.time()),
+        'check': check_name,
+        'chain': get_chain(endpoint),
+        'endpoint': urlparse(endpoint).netloc or endpoint,
+        'method': method,
+        'requests': stats['requests'],
+        'calls': stats['calls'],
+        'errors': stats['errors'],
+        'retries': stats['retries'],
+        'response_bytes': stats['response_bytes'],
+        'latency_avg': round(stats['latency_sum'] / stats['requests'], 4),
+        'latency_max': round(stats['latency_max'], 4),
+        'latency_p50': get_percentile(stats['latency_buckets'], 0.5),
+        'latency_p95': get_percentile(stats['latency_buckets'], 0.95),
+        'latency_buckets': dict(zip(bounds, stats['latency_buckets']))
+    } for (endpoint, method, check_name), stats in sorted(items, key=lambda item: -item[1]['calls'])]
+
+def print_summary():
+    """
+    Print (on stderr) the RPC stats of the run, the busiest (endpoint, method, check) first
+    """
+    columns = ['check', 'chain', 'endpoint', 'method', 'requests', 'calls', 'errors', 'retries', 'kb',
+               'avg_ms', 'p95_ms']
+    rows = [[
+        rpc_record['check'] or '-',
+        rpc_record['chain'] or '-',
+        rpc_record['endpoint'],
+        rpc_record['method'],
+        rpc_record['requests'],
+        rpc_record['calls'],
+        rpc_record['errors'],
+        rpc_record['retries'],
+        f'{rpc_record["response_bytes"] / 1024:.1f}',
+        f'{rpc_record["latency_avg"] * 1000:.0f}',
+        f'{rpc_record["latency_p95"] * 1000:.0f}' if rpc_record['latency_p95'] is not None else '-'
+    ] for rpc_record in get_records()]
+    widths = [max(len(str(row[i])) for row in rows + [columns]) for i in range(len(columns))]
+    print('\n[+] RPC stats:', file=sys.stderr)
+    for row in [columns] + rows:
+        print('  '.join(str(value).ljust(width) if i < 4 else str(value).rjust(width)
+                        for i, (value, width) in enumerate(zip(row, widths))), file=sys.stderr)
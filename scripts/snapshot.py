@@ -0,0 +1,303 @@
+import contextvars
+import json
+import logging
+import threading
+import time
+
+from . import block_cache, db, transport
+from collections import OrderedDict
+from concurrent.futures import Future
+from constants import CONST
+
+
+log = logging.getLogger()
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS rpc_results (
+    chain TEXT NOT NULL,
+    method TEXT NOT NULL,
+    params TEXT NOT NULL,
+    result TEXT NOT NULL,
+    PRIMARY KEY (chain, method, params)
+);
+'''
+
+# method:index of the block param of the state reads pinned to the snapshot's head
+BLOCK_PARAMS = {
+    'eth_call': 1,
+    'eth_getBalance': 1,
+    'eth_getCode': 1,
+    'eth_getStorageAt': 2,
+    'eth_getTransactionCount': 1
+}
+
+# snapshot of the current run, {started_at, heads} with the pinned chain:(head block number, timestamp)
+_current = {'started_at': time.time(), 'heads': dict()}
+# snapshot the current task/thread reads from, set by `main` and copied to the tasks and worker threads
+_snapshot = contextvars.ContextVar('snapshot', default=None)
+# (chain, method, params):result of the recent requests in LRU order, final ones are also on disk
+_results = OrderedDict()
+# (chain, method, params):future of the requests being fetched
+_in_flight = dict()
+_chain_locks = dict()
+_lock = threading.Lock()
+
+def start_run(ttl=0):
+    """
+    Attach the current context (and the tasks it creates) to the current snapshot, a new one is
+    started if it is older than `ttl` seconds (always by default). A one-shot run starts one for
+    all of its checks, a daemon one per check run reused for `snapshot_ttl` seconds
+
+    Args:
+        ttl (opt) (int): max age in seconds of the snapshot to reuse
+    """
+    global _current
+    with _lock:
+        if time.time() - _current['started_at'] >= ttl:
+            _current = {'started_at': time.time(), 'heads': dict()}
+        _snapshot.set(_current)
+
+def get_chain_lock(chain):
+    """
+    Get the lock serializing the head fetches of a chain
+
+    Args:
+        chain (str): chain name
+
+    Returns:
+        (Lock): chain lock
+    """
+    with _lock:
+        return _chain_locks.setdefault(chain, threading.Lock())
+
+def get_head(chain, endpoint):
+    """
+    Get the head pinned by the snapshot of the current run, fetched once per chain and
+    snapshot however many checks ask for it at the same time. Its timestamp is pinned along,
+    so the checks' time windows end at the pinned head whatever the block cache still holds
+
+    Args:
+        chain (str): chain name
+        endpoint (str): endpoint of the given chain
+
+    Returns:
+        (tuple): (block number, timestamp) of the pinned head
+    """
+    snapshot = _snapshot.get() or _current
+    with get_chain_lock(chain):
+        if chain not in snapshot['heads']:
+            snapshot['heads'][chain] = block_cache.fetch_head(chain, endpoint)
+        return snapshot['heads'][chain]
+
+def pin_params(chain, endpoint, method, params):
+    """
+    Replace the `latest` block param of a state read with the pinned head
+
+    Args:
+        chain (str): chain name
+        endpoint (str): endpoint of the given chain
+        method (str): JSON-RPC method
+        params (list): method params
+
+    Returns:
+        (list): pinned params
+    """
+    index = BLOCK_PARAMS.get(method)
+    if index is None or len(params) <= index or params[index] != 'latest':
+        return params
+    return params[:index] + [hex(get_head(chain, endpoint)[0])] + params[index + 1:]
+
+def get_block(method, params):
+    """
+    Get the block a request reads at
+
+    Args:
+        method (str): JSON-RPC method
+        params (list): method params
+
+    Returns:
+        (int): block number, None if unknown or a tag
+    """
+    index = 0 if method == 'eth_getBlockByNumber' else BLOCK_PARAMS.get(method)
+    if index is None or len(params) <= index or not isinstance(params[index], str):
+        return None
+    try:
+        return int(params[index], 16)
+    except ValueError:
+        return None
+
+def is_final(chain, method, params):
+    """
+    Check if the result of a request can never change: it reads a confirmed block (`CHAIN_CONFIRMATIONS`)
+
+    Args:
+        chain (str): chain name
+        method (str): JSON-RPC method
+        params (list): method params
+
+    Returns:
+        (bool): True if final, False if not
+    """
+    block_number = get_block(method, params)
+    return block_number is not None and block_cache.is_confirmed(chain, block_number)
+
+def claim(chain, method, params):
+    """
+    Get the future of a request: already resolved if the result is cached (memory, then
+    disk for final blocks), shared if an identical request is in flight, new otherwise.
+    The pinned block is part of the key since `latest` is resolved in the params
+
+    Args:
+        chain (str): chain name
+        method (str): JSON-RPC method
+        params (list): pinned method params
+
+    Returns:
+        future (Future): resolved with the request's result
+        is_owner (bool): True if the caller has to fetch the result and `settle` the future
+    """
+    key = (chain, method, json.dumps(params, sort_keys=True))
+    with _lock:
+        if key in _results:
+            _results.move_to_end(key)
+            future = Future()
+            future.set_result(_results[key])
+            return future, False
+        if key in _in_flight:
+            return _in_flight[key], False
+    if is_final(chain, method, params):
+        row = db.get_connection(SCHEMA).execute(
+            'SELECT result FROM rpc_results WHERE chain = ? AND method = ? AND params = ?', key).fetchone()
+        if row:
+            future = Future()
+            future.set_result(json.loads(row[0]))
+            store(key, future.result(), is_final=False)
+            return future, False
+    with _lock:
+        if key in _in_flight:
+            return _in_flight[key], False
+        future = _in_flight[key] = Future()
+    return future, True
+
+def store(key, result, is_final):
+    """
+    Cache a result in memory, and on disk if final
+
+    Args:
+        key (tuple): (chain, method, params) cache key
+        result (any): JSON-RPC result
+        is_final (bool): True to keep it on disk too
+    """
+    with _lock:
+        _results[key] = result
+        _results.move_to_end(key)
+        while len(_results) > CONST['snapshot_cache_size']:
+            _results.popitem(last=False)
+    if is_final:
+        conn = db.get_connection(SCHEMA)
+        with conn:
+            conn.execute('INSERT OR REPLACE INTO rpc_results VALUES (?, ?, ?, ?)', key + (json.dumps(result),))
+
+def settle(chain, method, params, future, res):
+    """
+    Resolve the future of a claimed request with its JSON-RPC response (or exception),
+    caching the result and releasing the identical requests waiting for it. Errors are not cached
+
+    Args:
+        chain (str): chain name
+        method (str): JSON-RPC method
+        params (list): pinned method params
+        future (Future): claimed future
+        res (dict|Exception): JSON-RPC response (or the exception raised while fetching it)
+    """
+    key = (chain, method, json.dumps(params, sort_keys=True))
+    try:
+        if isinstance(res, Exception):
+            raise res
+        if 'result' not in res or res['result'] is None:
+            raise ValueError(res.get('error', res))
+        store(key, res['result'], is_final(chain, method, params))
+        future.set_result(res['result'])
+    except Exception as e:
+        future.set_exception(e)
+    finally:
+        with _lock:
+            _in_flight.pop(key, None)
+
+def submit(chain, endpoint, method, params, fetch):
+    """
+    Get the future of a request through the cache, `fetch` is only called on a miss
+
+    Args:
+        chain (str): chain name
+        endpoint (str): endpoint of the given chain
+        method (str): JSON-RPC method
+        params (list): method params, a `latest` block param is pinned to the snapshot's head
+        fetch (function): called with the pinned params, returns a future resolved with the result
+
+    Returns:
+        future (Future): resolved with the request's result
+    """
+    params = pin_params(chain, endpoint, method, params)
+    future, is_owner = claim(chain, method, params)
+    if is_owner:
+        try:
+            fetched = fetch(params)
+        except Exception as e:
+            fetched = Future()
+            fetched.set_exception(e)
+        fetched.add_done_callback(lambda f: settle(chain, method, params, future,
+                                                   f.exception() or {'result': f.result()}))
+    return future
+
+def request(chain, endpoint, method, params):
+    """
+    Send a JSON-RPC request through the cache
+
+    Args:
+        chain (str): chain name
+        endpoint (str): endpoint of the given chain
+        method (str): JSON-RPC method
+        params (list): method params, a `latest` block param is pinned to the snapshot's head
+
+    Returns:
+        (any): JSON-RPC result, raises if the call failed
+    """
+    params = pin_params(chain, endpoint, method, params)
+    future, is_owner = claim(chain, method, params)
+    if is_owner:
+        try:
+            res = transport.rpc_request(endpoint, method, params)
+        except Exception as e:
+            res = e
+        settle(chain, method, params, future, res)
+    # no timeout: the owner always settles, once the transport's own timeouts and retries are spent
+    return future.result()
+
+def request_many(chain, endpoint, calls):
+    """
+    Send a list of JSON-RPC calls through the cache, the missing ones as a single batch request
+
+    Args:
+        chain (str): chain name
+        endpoint (str): endpoint of the given chain
+        calls (list): list of (method, params) tuples, a `latest` block param is pinned to the snapshot's head
+
+    Returns:
+        futures (list): one future per call, in the same order, resolved with the call's result
+    """
+    calls = [(method, pin_params(chain, endpoint, method, params)) for method, params in calls]
+    futures = [None] * len(calls)
+    missing = []
+    for i, (method, params) in enumerate(calls):
+        futures[i], is_owner = claim(chain, method, params)
+        if is_owner:
+            missing.append(i)
+    if missing:
+        try:
+            responses = transport.rpc_batch(endpoint, [calls[i] for i in missing])
+        except Exception as e:
+            responses = [e] * len(missing)
+        for i, res in zip(missing, responses):
+            settle(chain, calls[i][0], calls[i][1], futures[i], res)
+    return futures
@@ -0,0 +1,535 @@
+import contextvars
+import json
+import logging
+import requests
+import threading
+import time
+
+from . import rpc_stats
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from constants import CONST
+from requests.adapters import HTTPAdapter
+
+
+log = logging.getLogger()
+
+_sessions = dict()
+_batch_sizes = dict()
+# keys of the endpoints rejecting even 1-call batches, their calls are sent one by one
+_unbatched = set()
+_rate_limiters = dict()
+# url:health dict (latency EWMA, error rate EWMA, consecutive failures, recent latencies, ejection)
+_health = dict()
+_hedge_executor = None
+_lock = threading.Lock()
+
+class TokenBucket:
+    """
+    Token bucket rate limiter: `rate` tokens per second up to `burst` tokens.
+    The rate is halved on every rate limit error and slowly restored on successful calls
+    """
+    def __init__(self, rate, burst):
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Wait until a token is available and take it
+        """
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def slow_down(self):
+        """
+        Halve the rate and drop the available tokens, called on rate limit errors
+        """
+        with self.lock:
+            self.rate = max(self.rate / 2, CONST['rpc_rate_limit_min'])
+            self.tokens = 0
+
+    def speed_up(self):
+        """
+        Additively restore the rate towards its max, called on successful calls
+        """
+        with self.lock:
+            self.rate = min(self.rate + self.max_rate / 20, self.max_rate)
+
+def get_session(endpoint):
+    """
+    Get the pooled keep-alive session of a given endpoint, creating it on first use.
+    The same session (and its connection pool) is shared by all the helpers
+
+    Args:
+        endpoint (str): endpoint url
+
+    Returns:
+        session (Session): requests session
+    """
+    with _lock:
+        if endpoint not in _sessions:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=CONST['rpc_pool_connections'],
+                                  pool_maxsize=CONST['rpc_pool_maxsize'],
+                                  pool_block=CONST['rpc_pool_block'])
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            session.headers.update({
+                'Accept-Encoding': 'gzip, deflate',
+                'Connection': 'keep-alive',
+                'Content-Type': 'application/json'
+            })
+            _sessions[endpoint] = session
+        return _sessions[endpoint]
+
+def get_rate_limiter(endpoint):
+    """
+    Get the token bucket of a given endpoint, None if rate limiting is disabled
+
+    Args:
+        endpoint (str): endpoint url
+
+    Returns:
+        rate_limiter (TokenBucket)
+    """
+    if not CONST['rpc_rate_limit']:
+        return None
+    with _lock:
+        if endpoint not in _rate_limiters:
+            _rate_limiters[endpoint] = TokenBucket(CONST['rpc_rate_limit'], CONST['rpc_rate_limit_burst'])
+        return _rate_limiters[endpoint]
+
+def is_rate_limited(status_code, res):
+    """
+    Check if a response is a rate limit error (HTTP 429 or a JSON-RPC rate limit error)
+
+    Args:
+        status_code (int): HTTP status code
+        res (dict|list): decoded response, None if not JSON
+
+    Returns:
+        (bool): True if rate limited, False if not
+    """
+    if status_code == 429:
+        return True
+    if isinstance(res, dict) and isinstance(res.get('error'), dict):
+        message = str(res['error'].get('message', '')).lower()
+        return res['error'].get('code') == 429 or any(pattern in message for pattern in CONST['rpc_rate_limit_errors'])
+    return False
+
+def get_nr_of_errors(res, nr_of_calls):
+    """
+    Count the failed calls of a response
+
+    Args:
+        res (dict|list): decoded response, None if not JSON
+        nr_of_calls (int): JSON-RPC calls in the request
+
+    Returns:
+        (int): failed calls
+    """
+    if isinstance(res, list):
+        return sum(1 for item in res if not isinstance(item, dict) or 'error' in item)
+    if isinstance(res, dict):
+        return nr_of_calls if 'error' in res else 0
+    return nr_of_calls
+
+def get_urls(endpoint):
+    """
+    Get the urls of an endpoint, a chain can have a single url or a list of them (see `RPC_ENDPOINTS`)
+
+    Args:
+        endpoint (str|list): endpoint url or list of urls
+
+    Returns:
+        (list): urls
+    """
+    return [endpoint] if isinstance(endpoint, str) else list(endpoint)
+
+def get_endpoint_key(endpoint):
+    """
+    Get the key of an endpoint (its url, or its urls joined by `,`) to index the state learned per endpoint
+
+    Args:
+        endpoint (str|list): endpoint url or list of urls
+
+    Returns:
+        (str): endpoint key
+    """
+    return ','.join(get_urls(endpoint))
+
+def get_health(url):
+    """
+    Get the health state of a given url, creating it on first use
+
+    Args:
+        url (str): endpoint url
+
+    Returns:
+        (dict): `latency` (EWMA, None until the first response), `error_rate` (EWMA), `failures`
+                (consecutive), `latencies` (the last `rpc_latency_window`) and `is_ejected` keys
+    """
+    with _lock:
+        if url not in _health:
+            _health[url] = {
+                'latency': None,
+                'error_rate': 0,
+                'failures': 0,
+                'latencies': deque(maxlen=CONST['rpc_latency_window']),
+                'is_ejected': False
+            }
+        return _health[url]
+
+def get_score(url):
+    """
+    Get the routing score of a given url (lower is better): the latency EWMA inflated by the error
+    rate, ejected urls after all the others and urls never measured first
+
+    Args:
+        url (str): endpoint url
+
+    Returns:
+        (tuple): sort key
+    """
+    health = get_health(url)
+    return health['is_ejected'], (health['latency'] or 0) / max(1 - health['error_rate'], 0.05)
+
+def rank_urls(endpoint):
+    """
+    Get the urls of an endpoint, best first
+
+    Args:
+        endpoint (str|list): endpoint url or list of urls
+
+    Returns:
+        (list): urls
+    """
+    return sorted(get_urls(endpoint), key=get_score)
+
+def get_p95(url):
+    """
+    Get the 95th percentile of the recent latencies of a given url
+
+    Args:
+        url (str): endpoint url
+
+    Returns:
+        (float): seconds, None if less than `rpc_hedge_min_samples` latencies are known
+    """
+    health = get_health(url)
+    with _lock:
+        latencies = sorted(health['latencies'])
+    if len(latencies) < CONST['rpc_hedge_min_samples']:
+        return None
+    return latencies[int(0.95 * (len(latencies) - 1))]
+
+def update_health(url, latency, is_failure, is_limited=False, is_pooled=True):
+    """
+    Update the health of a given url with a response (or a failure). A url of a pool is ejected after
+    `rpc_eject_failures` consecutive failures or when its error rate (rate limits included)
+    exceeds `rpc_eject_error_rate`, then re-probed in background until it answers again.
+    A single url endpoint has nothing to fail over to, so it is never ejected
+
+    Args:
+        url (str): endpoint url
+        latency (float): seconds until the response (or the failure)
+        is_failure (bool): True if the request failed (connection error, invalid response, 5xx)
+        is_limited (opt) (bool): True if the request was rate limited
+        is_pooled (opt) (bool): False if the url is the only one of its endpoint
+    """
+    health = get_health(url)
+    alpha = CONST['rpc_ewma_alpha']
+    with _lock:
+        health['error_rate'] = (1 - alpha) * health['error_rate'] + alpha * (is_failure or is_limited)
+        is_ejected = health['is_ejected']
+        if is_failure or is_limited:
+            health['failures'] += is_failure
+            health['is_ejected'] |= is_pooled and (health['failures'] >= CONST['rpc_eject_failures'] or
+                                                   health['error_rate'] > CONST['rpc_eject_error_rate'])
+        else:
+            health['failures'] = 0
+            health['latency'] = latency if health['latency'] is None else (1 - alpha) * health['latency'] + alpha * latency
+            health['latencies'].append(latency)
+            if is_ejected:
+                health['is_ejected'] = False
+                health['error_rate'] = 0
+    if health['is_ejected'] and not is_ejected:
+        log.error(f'[!] Endpoint {url} ejected after {health["failures"]} failures, re-probing it in background')
+        threading.Thread(target=probe, args=(url,), daemon=True).start()
+    elif is_ejected and not health['is_ejected']:
+        log.error(f'[!] Endpoint {url} is healthy again')
+
+def probe(url):
+    """
+    Send `eth_blockNumber` to an ejected url every `rpc_probe_interval` seconds until it answers
+    (a successful response re-admits it)
+
+    Args:
+        url (str): endpoint url
+    """
+    payload = json.dumps({'method': 'eth_blockNumber', 'params': [], 'id': 1, 'jsonrpc': '2.0'})
+    while get_health(url)['is_ejected']:
+        time.sleep(CONST['rpc_probe_interval'])
+        try:
+            send(url, payload, 'eth_blockNumber', 1, False)
+        except Exception:
+            pass
+
+def send(url, payload, method, nr_of_calls, is_retry, is_pooled=True):
+    """
+    POST a JSON-RPC payload to a given url through its pooled session and rate limiter,
+    recording the attempt in the RPC stats and in the url's health
+
+    Args:
+        url (str): endpoint url
+        payload (str): JSON encoded request (single or batch)
+        method (str): JSON-RPC method, `batch` for a batch of several methods
+        nr_of_calls (int): JSON-RPC calls in the payload
+        is_retry (bool): True if the request is a retry (or a hedged request)
+        is_pooled (opt) (bool): False if the url is the only one of its endpoint (see `update_health`)
+
+    Returns:
+        req (Response): HTTP response
+        res (dict|list): decoded JSON response, None if not JSON
+        is_limited (bool): True if rate limited
+    """
+    rate_limiter = get_rate_limiter(url)
+    if rate_limiter:
+        rate_limiter.acquire()
+    started_at = time.perf_counter()
+    try:
+        req = get_session(url).post(url, data=payload, timeout=CONST['rpc_timeout'])
+    except Exception:
+        latency = time.perf_counter() - started_at
+        rpc_stats.record(url, method, latency, nr_of_calls, nr_of_errors=nr_of_calls, is_retry=is_retry)
+        update_health(url, latency, True, is_pooled=is_pooled)
+        raise
+    latency = time.perf_counter() - started_at
+    try:
+        res = req.json()
+    except ValueError:
+        res = None
+    is_limited = is_rate_limited(req.status_code, res)
+    rpc_stats.record(url, method, latency, nr_of_calls, len(req.content),
+                     nr_of_calls if is_limited else get_nr_of_errors(res, nr_of_calls), is_retry)
+    update_health(url, latency, res is None or req.status_code >= 500, is_limited, is_pooled)
+    if rate_limiter:
+        rate_limiter.slow_down() if is_limited else rate_limiter.speed_up()
+    return req, res, is_limited
+
+def get_hedge_executor():
+    """
+    Get the thread pool running the hedged requests, created on first use
+
+    Returns:
+        (ThreadPoolExecutor): thread pool
+    """
+    global _hedge_executor
+    with _lock:
+        if _hedge_executor is None:
+            _hedge_executor = ThreadPoolExecutor(max_workers=CONST['rpc_hedge_workers'])
+        return _hedge_executor
+
+def send_hedged(urls, payload, method, nr_of_calls, is_retry, is_pooled=True):
+    """
+    Send a payload to the best url. With `rpc_hedging` enabled, if it has not answered within its
+    p95 latency (at least `rpc_hedge_min_delay` seconds) the same payload is also sent to the
+    second best url, and the first good response wins
+
+    Args:
+        urls (list): candidate urls, best first
+        payload (str): JSON encoded request (single or batch)
+        method (str): JSON-RPC method, `batch` for a batch of several methods
+        nr_of_calls (int): JSON-RPC calls in the payload
+        is_retry (bool): True if the request is a retry
+        is_pooled (opt) (bool): False if the endpoint has a single url (see `update_health`)
+
+    Returns:
+        url (str): url of the response
+        req (Response): HTTP response
+        res (dict|list): decoded JSON response, None if not JSON
+        is_limited (bool): True if rate limited
+    """
+    p95 = get_p95(urls[0]) if CONST['rpc_hedging'] and len(urls) > 1 else None
+    if p95 is None:
+        return urls[0], *send(urls[0], payload, method, nr_of_calls, is_retry, is_pooled)
+    executor = get_hedge_executor()
+    futures = {executor.submit(contextvars.copy_context().run, send, urls[0], payload, method, nr_of_calls,
+                               is_retry): urls[0]}
+    done, _ = wait(futures, timeout=max(p95, CONST['rpc_hedge_min_delay']))
+    if not done:
+        futures[executor.submit(contextvars.copy_context().run, send, urls[1], payload, method, nr_of_calls,
+                                True)] = urls[1]
+    pending = set(futures)
+    response = None
+    error = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            try:
+                req, res, is_limited = future.result()
+            except Exception as e:
+                error = e
+                continue
+            if res is not None and not is_limited:
+                return futures[future], req, res, is_limited
+            response = (futures[future], req, res, is_limited)
+    if response is None:
+        raise error
+    return response
+
+def post_json(endpoint, payload, method='batch', nr_of_calls=1):
+    """
+    POST a JSON-RPC payload to an endpoint (a url or a list of urls, routed by latency and error rate),
+    waiting for the url's rate limiter. Failed or rate limited requests are retried on the next url
+    and, once all the urls have been tried, with exponential backoff (or `Retry-After`).
+    Every attempt is recorded in the RPC stats
+
+    Args:
+        endpoint (str|list): endpoint url or list of urls
+        payload (str): JSON encoded request (single or batch)
+        method (opt) (str): JSON-RPC method, `batch` for a batch of several methods
+        nr_of_calls (opt) (int): JSON-RPC calls in the payload
+
+    Returns:
+        res (dict|list): decoded JSON response
+    """
+    nr_of_urls = len(get_urls(endpoint))
+    tried = set()
+    req = None
+    for attempt in range(CONST['rpc_max_retries'] + 1):
+        urls = [url for url in rank_urls(endpoint) if url not in tried]
+        if not urls:
+            # every url failed or was rate limited, wait before trying them again
+            tried.clear()
+            urls = rank_urls(endpoint)
+            retry_after = req.headers.get('Retry-After', '') if req is not None else ''
+            time.sleep(float(retry_after) if retry_after.isdigit() else CONST['rpc_backoff_base'] * 2 ** (attempt - 1))
+        try:
+            url, req, res, is_limited = send_hedged(urls, payload, method, nr_of_calls, attempt > 0, nr_of_urls > 1)
+        except Exception:
+            if nr_of_urls == 1 or attempt == CONST['rpc_max_retries']:
+                raise
+            tried.add(urls[0])
+            continue
+        if not is_limited:
+            if res is not None:
+                return res
+            if nr_of_urls == 1 or attempt == CONST['rpc_max_retries']:
+                req.raise_for_status()
+                raise ValueError(f'invalid JSON response from {url}')
+        tried.add(url)
+    if res is None:
+        req.raise_for_status()
+    return res
+
+def rpc_request(endpoint, method, params):
+    """
+    Send a JSON-RPC request through the endpoint's pooled session (and rate limiter)
+
+    Args:
+        endpoint (str|list): endpoint url or list of urls
+        method (str): JSON-RPC method
+        params (list): method params
+
+    Returns:
+        res (dict): decoded JSON-RPC response
+    """
+    payload = json.dumps({
+        'method': method,
+        'params': params,
+        'id': 1,
+        'jsonrpc': '2.0'
+    })
+    return post_json(endpoint, payload, method)
+
+def is_batch_rejected(e):
+    """
+    Check if a batch request failed because the provider rejected the batch (an error instead
+    of an array, a 4xx status, an invalid response) rather than a transient 5xx
+
+    Args:
+        e (Exception): exception raised while sending the batch
+
+    Returns:
+        (bool): True if rejected, False if not
+    """
+    if isinstance(e, requests.HTTPError) and e.response is not None:
+        return e.response.status_code < 500
+    return True
+
+def rpc_batch(endpoint, calls):
+    """
+    Send a list of JSON-RPC calls as JSON-RPC 2.0 batch arrays through the endpoint's pooled session.
+    Batches start at `rpc_batch_size` calls and are halved (and the size remembered for the endpoint)
+    every time the provider rejects them, if it still rejects a single call batch the calls are sent
+    as plain requests from then on. Connection errors and 5xx fail the whole batch.
+    Responses are matched back by `id` and a failing item does not affect the others
+
+    Args:
+        endpoint (str|list): endpoint url or list of urls
+        calls (list): list of (method, params) tuples
+
+    Returns:
+        responses (list): one decoded JSON-RPC response per call, in the same order,
+                          items that failed carry an `error` field
+    """
+    key = get_endpoint_key(endpoint)
+    responses = [None] * len(calls)
+    pending = list(range(len(calls)))
+    while pending:
+        if key in _unbatched:
+            i = pending.pop(0)
+            try:
+                res = rpc_request(endpoint, *calls[i])
+                responses[i] = dict(res, id=i) if isinstance(res, dict) else {
+                    'jsonrpc': '2.0', 'id': i, 'error': {'code': -32603, 'message': str(res)}}
+            except Exception as e:
+                log.error(f'[!] Error while sending request to {endpoint}: {e}')
+                responses[i] = {'jsonrpc': '2.0', 'id': i, 'error': {'code': -32603, 'message': str(e)}}
+            continue
+        batch_size = _batch_sizes.get(key, CONST['rpc_batch_size'])
+        batch = pending[:batch_size]
+        try:
+            payload = json.dumps([{
+                'method': calls[i][0],
+                'params': calls[i][1],
+                'id': i,
+                'jsonrpc': '2.0'
+            } for i in batch])
+            methods = {calls[i][0] for i in batch}
+            res = post_json(endpoint, payload, methods.pop() if len(methods) == 1 else 'batch', len(batch))
+            if not isinstance(res, list):
+                raise ValueError(res.get('error', res) if isinstance(res, dict) else res)
+            res_by_id = {item.get('id'): item for item in res if isinstance(item, dict)}
+            for i in batch:
+                responses[i] = res_by_id.get(i, {'jsonrpc': '2.0', 'id': i,
+                                                 'error': {'code': -32603, 'message': 'missing from batch response'}})
+            pending = pending[len(batch):]
+        except Exception as e:
+            if isinstance(e, (requests.ConnectionError, requests.Timeout)) or not is_batch_rejected(e):
+                log.error(f'[!] Error while sending batch request to {endpoint}: {e}')
+                for i in batch:
+                    responses[i] = {'jsonrpc': '2.0', 'id': i, 'error': {'code': -32603, 'message': str(e)}}
+                pending = pending[len(batch):]
+                continue
+            with _lock:
+                if len(batch) > 1:
+                    _batch_sizes[key] = max(len(batch) // 2, 1)
+                else:
+                    _unbatched.add(key)
+            if len(batch) == 1:
+                log.error(f'[!] Error while sending batch request to {endpoint}, sending the calls one by one: {e}')
+    return responses
@@ -5,8 +5,9 @@ import time
 
 log = logging.getLogger()
 
-def user_ops():
+async def user_ops():
     """
     Loop chains list, call `eth_getLogs` and look for userops
     """
-    print('tbi')
+    log.debug('[+] Check `user_ops` is not implemented yet')
+    return []
@@ -1,194 +1,101 @@
-import aiohttp
 import asyncio
-import json
+import eth_abi.grammar
+import eth_utils
 import logging
-import os
-import requests
-import statistics
 import time
 
-from checks_mapping import CHECKS_MAPPING
-from config import RPC_ENDPOINTS, SUBPUB_CONFIG
-from constants import CHAIN_DECIMALS, COINGECKO_MAPPING, CONST, FACTORY_ADDRS_DICT
-from web3 import Web3
+from . import abi_registry, block_cache, event_store, log_scanner, multicall, rpc_stats, snapshot, transport
+from concurrent.futures import Future
+from config import RPC_ENDPOINTS
+from constants import CHAIN_DECIMALS, COINGECKO_MAPPING, CONST, HUB_LOG_TOPICS, TOPICS
 
 
 log = logging.getLogger()
 
-class StdErrFilter(logging.Filter):
-    def filter(self, rec):
-        """
-        Logger stderr filter
-
-        Args:
-            rec: record to log (or filter out)
-        """
-        return rec.levelno == logging.ERROR
-
-class StdOutFilter(logging.Filter):
-    def filter(self, rec):
-        """
-        Logger stderr filter
-
-        Args:
-            rec: record to log (or filter out)
-        """
-        return rec.levelno == logging.INFO
-
-def is_value_missing_in_config():
-    """
-    Look for missing values in the config file
-
-    Returns:
-        missing_values_list (list) if missing fields, empty list if none
-    """
-    config_merged_dict = {**RPC_ENDPOINTS, **SUBPUB_CONFIG}
-    missing_values_list = []
-    for key, val in config_merged_dict.items():
-        if not val and val != 0:
-            missing_values_list.append(key)
-    if missing_values_list:
-        return missing_values_list
-    else:
-        return []
-
-def is_check_in_mapping(check):
+def get_proxy_contract_impl_addr(contract_addr, chain, endpoint):
     """
-    Check if the monitoring checks the user requested are enabled on the CHECKS_MAPPING dict
+    Get the implementation address for a given contract address using the `implementation_slot`,
+    read at the run's pinned head through the request cache
 
     Args:
-        check (str): name or number of the requested check
+        contract_addr (str): proxy contract address
+        chain (str): chain name
+        endpoint (str): endpoint for the given contract's chain
 
     Returns:
-        (bool): True if check is enabled, False if it is not
+        impl_addr (str): implementation address
     """
     try:
-        if check.isdigit():
-            if int(check) not in CHECKS_MAPPING.keys():
-                return False
-        else:
-            if check not in CHECKS_MAPPING.values():
-                return False
-        return True
+        impl_addr_unf = snapshot.request(chain, endpoint, 'eth_getStorageAt', [
+            eth_utils.to_checksum_address(contract_addr), CONST['implementation_slot'], 'latest'])
+        impl_addr = f'0x{impl_addr_unf[2:].lstrip("0")}'
+        return impl_addr
     except Exception as e:
-        log.error(f'[!] Error while checking on mapping: {e}')
-
-def is_blocks_per_day_file_older_than_a_day():
-    """
-    Check if the `blocks_per_day.json` file is older than a day
-
-    Returns: (bool) True if older, False if not
-    """
-    try:
-        if int(os.path.getctime('blocks_per_day.json')) > 86400:
-            return True
-        return False
-    except FileNotFoundError:
-        return True
+        log.error(f'[!] Error while getting proxy impl addr for {contract_addr} via {endpoint}: {e}')
 
-async def get_block_by_number_async(block_num, endpoint, session, ret_block_num=False):
+def normalize_abi_output(abi_type, value):
     """
-    Call `eth_getBlockByNum` for a given hex block number
+    Checksum all the addresses in a decoded value (the same way web3 does for call results)
 
     Args:
-        block_num (str): hex block number (or `latest`)
-        session (ClientSession): aiohttp session
-        endpoint (str): endpoint for the given chain
-        ret_block_num (bool): if True, return the block number along with the timestamp
+        abi_type (ABIType): parsed abi type (see `eth_abi.grammar.parse`)
+        value (any): decoded value
 
     Returns:
-        block timestamp (int) and block number if `ret_block_num` is True
-    """
-    data = {
-        'method': 'eth_getBlockByNumber',
-        'params': [block_num, False],
-        'id': 1,
-        'jsonrpc': '2.0'
-    }
-    try:
-        async with session.post(endpoint, json=data) as resp:
-            req = await resp.json()
-        if ret_block_num:
-            return int(req['result']['timestamp'], 16), int(req['result']['number'], 16)
-        else:
-            return int(req['result']['timestamp'], 16)
-    except Exception as e:
-        log.error(f'[!] Error while getting block by number: {e}')
-
-async def dump_blocks_per_day_on_file():
+        value (any): normalized value
     """
-    Get blocks per day for all the enabled chains and dump on file
+    if abi_type.is_array:
+        return [normalize_abi_output(abi_type.item_type, item) for item in value]
+    if isinstance(abi_type, eth_abi.grammar.TupleType):
+        return tuple(normalize_abi_output(component, item) for component, item in zip(abi_type.components, value))
+    if abi_type.base == 'address':
+        return eth_utils.to_checksum_address(value)
+    return value
+
+def encode_contract_call(addr_unf, chain, method, abi_addr_unf=None, method_args=None):
     """
-    blocks_per_day_dict = dict()
-    for chain, endpoint in RPC_ENDPOINTS.items():
-        try:
-            async with aiohttp.ClientSession() as session:
-                latest_ts, latest_block = await get_block_by_number_async('latest', endpoint,
-                                                                          session, ret_block_num=True)
-                tasks = []
-                for n in range(100, 2000, 100):
-                    tasks.append(asyncio.ensure_future(get_block_by_number_async(hex(latest_block - n),
-                                                                                 endpoint, session)))
-                r1 = await asyncio.gather(*tasks)
-                diff_list = [(r1[i] - r1[i + 1]) / 100 for i in range(len(r1) - 1)]
-                median = round(statistics.median(diff_list), 2)
-                blocks_per_day = int(86400 / median)
-                blocks_per_day_dict[chain] = blocks_per_day
-        except Exception as e:
-            log.error(f'[!] Error while calculating blocks per day for {chain}: {e}')
-            continue
-    with open('blocks_per_day.json', 'w+') as f_blocks_per_day:
-        json.dump(blocks_per_day_dict, f_blocks_per_day)
-    return
-
-def get_abi_from_addr(chain, addr):
-    """
-    Load the relative abi in `abi/` by the format `abi/<chain>_<addr>.json`.
-    If it's missing, throw an error and return empty list
+    Encode the call data of a given contract method, through the cached contract handle
 
     Args:
+        addr_unf (str): unformatted contract address
         chain (str): chain name
-        addr (str): contract address
+        method (str): method to call
+        abi_addr_unf (opt) (str): unformatted abi address
+        method_args (opt) (list): list of args to pass
 
     Returns:
-        abi (list): contract abi, [] if abi json missing
+        addr (str): checksum contract address
+        calldata (str): hex encoded call data
+        function (dict): function spec (see `abi_registry.get_function`)
     """
-    try:
-        if not os.path.exists(CONST['abi_path'].format(chain, addr)):
-            log.error(f'[!] Missing abi for {addr} on {chain}')
-            return []
-        else:
-            with open(CONST['abi_path'].format(chain, addr), 'r') as f_abi_r:
-                abi = json.load(f_abi_r)
-            return abi
-    except Exception as e:
-        log.error(f'[!] Error while downloading abi for {chain}: {e}')
+    contract = abi_registry.get_contract(chain, addr_unf, abi_addr_unf)
+    calldata, function = contract.encode_call(method, method_args or [])
+    return contract.addr, calldata, function
 
-def get_proxy_contract_impl_addr(contract_addr, endpoint):
+def decode_contract_result(function, data):
     """
-    Get the implementation address for a given contract address using the `implementation_slot`
+    Decode the return data of a contract call
 
     Args:
-        contract_addr (str): proxy contract address
-        endpoint (str): endpoint for the given contract's chain
+        function (dict): function spec (see `abi_registry.get_function`)
+        data (str): hex return data
 
     Returns:
-        impl_addr (str): implementation address
+        method_res (any): single value if the method has one output, list of values otherwise
     """
-    try:
-        w3 = Web3(Web3.HTTPProvider(endpoint))
-        impl_addr_unf = Web3.to_hex(w3.eth.get_storage_at(Web3.to_checksum_address(contract_addr),
-                                                          CONST['implementation_slot']))
-        impl_addr = f'0x{impl_addr_unf[2:].lstrip("0")}'
-        return impl_addr
-    except Exception as e:
-        log.error(f'[!] Error while getting proxy impl addr for {contract_addr} via {endpoint}: {e}')
+    decoded = abi_registry.decode(function, eth_utils.decode_hex(data))
+    method_res = [normalize_abi_output(abi_type, value)
+                  for abi_type, value in zip(function['parsed_output_types'], decoded)]
+    if len(method_res) == 1:
+        return method_res[0]
+    return method_res
 
 def call_contract_method(addr_unf, chain, endpoint, method,
                          abi_addr_unf=None, method_args=None):
     """
-    Call a given function (from `contract.functions`) passing the given args (if any)
-    and return the results
+    Call a given function passing the given args (if any) and return the results.
+    If an aggregator is configured for the chain, the call is merged with the other
+    pending view calls of the chain into a single multicall
 
     Args:
         addr_unf (str): unformatted contract address
@@ -201,69 +108,105 @@ def call_contract_method(addr_unf, chain, endpoint, method,
     Returns:
         method_res (any): call results
     """
-    try:
-        addr = Web3.to_checksum_address(addr_unf)
-        if abi_addr_unf:
-            abi_addr = Web3.to_checksum_address(abi_addr_unf)
-        else:
-            abi_addr = addr
-        abi = get_abi_from_addr(chain, abi_addr)
-        w3 = Web3(Web3.HTTPProvider(endpoint))
-        contract = w3.eth.contract(address=addr, abi=abi)
-        if method_args:
-            call = getattr(contract.functions, method)(*method_args)
-        else:
-            call = getattr(contract.functions, method)()
-        method_res = call.call()
-        return method_res
-    except Exception as e:
-        log.error(f'[!] Error while calling {method}({method_args}) on {chain}: {e}')
-
-def get_hub_addr_from_factory_list():
+    return call_contract_methods(chain, endpoint, [{
+        'addr': addr_unf,
+        'method': method,
+        'abi_addr': abi_addr_unf,
+        'method_args': method_args
+    }])[0]
+
+def call_contract_methods(chain, endpoint, calls):
     """
-    Loop the endpoint list and extract hub contract address from factory
-    address calling the `hub` method
+    Call a list of contract functions on a given chain and return their results, as a single
+    multicall if an aggregator is configured for the chain or one by one if not.
+    Calls are made at the run's pinned head through the request cache, so the same getter
+    called by several checks is only sent once
+
+    Args:
+        chain (str): chain name
+        endpoint (str): endpoint of the given chain
+        calls (list): list of dicts with `addr`, `method` and (opt) `abi_addr` and `method_args` keys
 
     Returns:
-        hub_addr_list (list): list of hub addresses
+        results (list): results of each call, in the same order, None if the call failed
     """
-    hub_addr_list = list()
-    for chain, endpoint in RPC_ENDPOINTS.items():
+    results = [None] * len(calls)
+    encoded_calls = [None] * len(calls)
+    futures = [None] * len(calls)
+    for i, call in enumerate(calls):
         try:
-            w3 = Web3(Web3.HTTPProvider(endpoint))
-            factory_addr_unf = FACTORY_ADDRS_DICT[chain]
-            factory_addr = Web3.to_checksum_address(factory_addr_unf)
-            abi = get_abi_from_addr(chain, factory_addr)
-            contract = w3.eth.contract(address=factory_addr, abi=abi)
-            call_hub_addr = contract.functions.hub()
-            hub_addr = call_hub_addr.call()
-            hub_addr_list.append({'chain': chain,
-                                  'addr': hub_addr})
+            encoded_calls[i] = encode_contract_call(call['addr'], chain, call['method'],
+                                                    abi_addr_unf=call.get('abi_addr'),
+                                                    method_args=call.get('method_args'))
+            addr, calldata, _ = encoded_calls[i]
+            futures[i] = snapshot.submit(chain, endpoint, 'eth_call', [{'to': addr, 'data': calldata}, 'latest'],
+                                         lambda params: send_call(chain, endpoint, params))
         except Exception as e:
-            log.error(f'[!] Error while getting hub address for {chain}: {e}')
+            log.error(f'[!] Error while calling {call["method"]}({call.get("method_args")}) on {chain}: {e}')
+    for i, call in enumerate(calls):
+        if futures[i] is None:
             continue
-    return hub_addr_list
+        try:
+            data = futures[i].result()
+            results[i] = decode_contract_result(encoded_calls[i][2], data)
+        except Exception as e:
+            log.error(f'[!] Error while calling {call["method"]}({call.get("method_args")}) on {chain}: {e}')
+    return results
+
+def send_call(chain, endpoint, params):
+    """
+    Send an `eth_call`, merged into the chain's next multicall if an aggregator is configured
+
+    Args:
+        chain (str): chain name
+        endpoint (str): endpoint of the given chain
+        params (list): `eth_call` params ({to, data} and block)
+
+    Returns:
+        future (Future): resolved with the call's return data (hex)
+    """
+    if multicall.is_enabled(chain):
+        return multicall.submit(chain, endpoint, params[0]['to'], params[0]['data'], params[1])
+    future = Future()
+    res = transport.rpc_request(endpoint, 'eth_call', params)
+    if 'result' not in res:
+        raise ValueError(res.get('error', res))
+    future.set_result(res['result'])
+    return future
+
+async def gather_by_chain(func, *args):
+    """
+    Run `func(chain, endpoint, *args)` for every enabled chain concurrently, each one
+    on a worker thread, and merge the returned records keeping the chains order
+
+    Args:
+        func (function): blocking function returning a list of records for a single chain
+        args (opt): extra args to pass to `func`
+
+    Returns:
+        records (list): records of all the chains
+    """
+    tasks = [asyncio.to_thread(func, chain, endpoint, *args) for chain, endpoint in RPC_ENDPOINTS.items()]
+    results = await asyncio.gather(*tasks)
+    return [record for chain_records in results if chain_records for record in chain_records]
 
-def get_latest_block_by_chain(endpoint):
+def get_latest_block_by_chain(endpoint, chain=None):
     """
-    Get latest block of a given chain via its endpoint
+    Get latest block of a given chain via its endpoint. With a chain, the head pinned for the
+    run is returned (see `snapshot`) so all the checks of a run read the same chain state
 
     Args:
         endpoint (str): endpoint of the given chain
+        chain (opt) (str): chain name, if given the head (and its timestamp) is recorded in the block cache
 
     Returns:
         block_num (int): latest block number of the given chain
     """
     try:
-        payload = json.dumps({
-            'method': 'eth_getBlockByNumber',
-            'params': ['latest', False],
-            'id': 1,
-            'jsonrpc': '2.0'
-        })
-        res = requests.post(endpoint, data=payload).json()
-        block_num = int(res['result']['number'], 16)
-        return block_num
+        if chain:
+            return snapshot.get_head(chain, endpoint)[0]
+        res = transport.rpc_request(endpoint, 'eth_getBlockByNumber', ['latest', False])
+        return int(res['result']['number'], 16)
     except Exception as e:
         log.error(f'[!] Error while getting latest block on {endpoint}: {e}')
 
@@ -279,51 +222,48 @@ def get_blocks_range_by_ts(chain, nr_of_days, nr_of_hours, nr_of_minutes):
 
     Returns:
         _from (int): start block (past)
-        to (int): latest block (now)
+        to (int): head block pinned for the run
     """
     try:
-        with open('blocks_per_day.json') as f_blocks_per_day:
-            blocks_per_day_dict = json.load(f_blocks_per_day)
-        if nr_of_days:
-            nr_of_blocks_in_the_past = blocks_per_day_dict[chain] * nr_of_days
-        elif nr_of_hours:
-            nr_of_blocks_in_the_past = (blocks_per_day_dict[chain] / 24) * nr_of_hours
-        elif nr_of_minutes:
-            nr_of_blocks_in_the_past = (blocks_per_day_dict[chain] / 3600) * nr_of_minutes
-        to = get_latest_block_by_chain(RPC_ENDPOINTS[chain])
-        _from = to - nr_of_blocks_in_the_past
-        return int(_from), int(to)
+        window = 86400 * (nr_of_days or 0) + 3600 * (nr_of_hours or 0) + 60 * (nr_of_minutes or 0)
+        to, to_ts = snapshot.get_head(chain, RPC_ENDPOINTS[chain])
+        _from = block_cache.get_block_by_timestamp(chain, RPC_ENDPOINTS[chain], to_ts - window, head=(to, to_ts))
+        return _from, to
     except Exception as e:
         log.error(f'[!] Error while getting block by timestamp for {chain}: {e}')
+        raise
 
-def get_block_ts_by_number_sync(block, chain):
+def get_blocks_ts_by_number_sync(blocks, chain):
     """
-    Get block's timestamp given its value (in hex) and its chain
+    Get the timestamps of a list of blocks (in hex) on a given chain through the block cache,
+    the missing ones are fetched with a single batch request
 
     Args:
-        block (hex): block number
+        blocks (list): hex block numbers
         chain (str): chain name
 
-    Returns: block's timestamp (int)
+    Returns:
+        blocks_ts (dict): hex block number:timestamp (int) dict, failed blocks are missing
     """
+    blocks_ts = dict()
     try:
-        url = RPC_ENDPOINTS[chain]
-        payload = json.dumps({
-            'method': 'eth_getBlockByNumber',
-            'params': [block, False],
-            'id': 1,
-            'jsonrpc': '2.0'
-        })
-        res = requests.post(url, data=payload).json()
-        return int(res['result']['timestamp'], 16)
+        cached_blocks_ts = block_cache.get_block_timestamps(chain, RPC_ENDPOINTS[chain],
+                                                            [int(block, 16) for block in blocks])
+        for block in blocks:
+            if int(block, 16) in cached_blocks_ts:
+                blocks_ts[block] = cached_blocks_ts[int(block, 16)]
     except Exception as e:
-        log.error(f'[!] Error while getting block timestamp for {block}: {e}')
+        log.error(f'[!] Error while getting blocks timestamps on {chain}: {e}')
+    return blocks_ts
 
 def call_get_logs(addr, chain, url, topic,
                   nr_of_days=None, nr_of_hours=None,
                   nr_of_minutes=None):
     """
-    Call `eth_getLogs` method and search for a given topic0 and return the results
+    Call `eth_getLogs` method and search for a given topic0 and return the results.
+    Logs are read from the local event store, which only fetches the blocks not indexed yet.
+    The range is scanned in concurrent chunks sized per endpoint (see `log_scanner`),
+    a chunk the provider keeps rejecting fails the whole call instead of being skipped
 
     Args:
         addr (str): hub address
@@ -338,69 +278,93 @@ def call_get_logs(addr, chain, url, topic,
         logs (list): list of dict containing the results of the call, [] if none found
     """
     try:
-        logs = []
         _from, to = get_blocks_range_by_ts(chain, nr_of_days,
                                            nr_of_hours, nr_of_minutes)
-        _to = _from
-        nr_of_calls = 1
-        if to - _from > CONST['jsonrpc_max_block_range_getlogs']:
-            nr_of_calls = int((to - _from) / CONST['jsonrpc_max_block_range_getlogs'])
-        for _ in range(nr_of_calls + 1):
-            if (to - _to) > CONST['jsonrpc_max_block_range_getlogs']:
-                _to += CONST['jsonrpc_max_block_range_getlogs']
-            else:
-                _to = to
-            payload = json.dumps({
-                'method': 'eth_getLogs',
-                'params': [{
-                    'address': addr,
-                    'topics': topic,
-                    'fromBlock': hex(_from),
-                    'toBlock': hex(_to)
-                }],
-                'id': 1,
-                'jsonrpc': '2.0'
-            })
-            res = requests.post(url, data=payload).json()
-            if 'result' in res and len(res['result']) > 0:
-                for tx in res['result']:
-                    logs.append(tx)
-            _from += CONST['jsonrpc_max_block_range_getlogs']
-            time.sleep(1)
-        if logs:
-            return logs
-        else:
-            return []
+        if CONST['event_store_enabled'] and len(topic) == 1 and isinstance(topic[0], str):
+            return event_store.get_logs_by_topics(addr, chain, url, topic, _from, to)[topic[0]]
+        return log_scanner.scan_logs(addr, url, topic, _from, to)
     except Exception as e:
         log.error(f'[!] Error while calling getLogs for {url}: {e}')
+        raise
 
-def get_balance_by_chain_and_addr(addr, chain, endpoint):
+def call_get_logs_by_topics(addr, chain, url, topics0,
+                            nr_of_days=None, nr_of_hours=None,
+                            nr_of_minutes=None):
+    """
+    Call `eth_getLogs` method once for a topic0 OR-set and return the results demultiplexed by topic
+
+    Args:
+        addr (str): contract address
+        chain (str): chain name
+        url (str): endpoint url
+        topics0 (list): events' topics to search for
+        nr_of_days (int): (opt) how many days in the past
+        nr_of_hours (int): (opt) how many hours in the past
+        nr_of_minutes (int): (opt) how many minutes in the past
+
+    Returns:
+        logs_by_topic (dict): topic0:logs dict, [] for the topics with no logs
+    """
+    try:
+        _from, to = get_blocks_range_by_ts(chain, nr_of_days,
+                                           nr_of_hours, nr_of_minutes)
+        if CONST['event_store_enabled']:
+            return event_store.get_logs_by_topics(addr, chain, url, topics0, _from, to)
+        logs = log_scanner.scan_logs(addr, url, [list(topics0)], _from, to)
+        return {topic0: [tx for tx in logs if tx['topics'][0] == topic0] for topic0 in topics0}
+    except Exception as e:
+        log.error(f'[!] Error while calling getLogs for {url}: {e}')
+        raise
+
+def get_hub_logs(hub_addr, chain, url, event):
+    """
+    Get the logs of a hub event within the time range set in the config. All the events in
+    `HUB_LOG_TOPICS` are fetched together over the widest of their ranges, so the checks
+    looking for different hub events share a single scan
+
+    Args:
+        hub_addr (str): hub address
+        chain (str): chain name
+        url (str): endpoint url
+        event (str): event name (key of `HUB_LOG_TOPICS`)
+
+    Returns:
+        logs (list): list of dict containing the event's logs, [] if none found
+    """
+    if not CONST['event_store_enabled']:
+        return call_get_logs(hub_addr, chain, url, [TOPICS[event]], nr_of_days=CONST[HUB_LOG_TOPICS[event]])
+    nr_of_days = max(CONST[days_key] for days_key in HUB_LOG_TOPICS.values())
+    logs_by_topic = call_get_logs_by_topics(hub_addr, chain, url, [TOPICS[name] for name in HUB_LOG_TOPICS],
+                                            nr_of_days=nr_of_days)
+    _from, _ = get_blocks_range_by_ts(chain, CONST[HUB_LOG_TOPICS[event]], None, None)
+    return [tx for tx in logs_by_topic[TOPICS[event]] if int(tx['blockNumber'], 16) >= _from]
+
+def get_balances_by_chain_and_addrs(addrs, chain, endpoint):
     """
-    Get balance for a given address, on a given chain
+    Get balances for a list of addresses, on a given chain, at the run's pinned head with a single
+    batch request (for the ones not cached yet)
 
     Args:
-        addr (str): address to check the balance of
-        chain (str): chain where to check the balance on
+        addrs (list): addresses to check the balance of
+        chain (str): chain where to check the balances on
         endpoint (str): endpoint of the given chain
 
     Returns:
-        balance (float)
+        balances (list): balance (float) of each address, in the same order, None if it failed
     """
+    balances = [None] * len(addrs)
     try:
-        payload = json.dumps({
-            'method': 'eth_getBalance',
-            'params': [addr, 'latest'],
-            'id': 1,
-            'jsonrpc': '2.0'
-        })
-        res = requests.post(endpoint, data=payload).json()
-        balance_wei = int(res['result'], 16)
-        if balance_wei > 0:
-            return int(res['result'], 16) / float(f'1e{CHAIN_DECIMALS[chain]}')
-        else:
-            return 0
+        futures = snapshot.request_many(chain, endpoint, [('eth_getBalance', [addr, 'latest']) for addr in addrs])
+        for i, future in enumerate(futures):
+            try:
+                balance_wei = int(future.result(), 16)
+            except Exception as e:
+                log.error(f'[!] Error while getting balance for {addrs[i]} on {chain}: {e}')
+                continue
+            balances[i] = balance_wei / float(f'1e{CHAIN_DECIMALS[chain]}') if balance_wei > 0 else 0
     except Exception as e:
-        log.error(f'[!] Error while getting balance for {addr} on {chain}: {e}')
+        log.error(f'[!] Error while getting balances on {chain}: {e}')
+    return balances
 
 def get_enabled_tokens_usd_price():
     """
@@ -415,8 +379,12 @@ def get_enabled_tokens_usd_price():
             'ids': 'ethereum,matic-network,binancecoin',
             'vs_currencies': 'usd'
         }
-        prices_req = requests.get(CONST['coingecko_prices_url'], params=params,
-                                  headers=headers).json()
+        started_at = time.perf_counter()
+        req = transport.get_session(CONST['coingecko_prices_url']).get(
+            CONST['coingecko_prices_url'], params=params, headers=headers, timeout=CONST['rpc_timeout'])
+        rpc_stats.record(CONST['coingecko_prices_url'], 'simple/price', time.perf_counter() - started_at,
+                         response_bytes=len(req.content), nr_of_errors=int(not req.ok))
+        prices_req = req.json()
         keys = prices_req.keys()
         values = [round(val, 2) for price in list(prices_req.values()) for key, val in price.items()]
         prices_dict = dict(zip([COINGECKO_MAPPING[key] for key in keys], values))
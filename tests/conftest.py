@@ -0,0 +1,50 @@
+"""
+Shared fixtures: mock nodes (`benchmarks/mock_node.py`) serving every chain, the first one
+backing `RPC_ENDPOINTS` and the local caches (in a temporary directory) for the whole session
+"""
+import argparse
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, 'benchmarks')]
+
+import config
+import mock_node
+from constants import CONST
+
+
+@pytest.fixture(scope='session')
+def start_mock_node():
+    """
+    Start mock nodes with small fixtures, on free ports
+
+    Returns:
+        (function): called with mock node args overrides (see `mock_node.add_arguments`),
+            returns the (app, port) of the started node
+    """
+    def start(**kwargs):
+        parser = argparse.ArgumentParser()
+        mock_node.add_arguments(parser)
+        args = parser.parse_args(['--port', '0', '--actors', '20', '--operations', '200', '--blocks', '20000'])
+        vars(args).update(kwargs)
+        return mock_node.start_in_thread(args)
+    return start
+
+@pytest.fixture(scope='session')
+def node(start_mock_node, tmp_path_factory):
+    """
+    Point `RPC_ENDPOINTS` and the cache paths to a mock node and a temporary directory
+
+    Returns:
+        (Application): mock node app, its `stats` are live
+    """
+    app, port = start_mock_node()
+    for chain in config.RPC_ENDPOINTS:
+        config.RPC_ENDPOINTS[chain] = f'http://127.0.0.1:{port}/rpc/{chain}'
+    cache_dir = tmp_path_factory.mktemp('cache')
+    for key in ('addr_cache_path', 'cache_db_path', 'getlogs_ranges_path'):
+        CONST[key] = str(cache_dir / os.path.basename(CONST[key]))
+    return app
@@ -0,0 +1,64 @@
+import eth_abi
+import eth_utils
+import pytest
+
+from scripts import event_decoding
+
+
+def get_value(abi_type, i):
+    if abi_type.endswith('[]'):
+        return [get_value(abi_type[:-2], i + j) for j in range(3)]
+    if abi_type.startswith('uint'):
+        return 1000 + i
+    if abi_type == 'address':
+        return eth_utils.to_checksum_address(f'0x{i + 1:040x}')
+    if abi_type == 'bool':
+        return i % 2 == 0
+    if abi_type == 'string':
+        return f'field {i}'
+    if abi_type == 'bytes':
+        return bytes(range(i + 1)) * 3
+    return bytes([i + 1]) * int(abi_type[5:])
+
+def normalize(value):
+    if isinstance(value, dict):
+        return {key: normalize(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [normalize(item) for item in value]
+    if isinstance(value, bytes):
+        return eth_utils.encode_hex(value)
+    if isinstance(value, str) and eth_utils.is_address(value):
+        return eth_utils.to_checksum_address(value)
+    return value
+
+def get_log(layout):
+    types = layout['types']
+    values = [get_value(abi_type, i) for i, abi_type in enumerate(types)]
+    if layout['is_tuple']:
+        data = eth_abi.encode([f'({",".join(types)})'], [tuple(values)])
+    else:
+        data = eth_abi.encode(types, values)
+    topics = ['0x' + '00' * 32] + [eth_utils.encode_hex(eth_abi.encode([abi_type], [get_value(abi_type, 100 + i)]))
+                                   for i, (_, abi_type) in enumerate(layout['topics'])]
+    return topics, eth_utils.encode_hex(data)
+
+def decode_with_eth_abi(layout, topics, data):
+    types = layout['types']
+    if layout['is_tuple']:
+        values = eth_abi.decode([f'({",".join(types)})'], eth_utils.decode_hex(data))[0]
+    else:
+        values = eth_abi.decode(types, eth_utils.decode_hex(data))
+    decoded = {name: normalize(value) for name, value in zip(layout['names'], values)}
+    for i, (name, abi_type) in enumerate(layout['topics']):
+        decoded[name] = normalize(eth_abi.decode([abi_type], eth_utils.decode_hex(topics[i + 1]))[0])
+    return decoded
+
+@pytest.mark.parametrize('event', event_decoding.EVENT_LAYOUTS)
+def test_decoded_fields_match_eth_abi(event):
+    layout = event_decoding.EVENT_LAYOUTS[event]
+    topics, data = get_log(layout)
+    expected = decode_with_eth_abi(layout, topics, data)
+    # one field at a time: static fields are read from their word offsets, dynamic ones through eth_abi
+    for field in expected:
+        assert normalize(event_decoding.decode_log(event, topics, data, [field])) == {field: expected[field]}
+    assert normalize(event_decoding.decode_log(event, topics, data, list(expected))) == expected
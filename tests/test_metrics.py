@@ -0,0 +1,24 @@
+from scripts import metrics
+
+
+def get_series(page):
+    return [line.rsplit(' ', 1)[0] for line in page.splitlines() if not line.startswith('#')]
+
+def test_run_level_fields_are_emitted_once(monkeypatch):
+    monkeypatch.setattr(metrics, '_samples', dict())
+    metrics.update('inactive_actors_by_epoch', [{
+        'chain': 'polygon',
+        'epoch': 7,
+        'actors': {'actor_type': actor_type, 'active_actors': 10, 'inactive_actors': 1}
+    } for actor_type in ('guardian', 'sentinel', 'relayer')])
+    page = metrics.render()
+    assert page.count('pnetwork_epoch{check="inactive_actors_by_epoch",chain="polygon"} 7') == 1
+    assert len(get_series(page)) == len(set(get_series(page)))
+
+def test_actor_records_are_labelled_by_epoch(monkeypatch):
+    monkeypatch.setattr(metrics, '_samples', dict())
+    metrics.update('slashed_actors', [{'chain': 'polygon', 'actor_address': '0xa', 'epoch': epoch} for epoch in (3, 4)])
+    page = metrics.render()
+    assert 'pnetwork_epoch{check="slashed_actors",chain="polygon",actor="0xa",epoch="3"} 3' in page
+    assert 'pnetwork_epoch{check="slashed_actors",chain="polygon",actor="0xa",epoch="4"} 4' in page
+    assert len(get_series(page)) == len(set(get_series(page)))
@@ -0,0 +1,38 @@
+import config
+import mock_node
+import pytest
+
+from collections import OrderedDict
+from constants import MULTICALL_ADDRS_DICT
+from scripts import address_cache, snapshot, utils
+
+
+HUB_GETTERS = ['maxOperationsInQueue', 'numberOfOperationsInQueue', 'getCurrentChallengePeriodDuration']
+
+@pytest.fixture
+def hub_calls(node):
+    return [{'addr': address_cache.get_addr('bsc', 'hub'), 'method': method} for method in HUB_GETTERS]
+
+def test_view_calls_are_aggregated(node, hub_calls, monkeypatch):
+    monkeypatch.setattr(snapshot, '_results', OrderedDict())
+    mock_node.reset_stats(node)
+    results = utils.call_contract_methods('bsc', config.RPC_ENDPOINTS['bsc'], hub_calls)
+    assert results == [50, 200 % 50, 3600]
+    assert node['stats']['calls'] == {'eth_call': 1}
+    assert node['stats']['multicall_calls'] == len(HUB_GETTERS)
+
+def test_view_calls_fall_back_to_single_calls(node, hub_calls, monkeypatch):
+    monkeypatch.setattr(snapshot, '_results', OrderedDict())
+    monkeypatch.setitem(MULTICALL_ADDRS_DICT, 'bsc', None)
+    mock_node.reset_stats(node)
+    results = utils.call_contract_methods('bsc', config.RPC_ENDPOINTS['bsc'], hub_calls)
+    assert results == [50, 200 % 50, 3600]
+    assert node['stats']['calls'] == {'eth_call': len(HUB_GETTERS)}
+    assert node['stats']['multicall_calls'] == 0
+
+def test_identical_view_calls_are_sent_once(node, hub_calls, monkeypatch):
+    monkeypatch.setattr(snapshot, '_results', OrderedDict())
+    mock_node.reset_stats(node)
+    results = utils.call_contract_methods('bsc', config.RPC_ENDPOINTS['bsc'], hub_calls + hub_calls)
+    assert results == [50, 200 % 50, 3600] * 2
+    assert node['stats']['multicall_calls'] == len(HUB_GETTERS)
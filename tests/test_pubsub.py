@@ -0,0 +1,47 @@
+import argparse
+import asyncio
+import config
+import fake_ipfs
+import json
+
+from aiohttp import web
+from constants import CONST
+from scripts import ipfs_subpub_pnetwork_topics as ipfs
+
+
+async def listen_to_fake_ipfs(monkeypatch, topics, seconds, **kwargs):
+    """
+    Serve a fake ipfs node in-process and run the listener against it
+
+    Returns:
+        records (list): listener's stats records
+        messages (list): decoded heartbeats received by the callback
+    """
+    args = argparse.Namespace(**{'actors': 10, 'rate': 100, 'restart_every': 0, **kwargs})
+    runner = web.AppRunner(fake_ipfs.get_app(args))
+    await runner.setup()
+    await web.TCPSite(runner, '127.0.0.1', 0).start()
+    monkeypatch.setitem(config.SUBPUB_CONFIG, 'ipfs_url', '127.0.0.1')
+    monkeypatch.setitem(config.SUBPUB_CONFIG, 'ipfs_port', runner.addresses[0][1])
+    messages = []
+    try:
+        records = await ipfs.subscribe(topics, lambda data, cid: messages.append(json.loads(data)), seconds)
+    finally:
+        await runner.cleanup()
+    return records, messages
+
+def test_listener_reconnects_when_the_stream_is_cut(monkeypatch):
+    monkeypatch.setitem(CONST, 'pubsub_backoff_base', 0.05)
+    records, messages = asyncio.run(listen_to_fake_ipfs(monkeypatch, ['topic'], 2.5, restart_every=0.5))
+    assert records[0]['reconnects'] >= 2
+    # messages still queued when the listener stops are counted but not consumed
+    assert len(messages) <= records[0]['messages_received']
+    # the stream keeps flowing after each cut: more than a single 0.5 s stream worth of messages
+    assert len(messages) > 100 * 0.5 * 2
+    assert {'actorType', 'softwareVersions', 'syncState'} <= set(messages[0])
+
+def test_listener_subscribes_to_every_topic(monkeypatch):
+    records, messages = asyncio.run(listen_to_fake_ipfs(monkeypatch, ['topic-a', 'topic-b'], 1))
+    assert [record['topic'] for record in records] == ['topic-a', 'topic-b']
+    assert all(record['messages_received'] > 0 for record in records)
+    assert all(record['reconnects'] == 0 for record in records)
@@ -0,0 +1,35 @@
+import time
+
+from constants import CONST
+from scripts import event_store, snapshot, utils
+
+
+def test_block_range_stays_non_empty_across_snapshots(node, monkeypatch):
+    # the head's cached timestamp expires before the next runs, reusing the snapshot or not
+    monkeypatch.setitem(CONST, 'block_cache_head_ttl', 0.5)
+    ranges = []
+    for ttl in (0, CONST['snapshot_ttl'], 0):
+        snapshot.start_run(ttl)
+        # a minute of polygon blocks (2 s each in the mock) is well within its confirmations
+        ranges.append(utils.get_blocks_range_by_ts('polygon', None, None, 1))
+        time.sleep(1)
+    assert all(29 <= to - _from <= 31 for _from, to in ranges)
+    assert ranges[0] == ranges[1]
+    assert ranges[2][0] >= ranges[0][0]
+
+def test_daemon_runs_share_a_recent_snapshot(node, monkeypatch):
+    monkeypatch.setitem(CONST, 'snapshot_ttl', 60)
+    snapshot.start_run()
+    head = snapshot.get_head('bsc', utils.RPC_ENDPOINTS['bsc'])
+    snapshot.start_run(CONST['snapshot_ttl'])
+    assert snapshot.get_head('bsc', utils.RPC_ENDPOINTS['bsc']) is head
+    snapshot.start_run()
+    assert snapshot.get_head('bsc', utils.RPC_ENDPOINTS['bsc']) is not head
+
+def test_collapsed_range_does_not_prune_the_event_store():
+    cursor = (49993, 50013)
+    _, new_cursor = event_store.get_missing_ranges('bsc', '0xhub', '0xtopic', cursor, 50013, 50013)
+    assert new_cursor == cursor
+    # a window sliding with the head still moves the cursor forward
+    _, new_cursor = event_store.get_missing_ranges('bsc', '0xhub', '0xtopic', cursor, 50003, 50023)
+    assert new_cursor == (50003, 50023)
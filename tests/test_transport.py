@@ -0,0 +1,77 @@
+import mock_node
+import pytest
+import requests
+import socket
+import time
+
+from constants import CONST
+from scripts import transport
+
+
+def test_rate_limited_requests_are_retried(start_mock_node, monkeypatch):
+    monkeypatch.setitem(CONST, 'rpc_backoff_base', 0.05)
+    app, port = start_mock_node(rate_limit=5)
+    url = f'http://127.0.0.1:{port}/rpc/bsc'
+    responses = [transport.rpc_request(url, 'eth_blockNumber', []) for _ in range(20)]
+    assert all('result' in res for res in responses)
+    assert app['stats']['rate_limited'] > 0
+    assert app['stats']['http_requests'] == 20 + app['stats']['rate_limited']
+
+def test_rate_limited_batches_are_retried(start_mock_node, monkeypatch):
+    monkeypatch.setitem(CONST, 'rpc_backoff_base', 0.05)
+    monkeypatch.setitem(CONST, 'rpc_batch_size', 10)
+    app, port = start_mock_node(rate_limit=2)
+    url = f'http://127.0.0.1:{port}/rpc/bsc'
+    responses = transport.rpc_batch(url, [('eth_getBlockByNumber', [hex(block), False]) for block in range(100)])
+    assert [int(res['result']['number'], 16) for res in responses] == list(range(100))
+    assert app['stats']['rate_limited'] > 0
+
+def get_free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def test_dead_url_is_ejected_then_re_probed(start_mock_node, monkeypatch):
+    monkeypatch.setattr(transport, '_health', dict())
+    monkeypatch.setitem(CONST, 'rpc_probe_interval', 0.1)
+    _, port = start_mock_node()
+    dead_port = get_free_port()
+    dead_url = f'http://127.0.0.1:{dead_port}/rpc/bsc'
+    endpoint = [dead_url, f'http://127.0.0.1:{port}/rpc/bsc']
+    responses = [transport.rpc_request(endpoint, 'eth_blockNumber', []) for _ in range(10)]
+    assert all('result' in res for res in responses)
+    assert transport.get_health(dead_url)['is_ejected']
+    assert transport.rank_urls(endpoint) == endpoint[::-1]
+    # the url comes back, the probe re-admits it
+    start_mock_node(port=dead_port)
+    deadline = time.monotonic() + 5
+    while transport.get_health(dead_url)['is_ejected'] and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert not transport.get_health(dead_url)['is_ejected']
+
+def test_single_url_is_never_ejected(monkeypatch):
+    monkeypatch.setattr(transport, '_health', dict())
+    monkeypatch.setitem(CONST, 'rpc_backoff_base', 0.01)
+    monkeypatch.setitem(CONST, 'rpc_max_retries', 1)
+    dead_url = f'http://127.0.0.1:{get_free_port()}/rpc/bsc'
+    for _ in range(CONST['rpc_eject_failures'] + 1):
+        with pytest.raises(requests.ConnectionError):
+            transport.rpc_request(dead_url, 'eth_blockNumber', [])
+    assert not transport.get_health(dead_url)['is_ejected']
+
+def test_slow_url_is_hedged(start_mock_node, monkeypatch):
+    monkeypatch.setattr(transport, '_health', dict())
+    monkeypatch.setitem(CONST, 'rpc_hedging', True)
+    monkeypatch.setitem(CONST, 'rpc_hedge_min_samples', 1)
+    slow_app, slow_port = start_mock_node(latency=1000)
+    fast_app, fast_port = start_mock_node()
+    endpoint = [f'http://127.0.0.1:{slow_port}/rpc/bsc', f'http://127.0.0.1:{fast_port}/rpc/bsc']
+    # the slow url ranks first, with a p95 of a few ms
+    for url, latency in zip(endpoint, (0.01, 0.02)):
+        transport.update_health(url, latency, False)
+    mock_node.reset_stats(fast_app)
+    started_at = time.monotonic()
+    res = transport.rpc_request(endpoint, 'eth_blockNumber', [])
+    assert 'result' in res
+    assert time.monotonic() - started_at < 0.5
+    assert fast_app['stats']['http_requests'] == 1